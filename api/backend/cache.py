@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_caches_invalidaveis = []
+_lock_registro = threading.Lock()
+
+
+def registrar_invalidacao(cache):
+    with _lock_registro:
+        _caches_invalidaveis.append(cache)
+    return cache
+
+
+def notificar_escrita():
+    # Chamado pela camada de dados depois de qualquer escrita em eventos_risco
+    with _lock_registro:
+        caches = list(_caches_invalidaveis)
+    for cache in caches:
+        cache.invalidar()
+
+
+class _Carga:
+    __slots__ = ('evento', 'valor', 'erro')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class CacheTTL:
+    """Cache em memória com expiração por TTL e carga única por chave.
+
+    Quando várias threads pedem a mesma chave expirada ao mesmo tempo, só a
+    primeira executa ``carregar``; as demais esperam e recebem o mesmo
+    resultado (ou a mesma exceção). Uma invalidação durante a carga impede
+    que o valor já desatualizado seja guardado.
+
+    No event loop, use ``obter_async``: quem chega durante a carga espera
+    numa Task compartilhada em vez de prender uma thread do executor.
+    """
+
+    def __init__(self, ttl=60.0, nome='cache'):
+        self.ttl = ttl
+        self.nome = nome
+        self._entradas = {}
+        self._em_carga = {}
+        self._em_carga_async = {}
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+        self._acertos = 0
+        self._falhas = 0
+        self._coalescidas = 0
+        self._cargas = 0
+        self._erros = 0
+        self._invalidacoes = 0
+
+    def obter(self, chave, carregar):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._acertos += 1
+                return entrada[1]
+
+            self._falhas += 1
+            carga = self._em_carga.get(chave)
+            dono = carga is None
+            if dono:
+                carga = _Carga()
+                self._em_carga[chave] = carga
+                geracao = self._geracao
+            else:
+                self._coalescidas += 1
+
+        if not dono:
+            carga.evento.wait()
+            if carga.erro is not None:
+                raise carga.erro
+            return carga.valor
+
+        try:
+            carga.valor = carregar()
+        except Exception as e:
+            carga.erro = e
+            with self._lock:
+                self._erros += 1
+            raise
+        else:
+            with self._lock:
+                self._cargas += 1
+                if geracao == self._geracao:
+                    self._entradas[chave] = (time.monotonic() + self.ttl, carga.valor)
+            return carga.valor
+        finally:
+            with self._lock:
+                if self._em_carga.get(chave) is carga:
+                    del self._em_carga[chave]
+            carga.evento.set()
+
+    async def obter_async(self, chave, carregar):
+        """Como ``obter``, com ``carregar`` devolvendo uma corrotina (ex.: a
+        consulta no executor do banco). Cancelar a espera (timeout) não
+        cancela a carga, que ainda preenche o cache."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._acertos += 1
+                return entrada[1]
+
+            self._falhas += 1
+            tarefa = self._em_carga_async.get(chave)
+            if tarefa is None:
+                tarefa = asyncio.ensure_future(self._carregar_async(chave, carregar, self._geracao))
+                # Se todos desistirem antes do fim, o erro não fica sem dono
+                tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._em_carga_async[chave] = tarefa
+            else:
+                self._coalescidas += 1
+
+        return await asyncio.shield(tarefa)
+
+    async def _carregar_async(self, chave, carregar, geracao):
+        try:
+            valor = await carregar()
+        except Exception:
+            with self._lock:
+                self._erros += 1
+            raise
+        else:
+            with self._lock:
+                self._cargas += 1
+                if geracao == self._geracao:
+                    self._entradas[chave] = (time.monotonic() + self.ttl, valor)
+            return valor
+        finally:
+            with self._lock:
+                if self._em_carga_async.get(chave) is asyncio.current_task():
+                    del self._em_carga_async[chave]
+
+    def invalidar(self, chave=None):
+        with self._lock:
+            # Quem chegar depois da escrita não deve aguardar uma carga
+            # iniciada antes dela
+            if chave is None:
+                self._entradas.clear()
+                self._em_carga.clear()
+                self._em_carga_async.clear()
+            else:
+                self._entradas.pop(chave, None)
+                self._em_carga.pop(chave, None)
+                self._em_carga_async.pop(chave, None)
+            self._geracao += 1
+            self._invalidacoes += 1
+        logger.info(f"Cache '{self.nome}' invalidado")
+
+    def metricas(self):
+        with self._lock:
+            consultas = self._acertos + self._falhas
+            return {
+                'ttl_s': self.ttl,
+                'entradas': len(self._entradas),
+                'acertos': self._acertos,
+                'falhas': self._falhas,
+                'taxa_acerto': round(self._acertos / consultas, 4) if consultas else 0.0,
+                'cargas': self._cargas,
+                'coalescidas': self._coalescidas,
+                'erros': self._erros,
+                'invalidacoes': self._invalidacoes,
+            }
+
+
+class CacheLRU:
+    """Cache em memória por chave com TTL e limite de entradas, que remove
+    as menos usadas primeiro. Pensado para buscas em lote: ``obter_varios``
+    separa o que já está em cache do que precisa ir ao banco.
+
+    ``obter_varios`` também devolve a geração do cache; ``guardar_varios``
+    com essa geração ignora os valores se houve invalidação no meio, para
+    que uma leitura anterior a uma escrita não volte para o cache.
+    """
+
+    def __init__(self, max_entradas=1000, ttl=60.0, nome='lru'):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.nome = nome
+        self._entradas = OrderedDict()
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+        self._acertos = 0
+        self._falhas = 0
+        self._descartadas = 0
+        self._removidas_lru = 0
+        self._invalidacoes = 0
+
+    def obter_varios(self, chaves):
+        encontrados = {}
+        faltando = []
+        agora = time.monotonic()
+
+        with self._lock:
+            for chave in chaves:
+                entrada = self._entradas.get(chave)
+                if entrada is not None and entrada[0] > agora:
+                    self._entradas.move_to_end(chave)
+                    encontrados[chave] = entrada[1]
+                    self._acertos += 1
+                else:
+                    if entrada is not None:
+                        del self._entradas[chave]
+                    faltando.append(chave)
+                    self._falhas += 1
+            geracao = self._geracao
+
+        return encontrados, faltando, geracao
+
+    def guardar_varios(self, valores, geracao=None):
+        expira_em = time.monotonic() + self.ttl
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                self._descartadas += len(valores)
+                return
+            for chave, valor in valores.items():
+                self._entradas[chave] = (expira_em, valor)
+                self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._removidas_lru += 1
+
+    def invalidar(self, chave=None):
+        with self._lock:
+            if chave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(chave, None)
+            self._geracao += 1
+            self._invalidacoes += 1
+        logger.info(f"Cache '{self.nome}' invalidado")
+
+    def metricas(self):
+        with self._lock:
+            consultas = self._acertos + self._falhas
+            return {
+                'ttl_s': self.ttl,
+                'max_entradas': self.max_entradas,
+                'entradas': len(self._entradas),
+                'acertos': self._acertos,
+                'falhas': self._falhas,
+                'taxa_acerto': round(self._acertos / consultas, 4) if consultas else 0.0,
+                'descartadas': self._descartadas,
+                'removidas_lru': self._removidas_lru,
+                'invalidacoes': self._invalidacoes,
+            }
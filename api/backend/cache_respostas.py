@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_mensagem(mensagem):
+    # "Quais os eventos CRÍTICOS?" e "quais os eventos criticos" são a mesma pergunta
+    texto = unicodedata.normalize('NFKD', mensagem).encode('ascii', 'ignore').decode().lower()
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return texto.rstrip('?!. ')
+
+
+def gerar_chave(*partes):
+    serializado = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serializado.encode()).hexdigest()
+
+
+class CacheRespostas:
+    """Cache LRU com TTL para respostas da Yoyo.
+
+    Fica em memória por padrão; com ``caminho_sqlite`` as entradas são
+    gravadas num arquivo SQLite e sobrevivem a reinícios. As chaves incluem
+    a versão dos dados de eventos_risco, então depois de uma escrita as
+    respostas antigas deixam de ser encontradas; ``invalidar`` só libera o
+    espaço delas.
+    """
+
+    def __init__(self, ttl=300.0, max_entradas=500, caminho_sqlite=None, nome='respostas'):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.nome = nome
+        self._lock = threading.Lock()
+        self._memoria = OrderedDict()
+        self._sqlite = None
+
+        if caminho_sqlite:
+            self._sqlite = sqlite3.connect(caminho_sqlite, check_same_thread=False, isolation_level=None)
+            self._sqlite.execute("PRAGMA journal_mode=WAL")
+            self._sqlite.execute("""
+                CREATE TABLE IF NOT EXISTS respostas_yoyo (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    expira_em REAL NOT NULL,
+                    usado_em REAL NOT NULL
+                )
+            """)
+            self._sqlite.execute("CREATE INDEX IF NOT EXISTS idx_respostas_usado_em ON respostas_yoyo (usado_em)")
+
+        self._acertos = 0
+        self._falhas = 0
+        self._expiradas = 0
+        self._removidas_lru = 0
+        self._invalidacoes = 0
+
+    @property
+    def ativo(self):
+        return self.ttl > 0 and self.max_entradas > 0
+
+    def obter(self, chave):
+        with self._lock:
+            agora = time.time()
+            if self._sqlite is not None:
+                linha = self._sqlite.execute(
+                    "SELECT valor, expira_em FROM respostas_yoyo WHERE chave = ?", (chave,)
+                ).fetchone()
+                entrada = (linha[1], json.loads(linha[0])) if linha else None
+            else:
+                entrada = self._memoria.get(chave)
+
+            if entrada is None:
+                self._falhas += 1
+                return None
+
+            expira_em, valor = entrada
+            if expira_em <= agora:
+                self._remover(chave)
+                self._expiradas += 1
+                self._falhas += 1
+                return None
+
+            if self._sqlite is not None:
+                self._sqlite.execute("UPDATE respostas_yoyo SET usado_em = ? WHERE chave = ?", (agora, chave))
+            else:
+                self._memoria.move_to_end(chave)
+
+            self._acertos += 1
+            return valor
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            agora = time.time()
+            if self._sqlite is not None:
+                self._sqlite.execute(
+                    "INSERT OR REPLACE INTO respostas_yoyo (chave, valor, expira_em, usado_em) VALUES (?, ?, ?, ?)",
+                    (chave, json.dumps(valor, ensure_ascii=False), agora + self.ttl, agora)
+                )
+                excesso = self._tamanho() - self.max_entradas
+                if excesso > 0:
+                    self._sqlite.execute(
+                        "DELETE FROM respostas_yoyo WHERE chave IN "
+                        "(SELECT chave FROM respostas_yoyo ORDER BY usado_em LIMIT ?)",
+                        (excesso,)
+                    )
+                    self._removidas_lru += excesso
+            else:
+                self._memoria[chave] = (agora + self.ttl, valor)
+                self._memoria.move_to_end(chave)
+                while len(self._memoria) > self.max_entradas:
+                    self._memoria.popitem(last=False)
+                    self._removidas_lru += 1
+
+    async def obter_async(self, chave):
+        # Com SQLite a leitura vai para uma thread, fora do event loop
+        if self._sqlite is not None:
+            return await asyncio.to_thread(self.obter, chave)
+        return self.obter(chave)
+
+    async def guardar_async(self, chave, valor):
+        if self._sqlite is not None:
+            await asyncio.to_thread(self.guardar, chave, valor)
+        else:
+            self.guardar(chave, valor)
+
+    def invalidar(self, chave=None):
+        with self._lock:
+            if chave is not None:
+                self._remover(chave)
+            elif self._sqlite is not None:
+                self._sqlite.execute("DELETE FROM respostas_yoyo")
+            else:
+                self._memoria.clear()
+            self._invalidacoes += 1
+        logger.info(f"Cache '{self.nome}' invalidado")
+
+    def _remover(self, chave):
+        if self._sqlite is not None:
+            self._sqlite.execute("DELETE FROM respostas_yoyo WHERE chave = ?", (chave,))
+        else:
+            self._memoria.pop(chave, None)
+
+    def _tamanho(self):
+        if self._sqlite is not None:
+            return self._sqlite.execute("SELECT COUNT(*) FROM respostas_yoyo").fetchone()[0]
+        return len(self._memoria)
+
+    def metricas(self):
+        with self._lock:
+            consultas = self._acertos + self._falhas
+            return {
+                'backend': 'sqlite' if self._sqlite is not None else 'memoria',
+                'ttl_s': self.ttl,
+                'max_entradas': self.max_entradas,
+                'entradas': self._tamanho(),
+                'acertos': self._acertos,
+                'falhas': self._falhas,
+                'taxa_acerto': round(self._acertos / consultas, 4) if consultas else 0.0,
+                'expiradas': self._expiradas,
+                'removidas_lru': self._removidas_lru,
+                'invalidacoes': self._invalidacoes,
+            }
@@ -0,0 +1,186 @@
+import glob
+import logging
+import os
+import threading
+import time
+import warnings
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Mesmas colunas, na mesma ordem, de X no notebook 01_exploracao_inicial
+FEATURES = [
+    'impacto_financeiro', 'clientes_afetados', 'tempo_indisponibilidade',
+    'frequencia_evento', 'criticidade_sistema', 'falha_processo',
+    'fraude_interna', 'recorrencia'
+]
+THRESHOLD_CRITICO = 0.30
+
+PASTA_MODELOS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'modelos')
+PADRAO_ARTEFATO = 'classificador_risco_*.joblib'
+
+# O modelo foi treinado com DataFrame e aqui recebe uma matriz NumPy na
+# mesma ordem de FEATURES
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+class ClassificadorIndisponivel(Exception):
+    pass
+
+
+class ClassificadorRisco:
+    """RandomForest exportado pelo notebook, com o threshold de críticos.
+
+    Um evento é 'critico' se a probabilidade dessa classe passar de
+    ``threshold_critico``; senão, recebe a classe mais provável.
+    """
+
+    def __init__(self, artefato, caminho=None, janela_metricas=1000):
+        import numpy as np
+
+        self._np = np
+        self.modelo = artefato['modelo']
+        self.versao = artefato['versao']
+        self.features = list(artefato['features'])
+        self.threshold_critico = artefato.get('threshold_critico', THRESHOLD_CRITICO)
+        self.caminho = caminho
+
+        if self.features != FEATURES:
+            raise ClassificadorIndisponivel(
+                f"Artefato {caminho} usa features {self.features}, esperado {FEATURES}"
+            )
+
+        self.classes = np.asarray(self.modelo.classes_)
+        self._idx_critico = list(self.classes).index('critico')
+
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=janela_metricas)
+        self._lotes = 0
+        self._eventos = 0
+        self._tempo_total = 0.0
+        self._maior_lote = 0
+
+    @classmethod
+    def carregar(cls, caminho=None):
+        try:
+            import joblib
+        except ImportError as e:
+            raise ClassificadorIndisponivel(f"Dependência ausente para o classificador: {e}")
+
+        caminho = caminho or os.getenv('MODELO_RISCO_PATH') or _artefato_mais_recente()
+        if not caminho or not os.path.exists(caminho):
+            raise ClassificadorIndisponivel(
+                f"Nenhum modelo encontrado (exporte pelo notebook para {PASTA_MODELOS})"
+            )
+
+        inicio = time.perf_counter()
+        try:
+            artefato = joblib.load(caminho)
+        except ImportError as e:
+            # scikit-learn/numpy ausentes ou incompatíveis com o artefato
+            raise ClassificadorIndisponivel(f"Não foi possível carregar {caminho}: {e}")
+        classificador = cls(artefato, caminho)
+        logger.info(
+            f"Classificador {classificador.versao} carregado de {caminho} "
+            f"em {(time.perf_counter() - inicio) * 1000:.0f} ms"
+        )
+        return classificador
+
+    def matriz(self, eventos):
+        return self._np.array(
+            [[float(evento[f]) for f in self.features] for evento in eventos],
+            dtype=self._np.float64
+        )
+
+    def classificar(self, eventos):
+        """Recebe dicts com as FEATURES e devolve, na mesma ordem, dicts com
+        nivel_risco e as probabilidades de cada classe."""
+        if not eventos:
+            return []
+
+        inicio = time.perf_counter()
+        np = self._np
+
+        probas = self.modelo.predict_proba(self.matriz(eventos))
+        previstos = self.classes[probas.argmax(axis=1)]
+        previstos = np.where(probas[:, self._idx_critico] >= self.threshold_critico, 'critico', previstos)
+
+        classes = [str(c) for c in self.classes]
+        resultados = [
+            {
+                'nivel_risco': str(nivel),
+                'probabilidades': dict(zip(classes, np.round(linha, 4).tolist()))
+            }
+            for nivel, linha in zip(previstos, probas)
+        ]
+
+        self._registrar(len(eventos), time.perf_counter() - inicio)
+        return resultados
+
+    def _registrar(self, quantidade, duracao):
+        with self._lock:
+            self._lotes += 1
+            self._eventos += quantidade
+            self._tempo_total += duracao
+            self._maior_lote = max(self._maior_lote, quantidade)
+            self._latencias.append(duracao)
+
+    def metricas(self):
+        with self._lock:
+            latencias = sorted(self._latencias)
+            eventos, tempo_total = self._eventos, self._tempo_total
+            lotes, maior_lote = self._lotes, self._maior_lote
+
+        def percentil(p):
+            if not latencias:
+                return 0.0
+            return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 3)
+
+        return {
+            'carregado': True,
+            'versao': self.versao,
+            'threshold_critico': self.threshold_critico,
+            'lotes': lotes,
+            'eventos': eventos,
+            'maior_lote': maior_lote,
+            'latencia_lote_p50_ms': percentil(0.50),
+            'latencia_lote_p95_ms': percentil(0.95),
+            'latencia_lote_p99_ms': percentil(0.99),
+            'eventos_por_s': round(eventos / tempo_total, 1) if tempo_total else 0.0,
+        }
+
+
+def _artefato_mais_recente():
+    # A versão no nome é um timestamp (YYYYMMDDHHMMSS), então a ordem
+    # alfabética é a cronológica
+    artefatos = sorted(glob.glob(os.path.join(PASTA_MODELOS, PADRAO_ARTEFATO)))
+    return artefatos[-1] if artefatos else None
+
+
+_classificador = None
+_erro_carga = None
+_lock_carga = threading.Lock()
+
+
+def get_classificador():
+    """Classificador carregado uma vez por processo. Levanta
+    ClassificadorIndisponivel se o artefato ou as dependências faltarem."""
+    global _classificador, _erro_carga
+
+    if _classificador is None:
+        with _lock_carga:
+            if _classificador is None:
+                try:
+                    _classificador = ClassificadorRisco.carregar()
+                    _erro_carga = None
+                except ClassificadorIndisponivel as e:
+                    _erro_carga = str(e)
+                    raise
+
+    return _classificador
+
+
+def get_metricas_classificador():
+    if _classificador is None:
+        return {'carregado': False, 'erro': _erro_carga}
+    return _classificador.metricas()
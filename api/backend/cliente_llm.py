@@ -0,0 +1,505 @@
+"""Cliente do LLM com limites de uso: balde de tokens no tamanho da cota,
+concorrência limitada com fila e timeout, novas tentativas com espera
+exponencial e jitter (respeitando o retry-after do servidor), coalescência
+de prompts idênticos em andamento e disjuntor.
+
+A geração em si fica no provedor (provedores_llm.py); o cliente só decide
+quando e quantas vezes chamá-lo.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from .metricas import Contador, Histograma, registrar
+
+logger = logging.getLogger(__name__)
+
+RETENTATIVAS_LLM = registrar(Contador(
+    'yoyo_llm_retentativas_total',
+    'Novas tentativas de chamada ao Gemini após rate limit ou indisponibilidade',
+    rotulos=('modo',)
+))
+ESPERA_FILA = registrar(Histograma(
+    'yoyo_llm_espera_fila_segundos',
+    'Tempo até a chamada ao Gemini sair da fila (vaga de concorrência e balde de tokens)',
+    limites=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+))
+REJEITADAS = registrar(Contador(
+    'yoyo_llm_rejeitadas_total',
+    'Chamadas ao Gemini recusadas pelo limitador (fila cheia ou tempo de fila esgotado)',
+    rotulos=('motivo',)
+))
+COALESCIDAS = registrar(Contador(
+    'yoyo_llm_coalescidas_total',
+    'Chamadas que aproveitaram uma geração idêntica já em andamento',
+    rotulos=('modo',)
+))
+ABERTURAS_DISJUNTOR = registrar(Contador(
+    'yoyo_llm_disjuntor_aberturas_total',
+    'Vezes que o disjuntor do LLM abriu por erros ou lentidão'
+))
+
+
+class LimiteLLMError(Exception):
+    pass
+
+
+class FilaLLMCheiaError(LimiteLLMError):
+    pass
+
+
+class EsperaLLMEsgotadaError(LimiteLLMError):
+    pass
+
+
+class CircuitoAbertoError(LimiteLLMError):
+    pass
+
+
+class GeracaoCanceladaError(Exception):
+    pass
+
+
+class BaldeTokens:
+    """Balde de tokens: ``taxa`` tokens por segundo, até ``capacidade``
+    acumulados. Quem consome sem saldo fica devendo, e o próximo espera a
+    dívida ser paga; assim a ordem de chegada é respeitada sem lock.
+
+    ``pausar(segundos)`` zera o saldo e adiciona a dívida de ``segundos``
+    (ex.: retry-after de um 429), para que um rate limit não vire uma rajada
+    de novas tentativas.
+    """
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = capacidade
+        self._atualizado = time.monotonic()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    def espera(self, quantidade=1):
+        """Segundos até haver ``quantidade`` tokens, sem consumir."""
+        self._repor()
+        falta = min(quantidade, self.capacidade) - self._tokens
+        return falta / self.taxa if falta > 0 else 0.0
+
+    def consumir(self, quantidade=1):
+        self._repor()
+        self._tokens -= min(quantidade, self.capacidade)
+
+    def devolver(self, quantidade=1):
+        self._repor()
+        self._tokens = min(self.capacidade, self._tokens + min(quantidade, self.capacidade))
+
+    def pausar(self, segundos):
+        self._repor()
+        self._tokens = min(self._tokens, 0) - segundos * self.taxa
+
+
+class Disjuntor:
+    """Corta as chamadas ao LLM quando ele está falhando ou lento demais.
+
+    Fechado, conta as chamadas dos últimos ``janela`` segundos; com pelo
+    menos ``min_chamadas``, abre se a fração de falhas (erro ou mais de
+    ``lentidao`` segundos) chegar a ``taxa_falhas``. Aberto, recusa tudo por
+    ``tempo_aberto`` segundos. Depois fica meio aberto: deixa passar uma
+    chamada de teste, que fecha o disjuntor se der certo ou o reabre.
+
+    Timeouts demoram o próprio timeout para aparecer, então ``max_timeouts``
+    timeouts seguidos (sem sucesso no meio) abrem o disjuntor sem esperar
+    por ``min_chamadas``.
+    """
+
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    MEIO_ABERTO = 'meio_aberto'
+
+    def __init__(self, janela=60.0, min_chamadas=10, taxa_falhas=0.5, lentidao=20.0, tempo_aberto=30.0,
+                 max_timeouts=3):
+        self.janela = janela
+        self.min_chamadas = min_chamadas
+        self.taxa_falhas = taxa_falhas
+        self.lentidao = lentidao
+        self.tempo_aberto = tempo_aberto
+        self.max_timeouts = max_timeouts
+
+        self._chamadas = deque()
+        self._falhas = 0
+        self._timeouts_seguidos = 0
+        self._estado = self.FECHADO
+        self._aberto_ate = 0.0
+        self._teste_ate = 0.0
+
+    @property
+    def estado(self):
+        if self._estado == self.ABERTO and time.monotonic() >= self._aberto_ate:
+            self._estado = self.MEIO_ABERTO
+            logger.info("Disjuntor do LLM meio aberto: liberando uma chamada de teste")
+        return self._estado
+
+    def estados(self):
+        estado = self.estado
+        return {nome: int(nome == estado) for nome in (self.FECHADO, self.ABERTO, self.MEIO_ABERTO)}
+
+    def permitir(self):
+        estado = self.estado
+        if estado == self.FECHADO:
+            return True
+        if estado == self.MEIO_ABERTO:
+            agora = time.monotonic()
+            # Um teste por vez; se ele sumir sem resultado (ex.: cancelado),
+            # outro é liberado depois de tempo_aberto
+            if agora >= self._teste_ate:
+                self._teste_ate = agora + self.tempo_aberto
+                return True
+        return False
+
+    def registrar(self, duracao, erro=False, timeout=False):
+        falhou = erro or timeout or duracao > self.lentidao
+        estado = self.estado
+        if estado == self.MEIO_ABERTO:
+            if falhou:
+                self._abrir("chamada de teste falhou")
+            else:
+                self._estado = self.FECHADO
+                logger.info("Disjuntor do LLM fechado: chamada de teste bem-sucedida")
+            return
+        if estado == self.ABERTO:
+            # Chamada que começou antes da abertura
+            return
+
+        agora = time.monotonic()
+        self._chamadas.append((agora, falhou))
+        self._falhas += falhou
+        while self._chamadas[0][0] < agora - self.janela:
+            self._falhas -= self._chamadas.popleft()[1]
+
+        if timeout:
+            self._timeouts_seguidos += 1
+            if self._timeouts_seguidos >= self.max_timeouts:
+                self._abrir(f"{self._timeouts_seguidos} timeouts seguidos")
+                return
+        elif not falhou:
+            self._timeouts_seguidos = 0
+
+        total = len(self._chamadas)
+        if total >= self.min_chamadas and self._falhas / total >= self.taxa_falhas:
+            self._abrir(f"{self._falhas} de {total} chamadas com erro ou acima de {self.lentidao:g}s")
+
+    def _abrir(self, motivo):
+        self._estado = self.ABERTO
+        self._aberto_ate = time.monotonic() + self.tempo_aberto
+        self._teste_ate = 0.0
+        self._chamadas.clear()
+        self._falhas = 0
+        self._timeouts_seguidos = 0
+        ABERTURAS_DISJUNTOR.incrementar()
+        logger.warning(f"Disjuntor do LLM aberto por {self.tempo_aberto:g}s: {motivo}")
+
+
+class _Transmissao:
+    """Chunks de uma geração em streaming, repassados a todos que pediram o
+    mesmo prompt; quem entra depois recebe os chunks já produzidos."""
+
+    def __init__(self):
+        self.chunks = []
+        self.fim = False
+        self.erro = None
+        self.assinantes = 0
+        self.tarefa = None
+        self._novo = asyncio.Event()
+
+    def _avisar(self):
+        self._novo.set()
+        self._novo = asyncio.Event()
+
+    def publicar(self, chunk):
+        self.chunks.append(chunk)
+        self._avisar()
+
+    def encerrar(self, erro=None):
+        self.fim = True
+        self.erro = erro
+        self._avisar()
+
+    async def acompanhar(self):
+        i = 0
+        while True:
+            if i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            elif self.fim:
+                if self.erro is not None:
+                    raise self.erro
+                return
+            else:
+                await self._novo.wait()
+
+
+class ClienteLLM:
+    """Envolve um provedor de LLM com os limites de uso.
+
+    - ``concorrencia`` chamadas ao mesmo tempo; até ``fila_max`` esperam por
+      uma vaga e as demais são recusadas na hora (FilaLLMCheiaError).
+    - Quem esperar mais que ``fila_timeout`` segundos (vaga + balde) desiste
+      com EsperaLLMEsgotadaError.
+    - ``rpm`` e ``tpm`` dimensionam os baldes de requisições e de tokens do
+      prompt por minuto (0 desativa); cada nova tentativa também consome.
+    - Erros temporários são tentados de novo até ``max_tentativas`` vezes,
+      com espera aleatória entre 0 e ``espera_base * 2**tentativa`` (até
+      ``espera_max``) ou o retry-after do servidor, se for maior. No
+      streaming, só enquanto nenhum chunk tiver sido entregue.
+    - Prompts idênticos em andamento compartilham uma única chamada.
+    - Cada tentativa tem ``timeout`` segundos (no streaming, entre um chunk e
+      o próximo) e o resultado vai para o ``disjuntor``, se houver; com ele
+      aberto, as chamadas falham na hora com CircuitoAbertoError.
+    """
+
+    def __init__(self, provedor, concorrencia=8, fila_max=100, fila_timeout=15.0,
+                 rpm=0, tpm=0, max_tentativas=3, espera_base=2.0, espera_max=30.0,
+                 timeout=60.0, disjuntor=None, contar_tokens=None):
+        self.provedor = provedor
+        self.disjuntor = disjuntor
+        self.timeout = timeout
+        self.concorrencia = concorrencia
+        self.fila_max = fila_max
+        self.fila_timeout = fila_timeout
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self._contar_tokens = contar_tokens or (lambda prompt: len(prompt) // 4)
+
+        # Capacidade de 10 s da cota: absorve rajadas curtas sem estourar o minuto
+        self._balde_requisicoes = BaldeTokens(rpm / 60, max(rpm / 6, 1)) if rpm else None
+        self._balde_tokens = BaldeTokens(tpm / 60, max(tpm / 6, 1)) if tpm else None
+
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._aguardando = 0
+        self._em_execucao = 0
+        self._em_andamento = {}
+        self._transmissoes = {}
+
+    def estado_fila(self):
+        return {'aguardando': self._aguardando, 'em_execucao': self._em_execucao}
+
+    def _pedidos_cota(self, prompt):
+        return [(balde, quantidade) for balde, quantidade in (
+            (self._balde_requisicoes, 1),
+            (self._balde_tokens, self._contar_tokens(prompt) if self._balde_tokens else 0),
+        ) if balde]
+
+    def _reservar_cota(self, pedidos, limite):
+        espera = max((balde.espera(quantidade) for balde, quantidade in pedidos), default=0.0)
+        # Quem não vai caber no prazo desiste já, sem ocupar a cota
+        if espera > limite:
+            return None
+        for balde, quantidade in pedidos:
+            balde.consumir(quantidade)
+        return espera
+
+    @asynccontextmanager
+    async def _vaga(self, prompt):
+        # Chamadas sem espera passam por aqui sem suspender, então só quem
+        # realmente espera (cota ou vaga) aparece em _aguardando
+        if self._aguardando >= self.fila_max:
+            REJEITADAS.incrementar(motivo='fila_cheia')
+            raise FilaLLMCheiaError(f"Fila do LLM cheia ({self.fila_max} chamadas aguardando)")
+
+        self._aguardando += 1
+        inicio = time.perf_counter()
+        try:
+            # Primeiro a cota, depois a vaga: quem espera a cota não segura
+            # uma das ``concorrencia`` vagas parada
+            pedidos = self._pedidos_cota(prompt)
+            espera = self._reservar_cota(pedidos, self.fila_timeout)
+            if espera is None:
+                REJEITADAS.incrementar(motivo='timeout')
+                raise EsperaLLMEsgotadaError(
+                    f"Cota do LLM não libera a chamada em {self.fila_timeout:.0f}s"
+                )
+            try:
+                if espera:
+                    await asyncio.sleep(espera)
+                if self._semaforo.locked():
+                    restante = max(self.fila_timeout - (time.perf_counter() - inicio), 0)
+                    await asyncio.wait_for(self._semaforo.acquire(), restante)
+                else:
+                    # Com vaga livre, acquire retorna sem suspender
+                    await self._semaforo.acquire()
+            except BaseException as e:
+                # A chamada não vai acontecer: a cota reservada volta ao balde
+                for balde, quantidade in pedidos:
+                    balde.devolver(quantidade)
+                if isinstance(e, asyncio.TimeoutError):
+                    REJEITADAS.incrementar(motivo='timeout')
+                    raise EsperaLLMEsgotadaError(
+                        f"Chamada ao LLM esperou mais de {self.fila_timeout:.0f}s por uma vaga"
+                    ) from None
+                raise
+        finally:
+            self._aguardando -= 1
+            ESPERA_FILA.observar(time.perf_counter() - inicio)
+
+        self._em_execucao += 1
+        try:
+            yield
+        finally:
+            self._em_execucao -= 1
+            self._semaforo.release()
+
+    def _verificar_disjuntor(self):
+        if self.disjuntor and not self.disjuntor.permitir():
+            REJEITADAS.incrementar(motivo='circuito_aberto')
+            raise CircuitoAbertoError("Disjuntor do LLM aberto: chamadas suspensas temporariamente")
+
+    def _registrar_chamada(self, inicio, erro=None):
+        if self.disjuntor:
+            self.disjuntor.registrar(
+                time.perf_counter() - inicio,
+                erro=erro is not None,
+                timeout=isinstance(erro, TimeoutError)
+            )
+
+    async def _com_timeout(self, aguardavel):
+        try:
+            return await asyncio.wait_for(aguardavel, self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timeout: o LLM não respondeu em {self.timeout:g}s") from None
+
+    def _pode_tentar(self, erro, tentativa):
+        return self.provedor.erro_temporario(erro) and tentativa < self.max_tentativas - 1
+
+    async def _aguardar_nova_tentativa(self, erro, tentativa, modo):
+        espera = random.uniform(0, min(self.espera_max, self.espera_base * 2 ** tentativa))
+        sugerida = self.provedor.espera_sugerida(erro)
+        if sugerida is not None:
+            espera = max(espera, min(sugerida, self.espera_max))
+            # Vale para todas as chamadas, não só para esta
+            for balde in (self._balde_requisicoes, self._balde_tokens):
+                if balde:
+                    balde.pausar(sugerida)
+        logger.warning(
+            f"{type(erro).__name__} do LLM, aguardando {espera:.1f}s antes da tentativa {tentativa + 2}..."
+        )
+        RETENTATIVAS_LLM.incrementar(modo=modo)
+        await asyncio.sleep(espera)
+
+    async def _gerar_com_limite(self, prompt):
+        tentativa = 0
+        while True:
+            self._verificar_disjuntor()
+            try:
+                async with self._vaga(prompt):
+                    inicio = time.perf_counter()
+                    try:
+                        texto = await self._com_timeout(self.provedor.gerar(prompt))
+                    except Exception as e:
+                        self._registrar_chamada(inicio, erro=e)
+                        raise
+                    self._registrar_chamada(inicio)
+                    return texto
+            except Exception as e:
+                if not self._pode_tentar(e, tentativa):
+                    raise
+                await self._aguardar_nova_tentativa(e, tentativa, 'completa')
+                tentativa += 1
+
+    async def _stream_com_limite(self, prompt):
+        tentativa = 0
+        while True:
+            self._verificar_disjuntor()
+            emitiu = False
+            try:
+                async with self._vaga(prompt):
+                    inicio = time.perf_counter()
+                    chunks = self.provedor.gerar_stream(prompt)
+                    try:
+                        while True:
+                            try:
+                                chunk = await self._com_timeout(anext(chunks))
+                            except StopAsyncIteration:
+                                if not emitiu:
+                                    self._registrar_chamada(inicio)
+                                break
+                            except Exception as e:
+                                if not emitiu:
+                                    self._registrar_chamada(inicio, erro=e)
+                                raise
+                            if not emitiu:
+                                # No streaming, o disjuntor olha a espera pelo primeiro chunk
+                                self._registrar_chamada(inicio)
+                                emitiu = True
+                            yield chunk
+                    finally:
+                        await chunks.aclose()
+                return
+            except Exception as e:
+                # Depois do primeiro chunk não dá para recomeçar a resposta
+                if emitiu or not self._pode_tentar(e, tentativa):
+                    raise
+                await self._aguardar_nova_tentativa(e, tentativa, 'stream')
+                tentativa += 1
+
+    async def gerar(self, prompt):
+        tarefa = self._em_andamento.get(prompt)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(self._gerar_com_limite(prompt))
+            self._em_andamento[prompt] = tarefa
+
+            def concluir(t):
+                self._em_andamento.pop(prompt, None)
+                # Marca a exceção como lida mesmo se ninguém mais esperar
+                if not t.cancelled():
+                    t.exception()
+
+            tarefa.add_done_callback(concluir)
+        else:
+            COALESCIDAS.incrementar(modo='completa')
+
+        # shield: quem desiste não cancela a geração dos demais
+        return await asyncio.shield(tarefa)
+
+    async def _transmitir(self, prompt, transmissao):
+        try:
+            async for chunk in self._stream_com_limite(prompt):
+                transmissao.publicar(chunk)
+        except asyncio.CancelledError:
+            # Quem ainda acompanha recebe um erro comum, não CancelledError
+            transmissao.encerrar(GeracaoCanceladaError("Geração em streaming cancelada"))
+            raise
+        except Exception as e:
+            transmissao.encerrar(e)
+        else:
+            transmissao.encerrar()
+        finally:
+            if self._transmissoes.get(prompt) is transmissao:
+                del self._transmissoes[prompt]
+
+    async def gerar_stream(self, prompt):
+        transmissao = self._transmissoes.get(prompt)
+        if transmissao is None:
+            transmissao = self._transmissoes[prompt] = _Transmissao()
+            transmissao.tarefa = asyncio.ensure_future(self._transmitir(prompt, transmissao))
+        else:
+            COALESCIDAS.incrementar(modo='stream')
+
+        transmissao.assinantes += 1
+        try:
+            async for chunk in transmissao.acompanhar():
+                yield chunk
+        finally:
+            transmissao.assinantes -= 1
+            # Todos desistiram (ex.: clientes desconectados): para a geração.
+            # Quem pedir o mesmo prompt depois disso começa outra.
+            if not transmissao.assinantes and not transmissao.fim:
+                if self._transmissoes.get(prompt) is transmissao:
+                    del self._transmissoes[prompt]
+                transmissao.tarefa.cancel()
+
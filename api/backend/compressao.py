@@ -0,0 +1,92 @@
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = ('application/json', 'text/', 'application/javascript')
+
+
+def _codificacao(accept_encoding):
+    aceitas = {parte.split(';')[0].strip().lower() for parte in accept_encoding.split(',')}
+    if brotli is not None and 'br' in aceitas:
+        return 'br'
+    if 'gzip' in aceitas:
+        return 'gzip'
+    return None
+
+
+def comprimir(corpo, codificacao):
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=4)
+    return gzip.compress(corpo, compresslevel=6)
+
+
+class CompressaoMiddleware:
+    """Comprime com brotli (se o pacote estiver instalado) ou gzip as
+    respostas completas acima de ``minimo_bytes``.
+
+    Respostas em streaming (mais de uma mensagem de corpo, como o SSE da
+    Yoyo) passam sem compressão: o GZipMiddleware do Starlette seguraria os
+    tokens no buffer do compressor até juntar um bloco.
+    """
+
+    def __init__(self, app, minimo_bytes=1024):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        codificacao = _codificacao(Headers(scope=scope).get('accept-encoding', ''))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        repassando = False
+
+        async def enviar(mensagem):
+            nonlocal inicio, repassando
+
+            if mensagem['type'] == 'http.response.start':
+                inicio = mensagem
+                return
+
+            if repassando or mensagem['type'] != 'http.response.body':
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get('body', b'')
+            headers = MutableHeaders(raw=inicio['headers'])
+            tipo = headers.get('content-type', '')
+
+            if (
+                mensagem.get('more_body', False)
+                or 'content-encoding' in headers
+                or len(corpo) < self.minimo_bytes
+                or not tipo.startswith(TIPOS_COMPRIMIVEIS)
+            ):
+                repassando = True
+                await send(inicio)
+                await send(mensagem)
+                return
+
+            corpo = comprimir(corpo, codificacao)
+            headers['Content-Encoding'] = codificacao
+            headers['Content-Length'] = str(len(corpo))
+            headers.add_vary_header('Accept-Encoding')
+            # A ETag identifica os dados, não os bytes: marca a variante
+            # comprimida como fraca
+            if 'etag' in headers and not headers['etag'].startswith('W/'):
+                headers['ETag'] = 'W/' + headers['etag']
+
+            await send(inicio)
+            await send({**mensagem, 'body': corpo})
+
+        await self.app(scope, receive, enviar)
@@ -1,10 +1,28 @@
 import pg8000.native
+import base64
 import os
+import time
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 
+from .cache import CacheLRU, notificar_escrita, registrar_invalidacao
+from .estatisticas import EstatisticasEventos, NIVEIS_RISCO, normalizar_nivel
+from .metricas import Medidor, medir, observar, registrar
+from .modelos import (
+    COLUNAS_EVENTO,
+    COLUNAS_EVENTO_BUSCA,
+    COLUNAS_EVENTO_CONSULTA,
+    COLUNAS_EVENTO_RESUMO,
+    linhas_para_modelos,
+    lista_select,
+    modelo_linha
+)
+from .pool import PoolConexoes
+
 load_dotenv()
 
-def get_db_connection():
+@medir('db.conexao')
+def _criar_conexao():
     try:
         conn = pg8000.native.Connection(
             host=os.getenv('DB_HOST', 'localhost'),
@@ -18,207 +36,415 @@ def get_db_connection():
         print(f'Erro ao conectar no banco: {e}')
         raise
 
-def get_eventos(data_inicio=None, data_fim=None, nivel_risco=None):
-    conn = get_db_connection()
-    
-    query = """
-SELECT
-  evento_id, data_evento, data_resolucao, tempo_resolucao_horas,
-  nivel_risco, descricao, impacto_financeiro, impacto_cliente,
-  clientes_afetados, tempo_indisponibilidade, frequencia_evento,
-  criticidade_sistema, falha_processo, fraude_interna, recorrencia,
-  status, created_at
-FROM eventos_risco
-WHERE 1=1
-"""
-    params = {}
+_pool = PoolConexoes(
+    _criar_conexao,
+    tamanho_max=int(os.getenv('DB_POOL_MAX', 10)),
+    timeout_espera=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    max_ocioso=float(os.getenv('DB_POOL_MAX_OCIOSO', 300)),
+    max_vida=float(os.getenv('DB_POOL_MAX_VIDA', 1800)),
+    intervalo_checagem=float(os.getenv('DB_POOL_CHECAGEM', 30)),
+    observar_espera=lambda segundos: observar('db.aquisicao_conexao', segundos)
+)
+
+registrar(Medidor(
+    'risco_pool_conexoes',
+    'Conexões do pool por estado',
+    lambda: {estado: _pool.metricas()[estado] for estado in ('em_uso', 'ociosas')},
+    rotulo='estado'
+))
+
+_cache_eventos = registrar_invalidacao(CacheLRU(
+    max_entradas=int(os.getenv('CACHE_EVENTOS_MAX', 1000)),
+    ttl=float(os.getenv('CACHE_EVENTOS_TTL', 60)),
+    nome='eventos_por_id'
+))
+
+# Se as tabelas/índices das migrações existem; verificado de novo a cada
+# DB_RECHECAGEM_SCHEMA segundos, então migrar não exige reiniciar a API
+RECHECAGEM_SCHEMA = float(os.getenv('DB_RECHECAGEM_SCHEMA', 60))
+_recursos_schema = {}
+_ultima_versao_dados = None
+
+LOTE_LEITURA = int(os.getenv('DB_LOTE_LEITURA', 10000))
+
+# Expressão do índice GIN da busca textual (migração 004); as consultas
+# precisam usar exatamente este texto para o índice ser escolhido
+DESCRICAO_TSV = "to_tsvector('portuguese', f_unaccent(COALESCE(descricao, '')))"
+
+def get_db_connection():
+    return _pool.conexao()
+
+def get_metricas_pool():
+    return _pool.metricas()
+
+def _para_data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"Data inválida: {valor} (use YYYY-MM-DD)")
+
+
+def _filtro_periodo(params, data_inicio=None, data_fim=None, coluna='data_evento'):
+    # Intervalo semiaberto [data_inicio, data_fim + 1 dia): a coluna fica
+    # fora de funções e o índice em data_evento pode ser usado
+    filtro = ""
 
     if data_inicio:
-        query += " AND DATE(data_evento) >= :data_inicio"
-        params["data_inicio"] = data_inicio
+        filtro += f" AND {coluna} >= :data_inicio"
+        params["data_inicio"] = _para_data(data_inicio)
 
     if data_fim:
-        query += " AND DATE(data_evento) <= :data_fim"
-        params["data_fim"] = data_fim
+        filtro += f" AND {coluna} < :data_fim_exclusivo"
+        params["data_fim_exclusivo"] = _para_data(data_fim) + timedelta(days=1)
+
+    return filtro
+
+
+def _intervalo_mes(mes):
+    try:
+        ano, numero = (int(parte) for parte in mes.split('-'))
+        inicio = date(ano, numero, 1)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Mês inválido: {mes} (use YYYY-MM)")
+    fim = date(ano + 1, 1, 1) if numero == 12 else date(ano, numero + 1, 1)
+    return inicio, fim
+
+
+def _consulta_eventos(data_inicio=None, data_fim=None, nivel_risco=None):
+    query = f"SELECT {lista_select(COLUNAS_EVENTO)} FROM eventos_risco WHERE 1=1"
+    params = {}
+
+    query += _filtro_periodo(params, data_inicio, data_fim)
     
     if nivel_risco:
         query += " AND nivel_risco = :nivel_risco"
-        params["nivel_risco"] = nivel_risco
+        params["nivel_risco"] = normalizar_nivel(nivel_risco)
 
     query += " ORDER BY data_evento DESC"
 
-    eventos = conn.run(query, **params)
-    conn.close()
-    
-    colunas = ['evento_id', 'data_evento', 'data_resolucao', 'tempo_resolucao_horas',
-               'nivel_risco', 'descricao', 'impacto_financeiro', 'impacto_cliente', 
-               'clientes_afetados', 'tempo_indisponibilidade', 'frequencia_evento',
-               'criticidade_sistema', 'falha_processo', 'fraude_interna', 
-               'recorrencia', 'status', 'created_at']
-    
-    return [dict(zip(colunas, evento)) for evento in eventos]
+    return query, params
+
+def _ler_em_lotes(conn, query, params, colunas, lote=None):
+    """Executa ``query`` por um cursor no servidor e converte as linhas a
+    cada FETCH, para que a lista crua do pg8000 nunca exista inteira ao
+    lado das linhas já convertidas."""
+    modelo = modelo_linha(tuple(colunas))
+    lote = lote or LOTE_LEITURA
+    resultado = []
+
+    # Em caso de erro, o pool desfaz a transação ao devolver a conexão
+    conn.run("BEGIN")
+    conn.run(f"DECLARE leitura_eventos NO SCROLL CURSOR FOR {query}", **params)
+    while True:
+        linhas = conn.run(f"FETCH {int(lote)} FROM leitura_eventos")
+        resultado.extend(modelo(*linha) for linha in linhas)
+        if len(linhas) < lote:
+            break
+    conn.run("COMMIT")
+
+    return resultado
+
+@medir('db.get_eventos')
+def get_eventos(data_inicio=None, data_fim=None, nivel_risco=None):
+    query, params = _consulta_eventos(data_inicio, data_fim, nivel_risco)
 
-def get_evento_by_id(evento_id):
-    conn = get_db_connection()
+    with get_db_connection() as conn:
+        return _ler_em_lotes(conn, query, params, COLUNAS_EVENTO)
 
-    resultado = conn.run(
+def _codificar_cursor(data_evento, evento_id):
+    bruto = f"{data_evento.isoformat()}|{evento_id}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor):
+    try:
+        preenchido = cursor + '=' * (-len(cursor) % 4)
+        data_iso, evento_id = base64.urlsafe_b64decode(preenchido).decode().split('|', 1)
+        return datetime.fromisoformat(data_iso), evento_id
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def _consulta_pagina(data_inicio=None, data_fim=None, nivel_risco=None,
+                     cursor=None, limite=500, campos=None):
+    if campos:
+        invalidos = [c for c in campos if c not in COLUNAS_EVENTO]
+        if invalidos:
+            raise ValueError(f"Campos inválidos: {', '.join(invalidos)}")
+        colunas = ('evento_id', 'data_evento') + tuple(c for c in COLUNAS_EVENTO if c in campos and c not in ('evento_id', 'data_evento'))
+    else:
+        colunas = COLUNAS_EVENTO
+
+    query = f"SELECT {lista_select(colunas)} FROM eventos_risco WHERE 1=1"
+    params = {}
+
+    query += _filtro_periodo(params, data_inicio, data_fim)
+
+    if nivel_risco:
+        query += " AND nivel_risco = :nivel_risco"
+        params["nivel_risco"] = normalizar_nivel(nivel_risco)
+
+    if cursor:
+        cursor_data, cursor_id = _decodificar_cursor(cursor)
+        query += " AND (data_evento, evento_id) < (:cursor_data, :cursor_id)"
+        params["cursor_data"] = cursor_data
+        params["cursor_id"] = cursor_id
+
+    # Uma linha a mais indica se existe próxima página
+    query += " ORDER BY data_evento DESC, evento_id DESC LIMIT :limite"
+    params["limite"] = limite + 1
+
+    return query, params, colunas
+
+
+@medir('db.get_eventos_pagina')
+def get_eventos_pagina(data_inicio=None, data_fim=None, nivel_risco=None,
+                       cursor=None, limite=500, campos=None):
+    """Página de eventos em ordem (data_evento, evento_id) decrescente.
+
+    Retorna (eventos, proximo_cursor), com os eventos como dataclasses de
+    modelos.py; proximo_cursor é None na última página. ``campos`` restringe
+    as colunas retornadas, mas evento_id e data_evento sempre vêm junto
+    porque formam o cursor.
     """
-    SELECT
-          evento_id, data_evento, data_resolucao, tempo_resolucao_horas,
-          nivel_risco, descricao, impacto_financeiro, impacto_cliente,
-          clientes_afetados, tempo_indisponibilidade, frequencia_evento,
-          criticidade_sistema, falha_processo, fraude_interna, recorrencia,
-          status, created_at
-        FROM eventos_risco
-        WHERE evento_id = :evento_id
-        """,
-        evento_id=evento_id
-)
-    
-    conn.close()
+    query, params, colunas = _consulta_pagina(data_inicio, data_fim, nivel_risco, cursor, limite, campos)
+
+    with get_db_connection() as conn:
+        linhas = conn.run(query, **params)
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = _codificar_cursor(linhas[-1][1], linhas[-1][0])
+
+    return linhas_para_modelos(colunas, linhas), proximo_cursor
+
 
-    if resultado:
-        colunas = ['evento_id', 'data_evento', 'data_resolucao', 'tempo_resolucao_horas',
-                   'nivel_risco', 'descricao', 'impacto_financeiro', 'impacto_cliente',
-                   'clientes_afetados', 'tempo_indisponibilidade', 'frequencia_evento',
-                   'criticidade_sistema', 'falha_processo', 'fraude_interna',
-                   'recorrencia', 'status', 'created_at']
-        return dict(zip(colunas, resultado[0]))
+@medir('db.get_totais_por_nivel')
+def get_totais_por_nivel(data_inicio=None, data_fim=None, nivel_risco=None):
+    if _usar_rollups():
+        query = "SELECT nivel_risco, SUM(total) FROM eventos_risco_diario WHERE 1=1"
+        coluna_data = "dia"
+    else:
+        query = "SELECT nivel_risco, COUNT(*) FROM eventos_risco WHERE 1=1"
+        coluna_data = "data_evento"
+    params = {}
+
+    query += _filtro_periodo(params, data_inicio, data_fim, coluna=coluna_data)
+
+    if nivel_risco:
+        query += " AND nivel_risco = :nivel_risco"
+        params["nivel_risco"] = normalizar_nivel(nivel_risco)
+
+    query += " GROUP BY nivel_risco"
+
+    with get_db_connection() as conn:
+        resultado = conn.run(query, **params)
+
+    totais = {nivel: 0 for nivel in NIVEIS_RISCO}
+    for nivel, quantidade in resultado:
+        nivel = normalizar_nivel(nivel)
+        totais[nivel] = totais.get(nivel, 0) + int(quantidade or 0)
+
+    return {'total': sum(totais.values()), 'por_nivel': totais}
 
-    return None
 
+@medir('db.get_evento_by_id')
+def get_evento_by_id(evento_id):
+    eventos = get_eventos_by_ids([evento_id])
+    return eventos[0] if eventos else None
+
+@medir('db.get_eventos_by_ids')
+def get_eventos_by_ids(ids):
+    """Eventos com os IDs pedidos, na ordem pedida (IDs inexistentes ficam de
+    fora). Os que não estão no cache vêm do banco numa única consulta."""
+    ids = list(dict.fromkeys(ids))
+    encontrados, faltando, geracao = _cache_eventos.obter_varios(ids)
+
+    if faltando:
+        with get_db_connection() as conn:
+            resultado = conn.run(
+                f"""
+                SELECT {lista_select(COLUNAS_EVENTO)}
+                FROM eventos_risco
+                WHERE evento_id = ANY(:ids)
+                """,
+                ids=faltando
+            )
+
+        do_banco = {evento.evento_id: evento for evento in linhas_para_modelos(COLUNAS_EVENTO, resultado)}
+        _cache_eventos.guardar_varios(do_banco, geracao)
+        encontrados.update(do_banco)
+
+    # As linhas são as mesmas guardadas no cache: não devem ser alteradas
+    return [encontrados[evento_id] for evento_id in ids if evento_id in encontrados]
+
+def get_metricas_cache_eventos():
+    return _cache_eventos.metricas()
+
+@medir('db.atualizar_status_evento')
 def atualizar_status_evento(evento_id, novo_status):
     status_validos = ['aberto', 'em_andamento', 'resolvido']
     if novo_status not in status_validos:
         return {"sucesso": False, "erro": f"Status inválido. Use: {', '.join(status_validos)}"}
 
-    conn = get_db_connection()
     try:
-        conn.run(
-            """
-            UPDATE eventos_risco
-            SET status = :status
-            WHERE evento_id = :evento_id
-            """,
-            status=novo_status,
-            evento_id=evento_id
-        )
-        conn.close()
+        with get_db_connection() as conn:
+            conn.run(
+                """
+                UPDATE eventos_risco
+                SET status = :status
+                WHERE evento_id = :evento_id
+                """,
+                status=novo_status,
+                evento_id=evento_id
+            )
+        notificar_escrita()
         return {"sucesso": True, "evento_id": evento_id, "novo_status": novo_status}
     except Exception as e:
-        conn.close()
         return {"sucesso": False, "erro": str(e)}
 
 
-def get_estatisticas_completas():
-    conn = get_db_connection()
+@medir('db.get_versao_dados')
+def get_versao_dados():
+    """Contador incrementado a cada escrita em eventos_risco (migração 003),
+    ou None se a migração ainda não foi aplicada.
 
-    stats = {}
+    Escritas de outros processos (ingestão, reclassificação, outros workers)
+    não passam por notificar_escrita deste; quando a versão muda, os caches
+    locais são invalidados aqui.
+    """
+    global _ultima_versao_dados
 
-    resultado = conn.run("""
-        SELECT
-            COUNT(*) as total,
-            SUM(CASE WHEN nivel_risco = 'Crítico' THEN 1 ELSE 0 END) as criticos,
-            SUM(CASE WHEN nivel_risco = 'Alto' THEN 1 ELSE 0 END) as altos,
-            SUM(CASE WHEN nivel_risco = 'Médio' THEN 1 ELSE 0 END) as medios,
-            SUM(CASE WHEN nivel_risco = 'Baixo' THEN 1 ELSE 0 END) as baixos
-        FROM eventos_risco
-    """)
-    if resultado:
-        stats['total_eventos'] = resultado[0][0]
-        stats['criticos'] = resultado[0][1]
-        stats['altos'] = resultado[0][2]
-        stats['medios'] = resultado[0][3]
-        stats['baixos'] = resultado[0][4]
-
-    resultado = conn.run("""
-        SELECT
-            COALESCE(SUM(impacto_financeiro), 0) as total,
-            COALESCE(AVG(impacto_financeiro), 0) as media
-        FROM eventos_risco
-    """)
-    if resultado:
-        stats['impacto_financeiro_total'] = float(resultado[0][0])
-        stats['impacto_financeiro_medio'] = float(resultado[0][1])
+    if not _recurso_ativo('versao_dados', "SELECT to_regclass('versao_dados') IS NOT NULL"):
+        return None
 
-    resultado = conn.run("""
-        SELECT COALESCE(SUM(clientes_afetados), 0) FROM eventos_risco
-    """)
-    if resultado:
-        stats['total_clientes_afetados'] = resultado[0][0]
-
-    resultado = conn.run("""
-        SELECT
-            SUM(CASE WHEN status = 'aberto' THEN 1 ELSE 0 END) as abertos,
-            SUM(CASE WHEN status = 'em_andamento' THEN 1 ELSE 0 END) as em_andamento,
-            SUM(CASE WHEN status = 'resolvido' THEN 1 ELSE 0 END) as resolvidos
-        FROM eventos_risco
-    """)
-    if resultado:
-        stats['abertos'] = resultado[0][0]
-        stats['em_andamento'] = resultado[0][1]
-        stats['resolvidos'] = resultado[0][2]
+    with get_db_connection() as conn:
+        resultado = conn.run("SELECT versao FROM versao_dados WHERE id = 1")
 
-    resultado = conn.run("""
-        SELECT MIN(data_evento), MAX(data_evento) FROM eventos_risco
-    """)
-    if resultado and resultado[0][0]:
-        stats['data_mais_antiga'] = str(resultado[0][0])
-        stats['data_mais_recente'] = str(resultado[0][1])
+    versao = resultado[0][0] if resultado else None
+    anterior, _ultima_versao_dados = _ultima_versao_dados, versao
+    if anterior is not None and versao != anterior:
+        notificar_escrita()
+    return versao
 
-    conn.close()
-    return stats
 
+def _recurso_ativo(nome, consulta):
+    ativo, verificado_em = _recursos_schema.get(nome, (None, 0.0))
+    if ativo is None or time.monotonic() - verificado_em >= RECHECAGEM_SCHEMA:
+        with get_db_connection() as conn:
+            resultado = conn.run(consulta)
+        ativo = bool(resultado[0][0])
+        _recursos_schema[nome] = (ativo, time.monotonic())
+    return ativo
 
-def get_top_eventos_criticos(limite=10):
-    conn = get_db_connection()
 
-    resultado = conn.run("""
-        SELECT
-            evento_id, data_evento, nivel_risco, descricao,
-            impacto_financeiro, clientes_afetados, status
-        FROM eventos_risco
-        WHERE nivel_risco IN ('Crítico', 'Alto')
-        ORDER BY impacto_financeiro DESC
-        LIMIT :limite
-    """, limite=limite)
+def _usar_rollups():
+    if os.getenv('USAR_ROLLUPS', '1') == '0':
+        return False
+    return _recurso_ativo('rollups', "SELECT to_regclass('eventos_risco_mensal') IS NOT NULL")
+
+
+@medir('db.get_estatisticas_agregadas')
+def get_estatisticas_agregadas():
+    if _usar_rollups():
+        query = """
+            SELECT
+                nivel_risco,
+                status,
+                SUM(total),
+                SUM(impacto_total),
+                SUM(impacto_qtd),
+                SUM(clientes_total),
+                SUM(clientes_qtd),
+                MIN(data_min) FILTER (WHERE total > 0),
+                MAX(data_max) FILTER (WHERE total > 0)
+            FROM eventos_risco_mensal
+            GROUP BY nivel_risco, status
+        """
+    else:
+        query = """
+            SELECT
+                nivel_risco,
+                status,
+                COUNT(*) as total,
+                COALESCE(SUM(impacto_financeiro), 0) as impacto_total,
+                COUNT(*) FILTER (WHERE impacto_financeiro IS NOT NULL) as impacto_qtd,
+                COALESCE(SUM(clientes_afetados), 0) as clientes_total,
+                COUNT(*) FILTER (WHERE clientes_afetados IS NOT NULL) as clientes_qtd,
+                MIN(data_evento) as data_min,
+                MAX(data_evento) as data_max
+            FROM eventos_risco
+            GROUP BY nivel_risco, status
+        """
+
+    with get_db_connection() as conn:
+        grupos = conn.run(query)
 
-    conn.close()
+    return EstatisticasEventos.de_grupos(grupos)
 
-    colunas = ['evento_id', 'data_evento', 'nivel_risco', 'descricao',
-               'impacto_financeiro', 'clientes_afetados', 'status']
 
-    return [dict(zip(colunas, ev)) for ev in resultado]
+@medir('db.get_estatisticas_completas')
+def get_estatisticas_completas():
+    return get_estatisticas_agregadas().como_dict()
 
 
+@medir('db.get_top_eventos_criticos')
+def get_top_eventos_criticos(limite=10):
+    with get_db_connection() as conn:
+        resultado = conn.run(f"""
+            SELECT {lista_select(COLUNAS_EVENTO_RESUMO)}
+            FROM eventos_risco
+            WHERE nivel_risco IN ('Crítico', 'Alto')
+            ORDER BY impacto_financeiro DESC
+            LIMIT :limite
+        """, limite=limite)
+
+    return linhas_para_modelos(COLUNAS_EVENTO_RESUMO, resultado)
+
+
+@medir('db.get_eventos_por_mes')
 def get_eventos_por_mes():
-    conn = get_db_connection()
-
-    resultado = conn.run("""
-        SELECT
-            TO_CHAR(data_evento, 'YYYY-MM') as mes,
-            COUNT(*) as total,
-            SUM(CASE WHEN nivel_risco = 'Crítico' THEN 1 ELSE 0 END) as criticos,
-            SUM(impacto_financeiro) as impacto_total
-        FROM eventos_risco
-        GROUP BY TO_CHAR(data_evento, 'YYYY-MM')
-        ORDER BY mes DESC
-        LIMIT 12
-    """)
+    if _usar_rollups():
+        query = """
+            SELECT
+                TO_CHAR(mes, 'YYYY-MM') as mes,
+                SUM(total) as total,
+                COALESCE(SUM(total) FILTER (WHERE nivel_risco = 'Crítico'), 0) as criticos,
+                SUM(impacto_total) as impacto_total
+            FROM eventos_risco_mensal
+            GROUP BY mes
+            HAVING SUM(total) > 0
+            ORDER BY mes DESC
+            LIMIT 12
+        """
+    else:
+        query = """
+            SELECT
+                TO_CHAR(data_evento, 'YYYY-MM') as mes,
+                COUNT(*) as total,
+                SUM(CASE WHEN nivel_risco = 'Crítico' THEN 1 ELSE 0 END) as criticos,
+                SUM(impacto_financeiro) as impacto_total
+            FROM eventos_risco
+            GROUP BY TO_CHAR(data_evento, 'YYYY-MM')
+            ORDER BY mes DESC
+            LIMIT 12
+        """
 
-    conn.close()
+    with get_db_connection() as conn:
+        resultado = conn.run(query)
 
     return [{'mes': r[0], 'total': r[1], 'criticos': r[2], 'impacto': float(r[3] or 0)} for r in resultado]
 
 
-def buscar_eventos_dinamico(nivel_risco=None, status=None, ordem='impacto', limite=20, mes=None):
-    conn = get_db_connection()
-
-    query = """
-        SELECT
-            evento_id, data_evento, nivel_risco, descricao,
-            impacto_financeiro, clientes_afetados,
-            tempo_indisponibilidade, criticidade_sistema, status
+def _consulta_dinamica(nivel_risco=None, status=None, ordem='impacto', limite=20, mes=None,
+                       termo=None, texto_indexado=True):
+    query = f"""
+        SELECT {lista_select(COLUNAS_EVENTO_CONSULTA)}
         FROM eventos_risco
         WHERE 1=1
     """
@@ -226,15 +452,24 @@ def buscar_eventos_dinamico(nivel_risco=None, status=None, ordem='impacto', limi
 
     if nivel_risco:
         query += " AND nivel_risco = :nivel_risco"
-        params["nivel_risco"] = nivel_risco
+        params["nivel_risco"] = normalizar_nivel(nivel_risco)
 
     if status:
         query += " AND status = :status"
         params["status"] = status
 
     if mes:
-        query += " AND TO_CHAR(data_evento, 'YYYY-MM') = :mes"
-        params["mes"] = mes
+        query += " AND data_evento >= :mes_inicio AND data_evento < :mes_fim"
+        params["mes_inicio"], params["mes_fim"] = _intervalo_mes(mes)
+
+    if termo:
+        if texto_indexado:
+            query += f" AND {DESCRICAO_TSV} @@ websearch_to_tsquery('portuguese', f_unaccent(:termo))"
+            params["termo"] = termo
+        else:
+            for i, t in enumerate(_termos_busca(termo)):
+                query += f" AND LOWER(descricao) LIKE :termo{i}"
+                params[f"termo{i}"] = _padrao_like(t)
 
     if ordem == 'impacto':
         query += " ORDER BY impacto_financeiro DESC"
@@ -248,63 +483,235 @@ def buscar_eventos_dinamico(nivel_risco=None, status=None, ordem='impacto', limi
     query += " LIMIT :limite"
     params["limite"] = limite
 
-    resultado = conn.run(query, **params)
-    conn.close()
+    return query, params
 
-    colunas = ['evento_id', 'data_evento', 'nivel_risco', 'descricao',
-               'impacto_financeiro', 'clientes_afetados',
-               'tempo_indisponibilidade', 'criticidade_sistema', 'status']
 
-    return [dict(zip(colunas, ev)) for ev in resultado]
+@medir('db.buscar_eventos_dinamico')
+def buscar_eventos_dinamico(nivel_risco=None, status=None, ordem='impacto', limite=20, mes=None, termo=None):
+    texto_indexado = bool(termo) and _usar_busca_texto()
+    query, params = _consulta_dinamica(nivel_risco, status, ordem, limite, mes, termo, texto_indexado)
 
+    with get_db_connection() as conn:
+        resultado = conn.run(query, **params)
+
+    return linhas_para_modelos(COLUNAS_EVENTO_CONSULTA, resultado)
+
+
+def _usar_busca_texto():
+    # Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido
+    return _recurso_ativo('busca_texto', """
+        SELECT COALESCE(
+            (SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('idx_descricao_tsv')),
+            false
+        )
+    """)
 
-def buscar_eventos_por_texto(termo, limite=15):
-    conn = get_db_connection()
 
-    resultado = conn.run("""
-        SELECT
-            evento_id, data_evento, nivel_risco, descricao,
-            impacto_financeiro, clientes_afetados, status
+def _termos_busca(termo):
+    termos = [t for t in termo.lower().split() if t]
+    if not termos:
+        raise ValueError("Termo de busca vazio")
+    return termos
+
+
+def _padrao_like(termo):
+    escapado = termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escapado}%"
+
+
+def _consulta_texto(termo, limite=15):
+    # websearch_to_tsquery aceita vários termos (E), "frases", "or" e -exclusão
+    query = f"""
+        SELECT {lista_select(COLUNAS_EVENTO_BUSCA)}, ts_rank({DESCRICAO_TSV}, consulta) AS relevancia
+        FROM eventos_risco, websearch_to_tsquery('portuguese', f_unaccent(:termo)) AS consulta
+        WHERE {DESCRICAO_TSV} @@ consulta
+        ORDER BY relevancia DESC, impacto_financeiro DESC NULLS LAST
+        LIMIT :limite
+    """
+    return query, {'termo': termo, 'limite': limite}
+
+
+def _consulta_texto_trigrama(termo, limite=15):
+    termos = _termos_busca(termo)
+    params = {'termo': termo.lower(), 'limite': limite}
+    condicoes = []
+    for i, t in enumerate(termos):
+        condicoes.append(f"LOWER(f_unaccent(descricao)) LIKE f_unaccent(:p{i})")
+        params[f'p{i}'] = _padrao_like(t)
+
+    query = f"""
+        SELECT {lista_select(COLUNAS_EVENTO_BUSCA)},
+               similarity(LOWER(f_unaccent(descricao)), f_unaccent(:termo)) AS relevancia
         FROM eventos_risco
-        WHERE LOWER(descricao) LIKE LOWER(:termo)
-        ORDER BY impacto_financeiro DESC
+        WHERE {' AND '.join(condicoes)}
+        ORDER BY relevancia DESC, impacto_financeiro DESC NULLS LAST
         LIMIT :limite
-    """, termo=f"%{termo}%", limite=limite)
+    """
+    return query, params
+
+
+def _consulta_texto_like(termo, limite=15):
+    # Sem a migração 004: varredura com LIKE, um filtro por termo
+    termos = _termos_busca(termo)
+    params = {'limite': limite}
+    condicoes = []
+    for i, t in enumerate(termos):
+        condicoes.append(f"LOWER(descricao) LIKE :p{i}")
+        params[f'p{i}'] = _padrao_like(t)
+
+    query = f"""
+        SELECT {lista_select(COLUNAS_EVENTO_BUSCA)}, NULL AS relevancia
+        FROM eventos_risco
+        WHERE {' AND '.join(condicoes)}
+        ORDER BY impacto_financeiro DESC NULLS LAST
+        LIMIT :limite
+    """
+    return query, params
+
 
-    conn.close()
+@medir('db.buscar_eventos_por_texto')
+def buscar_eventos_por_texto(termo, limite=15):
+    """Busca em descricao por palavras (full-text em português, sem acento),
+    ordenada por relevância e depois por impacto. Se nenhuma palavra casar,
+    tenta os termos como trechos de texto (pg_trgm)."""
+    termo = (termo or '').strip()
+    _termos_busca(termo)
+
+    if not _usar_busca_texto():
+        query, params = _consulta_texto_like(termo, limite)
+        with get_db_connection() as conn:
+            resultado = conn.run(query, **params)
+        return linhas_para_modelos(COLUNAS_EVENTO_BUSCA, resultado)
+
+    with get_db_connection() as conn:
+        query, params = _consulta_texto(termo, limite)
+        resultado = conn.run(query, **params)
 
-    colunas = ['evento_id', 'data_evento', 'nivel_risco', 'descricao',
-               'impacto_financeiro', 'clientes_afetados', 'status']
+        if not resultado:
+            query, params = _consulta_texto_trigrama(termo, limite)
+            resultado = conn.run(query, **params)
 
-    return [dict(zip(colunas, ev)) for ev in resultado]
+    return linhas_para_modelos(COLUNAS_EVENTO_BUSCA, resultado)
 
 
+@medir('db.get_resumo_por_nivel')
 def get_resumo_por_nivel():
-    conn = get_db_connection()
+    return get_estatisticas_agregadas().resumo_por_nivel()
+
+
+GRANULARIDADES = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+
+_CHAVES_SERIE = {'Crítico': 'critico', 'Alto': 'alto', 'Médio': 'medio', 'Baixo': 'baixo'}
+
+
+def _inicio_bucket(dia, granularidade):
+    if granularidade == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == 'mes':
+        return dia.replace(day=1)
+    return dia
+
 
-    niveis = ['Crítico', 'Alto', 'Médio', 'Baixo']
-    resumo = {}
+def _ponto_vazio():
+    return {'critico': 0, 'alto': 0, 'medio': 0, 'baixo': 0, 'total': 0, 'impacto_total': 0.0}
 
-    for nivel in niveis:
-        resultado = conn.run("""
+
+def _proximo_bucket(dia, granularidade):
+    if granularidade == 'semana':
+        return dia + timedelta(days=7)
+    if granularidade == 'mes':
+        return date(dia.year + 1, 1, 1) if dia.month == 12 else date(dia.year, dia.month + 1, 1)
+    return dia + timedelta(days=1)
+
+
+def _consulta_resumo_dashboard(data_inicio=None, data_fim=None, granularidade='dia'):
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: {granularidade} (use {', '.join(GRANULARIDADES)})")
+
+    if _usar_rollups():
+        query = """
             SELECT
-                COUNT(*) as total,
-                COALESCE(SUM(impacto_financeiro), 0) as impacto_total,
-                COALESCE(AVG(impacto_financeiro), 0) as impacto_medio,
-                COALESCE(SUM(clientes_afetados), 0) as clientes_total,
-                COALESCE(AVG(clientes_afetados), 0) as clientes_medio
+                date_trunc(:campo, dia::timestamp)::date as bucket,
+                nivel_risco,
+                status,
+                SUM(total),
+                SUM(impacto_total),
+                SUM(impacto_qtd),
+                SUM(clientes_total),
+                SUM(clientes_qtd),
+                MIN(data_min),
+                MAX(data_max)
+            FROM eventos_risco_diario
+            WHERE total > 0
+        """
+        coluna_data = "dia"
+    else:
+        query = """
+            SELECT
+                date_trunc(:campo, data_evento)::date as bucket,
+                nivel_risco,
+                COALESCE(status, ''),
+                COUNT(*),
+                COALESCE(SUM(impacto_financeiro), 0),
+                COUNT(*) FILTER (WHERE impacto_financeiro IS NOT NULL),
+                COALESCE(SUM(clientes_afetados), 0),
+                COUNT(*) FILTER (WHERE clientes_afetados IS NOT NULL),
+                MIN(data_evento),
+                MAX(data_evento)
             FROM eventos_risco
-            WHERE nivel_risco = :nivel
-        """, nivel=nivel)
-
-        if resultado:
-            resumo[nivel] = {
-                'total': resultado[0][0],
-                'impacto_total': float(resultado[0][1]),
-                'impacto_medio': float(resultado[0][2]),
-                'clientes_total': resultado[0][3],
-                'clientes_medio': float(resultado[0][4])
-            }
-
-    conn.close()
-    return resumo
\ No newline at end of file
+            WHERE 1=1
+        """
+        coluna_data = "data_evento"
+    params = {'campo': GRANULARIDADES[granularidade]}
+
+    query += _filtro_periodo(params, data_inicio, data_fim, coluna=coluna_data)
+    query += " GROUP BY 1, 2, 3"
+
+    return query, params
+
+
+@medir('db.get_resumo_dashboard')
+def get_resumo_dashboard(data_inicio=None, data_fim=None, granularidade='dia'):
+    """KPIs e série temporal do dashboard numa única consulta agrupada por
+    bucket, nível e status (dos rollups diários quando existem)."""
+    query, params = _consulta_resumo_dashboard(data_inicio, data_fim, granularidade)
+
+    with get_db_connection() as conn:
+        grupos = conn.run(query, **params)
+
+    stats = EstatisticasEventos.de_grupos([grupo[1:] for grupo in grupos])
+
+    buckets = {}
+    if data_inicio and data_fim:
+        # Buckets sem eventos também aparecem, com zero, para o gráfico não
+        # ligar pontos distantes
+        bucket, fim = _inicio_bucket(_para_data(data_inicio), granularidade), _para_data(data_fim)
+        while bucket <= fim:
+            buckets[bucket] = _ponto_vazio()
+            bucket = _proximo_bucket(bucket, granularidade)
+
+    for bucket, nivel, _, total, impacto, *_ in grupos:
+        ponto = buckets.setdefault(bucket, _ponto_vazio())
+        chave = _CHAVES_SERIE.get(normalizar_nivel(nivel))
+        if chave:
+            ponto[chave] += int(total)
+        ponto['total'] += int(total)
+        ponto['impacto_total'] += float(impacto or 0)
+
+    serie = [{'inicio': bucket.isoformat(), **ponto} for bucket, ponto in sorted(buckets.items())]
+
+    return {
+        'periodo': {
+            'data_inicio': str(data_inicio) if data_inicio else None,
+            'data_fim': str(data_fim) if data_fim else None,
+            'granularidade': granularidade
+        },
+        'total': stats.geral.total,
+        'por_nivel': {nivel: resumo.total for nivel, resumo in stats.por_nivel.items()},
+        'por_status': stats.por_status,
+        'impacto_financeiro_total': stats.geral.impacto_total,
+        'impacto_financeiro_medio': stats.geral.impacto_medio,
+        'impacto_por_nivel': {nivel: resumo.impacto_total for nivel, resumo in stats.por_nivel.items()},
+        'clientes_afetados_total': stats.geral.clientes_total,
+        'serie': serie
+    }
@@ -0,0 +1,53 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import database
+from .metricas import observar
+
+# O pg8000 só tem API bloqueante. As consultas rodam num executor próprio,
+# do tamanho do pool de conexões, para que nunca disputem o threadpool do
+# FastAPI nem fiquem bloqueando o event loop.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('DB_POOL_MAX', 10)),
+    thread_name_prefix='db'
+)
+
+
+def _na_thread(enfileirada, fn, args, kwargs):
+    # Tempo parado na fila do executor, antes de pedir uma conexão ao pool
+    observar('db.fila_executor', time.perf_counter() - enfileirada)
+    return fn(*args, **kwargs)
+
+
+async def executar(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, _na_thread, time.perf_counter(), fn, args, kwargs
+    )
+
+
+def _assincrona(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await executar(fn, *args, **kwargs)
+    return wrapper
+
+
+get_eventos = _assincrona(database.get_eventos)
+get_eventos_pagina = _assincrona(database.get_eventos_pagina)
+get_totais_por_nivel = _assincrona(database.get_totais_por_nivel)
+get_evento_by_id = _assincrona(database.get_evento_by_id)
+get_eventos_by_ids = _assincrona(database.get_eventos_by_ids)
+atualizar_status_evento = _assincrona(database.atualizar_status_evento)
+get_estatisticas_agregadas = _assincrona(database.get_estatisticas_agregadas)
+get_estatisticas_completas = _assincrona(database.get_estatisticas_completas)
+get_top_eventos_criticos = _assincrona(database.get_top_eventos_criticos)
+get_eventos_por_mes = _assincrona(database.get_eventos_por_mes)
+buscar_eventos_dinamico = _assincrona(database.buscar_eventos_dinamico)
+buscar_eventos_por_texto = _assincrona(database.buscar_eventos_por_texto)
+get_resumo_por_nivel = _assincrona(database.get_resumo_por_nivel)
+get_resumo_dashboard = _assincrona(database.get_resumo_dashboard)
+get_versao_dados = _assincrona(database.get_versao_dados)
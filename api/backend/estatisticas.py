@@ -0,0 +1,109 @@
+import unicodedata
+from dataclasses import dataclass, field
+
+NIVEIS_RISCO = ['Crítico', 'Alto', 'Médio', 'Baixo']
+STATUS_EVENTO = ['aberto', 'em_andamento', 'resolvido']
+
+_NIVEIS_NORMALIZADOS = {
+    unicodedata.normalize('NFKD', nivel).encode('ascii', 'ignore').decode().lower(): nivel
+    for nivel in NIVEIS_RISCO
+}
+
+
+def normalizar_nivel(nivel):
+    # O notebook grava 'critico'/'medio'; o backend usa 'Crítico'/'Médio'
+    if not nivel:
+        return None
+    chave = unicodedata.normalize('NFKD', nivel).encode('ascii', 'ignore').decode().lower()
+    return _NIVEIS_NORMALIZADOS.get(chave, nivel)
+
+
+@dataclass(slots=True)
+class ResumoNivel:
+    total: int = 0
+    impacto_total: float = 0.0
+    impacto_qtd: int = 0
+    clientes_total: int = 0
+    clientes_qtd: int = 0
+
+    @property
+    def impacto_medio(self):
+        return self.impacto_total / self.impacto_qtd if self.impacto_qtd else 0.0
+
+    @property
+    def clientes_medio(self):
+        return self.clientes_total / self.clientes_qtd if self.clientes_qtd else 0.0
+
+    def como_dict(self):
+        return {
+            'total': self.total,
+            'impacto_total': self.impacto_total,
+            'impacto_medio': self.impacto_medio,
+            'clientes_total': self.clientes_total,
+            'clientes_medio': self.clientes_medio
+        }
+
+
+@dataclass(slots=True)
+class EstatisticasEventos:
+    """Agregados globais de eventos_risco, montados a partir de uma única
+    consulta agrupada por nível de risco e status."""
+
+    por_nivel: dict = field(default_factory=lambda: {nivel: ResumoNivel() for nivel in NIVEIS_RISCO})
+    por_status: dict = field(default_factory=lambda: {status: 0 for status in STATUS_EVENTO})
+    geral: ResumoNivel = field(default_factory=ResumoNivel)
+    data_mais_antiga: object = None
+    data_mais_recente: object = None
+
+    @classmethod
+    def de_grupos(cls, grupos):
+        """Cada grupo é (nivel_risco, status, total, impacto_total, impacto_qtd,
+        clientes_total, clientes_qtd, data_min, data_max)."""
+        stats = cls()
+
+        for nivel, status, total, impacto, impacto_qtd, clientes, clientes_qtd, data_min, data_max in grupos:
+            impacto = float(impacto or 0)
+            clientes = int(clientes or 0)
+
+            for resumo in (stats.por_nivel.get(normalizar_nivel(nivel)), stats.geral):
+                if resumo is None:
+                    continue
+                resumo.total += total
+                resumo.impacto_total += impacto
+                resumo.impacto_qtd += impacto_qtd
+                resumo.clientes_total += clientes
+                resumo.clientes_qtd += clientes_qtd
+
+            if status in stats.por_status:
+                stats.por_status[status] += total
+
+            if data_min is not None and (stats.data_mais_antiga is None or data_min < stats.data_mais_antiga):
+                stats.data_mais_antiga = data_min
+            if data_max is not None and (stats.data_mais_recente is None or data_max > stats.data_mais_recente):
+                stats.data_mais_recente = data_max
+
+        return stats
+
+    def como_dict(self):
+        stats = {
+            'total_eventos': self.geral.total,
+            'criticos': self.por_nivel['Crítico'].total,
+            'altos': self.por_nivel['Alto'].total,
+            'medios': self.por_nivel['Médio'].total,
+            'baixos': self.por_nivel['Baixo'].total,
+            'impacto_financeiro_total': self.geral.impacto_total,
+            'impacto_financeiro_medio': self.geral.impacto_medio,
+            'total_clientes_afetados': self.geral.clientes_total,
+            'abertos': self.por_status['aberto'],
+            'em_andamento': self.por_status['em_andamento'],
+            'resolvidos': self.por_status['resolvido']
+        }
+
+        if self.data_mais_antiga is not None:
+            stats['data_mais_antiga'] = str(self.data_mais_antiga)
+            stats['data_mais_recente'] = str(self.data_mais_recente)
+
+        return stats
+
+    def resumo_por_nivel(self):
+        return {nivel: resumo.como_dict() for nivel, resumo in self.por_nivel.items()}
@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .cache import CacheTTL, registrar_invalidacao
+from .database import get_versao_dados
+from .database_async import executar
+from .serializacao import RespostaORJSON
+
+# A Vercel guarda a resposta na borda por s-maxage e, depois disso, ainda a
+# serve enquanto revalida em segundo plano; o navegador sempre revalida
+# (max-age=0) e recebe 304 se a versão dos dados não mudou
+CACHE_CONTROL = os.getenv(
+    'HTTP_CACHE_CONTROL',
+    'public, max-age=0, s-maxage=5, stale-while-revalidate=30'
+)
+
+# Evita uma consulta a versao_dados por requisição quando o dashboard faz
+# polling; escritas feitas por este processo invalidam na hora
+_cache_versao = registrar_invalidacao(
+    CacheTTL(ttl=float(os.getenv('HTTP_VERSAO_TTL', 1)), nome='versao_dados')
+)
+
+
+async def versao_atual():
+    return await _cache_versao.obter_async('versao', lambda: executar(get_versao_dados))
+
+
+def gerar_etag(request: Request, versao):
+    """ETag fraca da representação: versão dos dados + URL com os parâmetros
+    (em qualquer ordem). None se não houver versão (migração 003 ausente)."""
+    if versao is None:
+        return None
+    parametros = '&'.join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    recurso = hashlib.sha1(f"{request.url.path}?{parametros}".encode()).hexdigest()[:16]
+    return f'W/"{versao}-{recurso}"'
+
+
+def _confere(if_none_match, etag):
+    if not if_none_match or not etag:
+        return False
+    candidatos = [valor.strip() for valor in if_none_match.split(',')]
+    # Comparação fraca: o prefixo W/ não conta
+    return '*' in candidatos or etag.removeprefix('W/') in {c.removeprefix('W/') for c in candidatos}
+
+
+def nao_modificado(request: Request, etag, cache_control=CACHE_CONTROL):
+    """Resposta 304 se o cliente já tem a representação com essa ETag."""
+    if _confere(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=cabecalhos_cache(etag, cache_control))
+    return None
+
+
+def cabecalhos_cache(etag, cache_control=CACHE_CONTROL):
+    if etag is None:
+        return {}
+    return {'ETag': etag, 'Cache-Control': cache_control}
+
+
+def resposta_com_cache(conteudo, etag):
+    return RespostaORJSON(content=conteudo, headers=cabecalhos_cache(etag))
+
+
+def get_metricas_cache_versao():
+    return _cache_versao.metricas()
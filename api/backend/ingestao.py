@@ -0,0 +1,451 @@
+"""Ingestão em lote de eventos para eventos_risco.
+
+Uso:
+    python -m api.backend.ingestao eventos.ndjson
+    python -m api.backend.ingestao eventos.csv --tamanho-lote 10000
+    cat eventos.ndjson | python -m api.backend.ingestao - --formato ndjson
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import json
+import logging
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .cache import notificar_escrita
+from .classificador import ClassificadorIndisponivel, get_classificador
+from .database import get_db_connection
+from .database_async import executar
+from .estatisticas import NIVEIS_RISCO, normalizar_nivel
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = int(os.getenv('INGESTAO_TAMANHO_LOTE', 5000))
+MAX_ERROS_REPORTADOS = 20
+MAX_TENTATIVAS_ID = 5
+
+STATUS_VALIDOS = {'aberto', 'em_andamento', 'resolvido'}
+
+# Colunas da tabela staging, na ordem do CSV enviado ao COPY
+COLUNAS_STAGING = ['evento_id', 'gerado', 'data_evento', 'data_resolucao', 'tempo_resolucao_horas',
+                   'impacto_financeiro', 'impacto_cliente', 'clientes_afetados',
+                   'tempo_indisponibilidade', 'frequencia_evento', 'criticidade_sistema',
+                   'falha_processo', 'fraude_interna', 'recorrencia', 'nivel_risco',
+                   'status', 'descricao']
+COLUNAS_INSERCAO = [c for c in COLUNAS_STAGING if c != 'gerado']
+
+CAMPOS_INTEIROS = ['impacto_cliente', 'clientes_afetados', 'frequencia_evento', 'criticidade_sistema',
+                   'falha_processo', 'fraude_interna', 'recorrencia']
+CAMPOS_DECIMAIS = ['impacto_financeiro', 'tempo_indisponibilidade', 'tempo_resolucao_horas']
+# Maiores valores que cabem nas colunas: INT (INT4) e DECIMAL(15,2)
+MAXIMO_INTEIRO = 2**31 - 1
+MAXIMOS_DECIMAIS = {'impacto_financeiro': 10**13 - 0.01}
+CAMPOS_OBRIGATORIOS = ['impacto_financeiro', 'clientes_afetados', 'tempo_indisponibilidade',
+                       'frequencia_evento', 'criticidade_sistema', 'falha_processo',
+                       'fraude_interna', 'recorrencia']
+
+# Mesmo formato do notebook (EVT-YYYYMMDDHHMMSS-NNNN, reconhecido pela Yoyo),
+# com o sufixo vindo de uma sequência em vez de randint
+SQL_GERAR_ID = (
+    "'EVT-' || to_char(clock_timestamp(), 'YYYYMMDDHH24MISS') || '-' || "
+    "lpad((nextval('eventos_risco_evento_seq') % 10000)::text, 4, '0')"
+)
+
+SQL_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS eventos_risco_staging (
+        evento_id VARCHAR(100),
+        gerado BOOLEAN NOT NULL,
+        data_evento TIMESTAMP NOT NULL,
+        data_resolucao TIMESTAMP,
+        tempo_resolucao_horas FLOAT,
+        impacto_financeiro DECIMAL(15,2) NOT NULL,
+        impacto_cliente INT,
+        clientes_afetados INT,
+        tempo_indisponibilidade FLOAT,
+        frequencia_evento INT,
+        criticidade_sistema INT,
+        falha_processo INT,
+        fraude_interna INT,
+        recorrencia INT,
+        nivel_risco VARCHAR(20) NOT NULL,
+        status VARCHAR(20),
+        descricao TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Insere o que não conflita e tira da staging o que entrou; o que sobra são
+# IDs já existentes
+SQL_INSERIR = f"""
+    WITH inseridos AS (
+        INSERT INTO eventos_risco ({', '.join(COLUNAS_INSERCAO)})
+        SELECT {', '.join(COLUNAS_INSERCAO)} FROM eventos_risco_staging
+        ON CONFLICT (evento_id) DO NOTHING
+        RETURNING evento_id
+    ), removidos AS (
+        DELETE FROM eventos_risco_staging s USING inseridos i
+        WHERE s.evento_id = i.evento_id
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM inseridos), (SELECT COUNT(*) FROM removidos)
+"""
+
+
+class ErroLinha(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class ResultadoIngestao:
+    lidas: int = 0
+    inseridas: int = 0
+    duplicadas: int = 0
+    rejeitadas: int = 0
+    classificadas: int = 0
+    lotes: int = 0
+    segundos: float = 0.0
+    erros: list = field(default_factory=list)
+
+    @property
+    def linhas_por_s(self):
+        return round(self.lidas / self.segundos, 1) if self.segundos else 0.0
+
+    def rejeitar(self, linha, motivo):
+        self.rejeitadas += 1
+        if len(self.erros) < MAX_ERROS_REPORTADOS:
+            self.erros.append({'linha': linha, 'erro': motivo})
+
+    def como_dict(self):
+        return {
+            'lidas': self.lidas,
+            'inseridas': self.inseridas,
+            'duplicadas': self.duplicadas,
+            'rejeitadas': self.rejeitadas,
+            'classificadas': self.classificadas,
+            'lotes': self.lotes,
+            'segundos': round(self.segundos, 3),
+            'linhas_por_s': self.linhas_por_s,
+            'erros': self.erros,
+        }
+
+
+def _data(valor, campo):
+    if valor in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(str(valor))
+    except ValueError:
+        raise ErroLinha(f"{campo} inválido: {valor}")
+
+
+def _numero(valor, campo, tipo):
+    if valor in (None, ''):
+        return None
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ErroLinha(f"{campo} inválido: {valor}")
+    # nan/inf passam pelo float() mas quebram o int() ou o COPY do lote inteiro
+    if not math.isfinite(numero):
+        raise ErroLinha(f"{campo} inválido: {valor}")
+    if numero < 0:
+        raise ErroLinha(f"{campo} negativo: {valor}")
+    maximo = MAXIMO_INTEIRO if tipo is int else MAXIMOS_DECIMAIS.get(campo)
+    if maximo is not None and numero > maximo:
+        raise ErroLinha(f"{campo} fora do limite da coluna: {valor}")
+    return int(numero) if tipo is int else numero
+
+
+def normalizar_registro(bruto):
+    """Valida um registro lido do arquivo e devolve o dict no formato da
+    staging. Levanta ErroLinha se algo estiver fora do esperado."""
+    if not isinstance(bruto, dict):
+        raise ErroLinha("Registro não é um objeto")
+
+    registro = {}
+    for campo in CAMPOS_INTEIROS:
+        registro[campo] = _numero(bruto.get(campo), campo, int)
+    for campo in CAMPOS_DECIMAIS:
+        registro[campo] = _numero(bruto.get(campo), campo, float)
+
+    faltando = [c for c in CAMPOS_OBRIGATORIOS if registro[c] is None]
+    if faltando:
+        raise ErroLinha(f"Campos obrigatórios ausentes: {', '.join(faltando)}")
+    if not 1 <= registro['criticidade_sistema'] <= 5:
+        raise ErroLinha(f"criticidade_sistema fora de 1-5: {registro['criticidade_sistema']}")
+
+    if registro['impacto_cliente'] is None:
+        # Mesma regra do gerar_evento do notebook
+        registro['impacto_cliente'] = 1 if registro['clientes_afetados'] > 0 else 0
+
+    registro['data_evento'] = _data(bruto.get('data_evento'), 'data_evento') or datetime.now()
+    registro['data_resolucao'] = _data(bruto.get('data_resolucao'), 'data_resolucao')
+
+    # Gravado sempre na forma do backend ('Crítico', 'Médio'...), que é a
+    # usada nos filtros
+    nivel = normalizar_nivel((bruto.get('nivel_risco') or '').strip())
+    if nivel and nivel not in NIVEIS_RISCO:
+        raise ErroLinha(f"nivel_risco inválido: {bruto.get('nivel_risco')}")
+    registro['nivel_risco'] = nivel
+
+    status = (bruto.get('status') or 'aberto').strip().lower()
+    if status not in STATUS_VALIDOS:
+        raise ErroLinha(f"status inválido: {bruto.get('status')}")
+    registro['status'] = status
+
+    evento_id = (bruto.get('evento_id') or '').strip()
+    if len(evento_id) > 100:
+        raise ErroLinha("evento_id com mais de 100 caracteres")
+    registro['evento_id'] = evento_id or None
+    registro['gerado'] = not evento_id
+    registro['descricao'] = bruto.get('descricao') or None
+
+    return registro
+
+
+class LeitorNDJSON:
+    def linhas(self, texto):
+        texto = texto.strip()
+        if texto:
+            yield json.loads(texto)
+
+    def finalizar(self):
+        pass
+
+
+class LeitorCSV:
+    """CSV com cabeçalho, recebido linha a linha. Linhas com aspas abertas
+    (campo com quebra de linha) são acumuladas até o registro fechar."""
+
+    def __init__(self):
+        self._cabecalho = None
+        self._pendente = ''
+
+    def linhas(self, texto):
+        self._pendente += texto if texto.endswith('\n') else texto + '\n'
+        if self._pendente.count('"') % 2:
+            return
+        registro, self._pendente = self._pendente, ''
+        if not registro.strip():
+            return
+
+        valores = next(csv.reader(io.StringIO(registro)))
+        if self._cabecalho is None:
+            self._cabecalho = [c.strip() for c in valores]
+            return
+        if len(valores) != len(self._cabecalho):
+            raise ErroLinha(f"{len(valores)} colunas, esperado {len(self._cabecalho)}")
+        yield dict(zip(self._cabecalho, valores))
+
+    def finalizar(self):
+        if self._pendente.strip():
+            raise ErroLinha("Campo entre aspas não foi fechado")
+
+
+LEITORES = {'ndjson': LeitorNDJSON, 'csv': LeitorCSV}
+
+
+def _classificar(registros, rejeitados):
+    pendentes = [r for r in registros if r['nivel_risco'] is None]
+    if not pendentes:
+        return registros, 0
+
+    try:
+        classificador = get_classificador()
+    except ClassificadorIndisponivel as e:
+        rejeitados += [(r['_linha'], f"Sem nivel_risco e classificador indisponível: {e}") for r in pendentes]
+        return [r for r in registros if r['nivel_risco'] is not None], 0
+
+    for registro, classificacao in zip(pendentes, classificador.classificar(pendentes)):
+        registro['nivel_risco'] = normalizar_nivel(classificacao['nivel_risco'])
+    return registros, len(pendentes)
+
+
+def _csv_copy(registros):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for registro in registros:
+        escritor.writerow([
+            ('t' if registro[c] else 'f') if c == 'gerado'
+            else registro[c].isoformat() if isinstance(registro[c], datetime)
+            else registro[c]
+            for c in COLUNAS_STAGING
+        ])
+    buffer.seek(0)
+    return buffer
+
+
+def carregar_lote(registros):
+    """Classifica os registros sem nivel_risco e grava o lote com COPY numa
+    tabela temporária seguida de um único INSERT ... SELECT."""
+    rejeitados = []
+    registros, classificadas = _classificar(registros, rejeitados)
+    parcial = {'inseridas': 0, 'duplicadas': 0, 'classificadas': classificadas, 'rejeitados': rejeitados}
+    if not registros:
+        return parcial
+
+    with get_db_connection() as conn:
+        conn.run("BEGIN")
+        conn.run(SQL_STAGING)
+        conn.run(
+            f"COPY eventos_risco_staging ({', '.join(COLUNAS_STAGING)}) FROM STDIN WITH (FORMAT csv)",
+            stream=_csv_copy(registros)
+        )
+        conn.run(f"UPDATE eventos_risco_staging SET evento_id = {SQL_GERAR_ID} WHERE gerado")
+
+        inseridas = 0
+        for _ in range(MAX_TENTATIVAS_ID):
+            inseridas += conn.run(SQL_INSERIR)[0][0]
+            # IDs enviados pelo arquivo que já existem são duplicatas; IDs
+            # gerados que colidiram ganham um novo sufixo
+            conn.run("DELETE FROM eventos_risco_staging WHERE NOT gerado")
+            if not conn.run(f"UPDATE eventos_risco_staging SET evento_id = {SQL_GERAR_ID} RETURNING 1"):
+                break
+        else:
+            conn.run("ROLLBACK")
+            raise RuntimeError(f"Não foi possível gerar IDs únicos após {MAX_TENTATIVAS_ID} tentativas")
+
+        conn.run("COMMIT")
+
+    parcial['inseridas'] = inseridas
+    parcial['duplicadas'] = len(registros) - inseridas
+    return parcial
+
+
+async def ingerir(linhas, formato='ndjson', tamanho_lote=TAMANHO_LOTE):
+    """Lê ``linhas`` (iterável assíncrono de str) e grava em lotes de
+    ``tamanho_lote``.
+
+    Enquanto um lote é gravado o próximo vai sendo lido, mas a leitura para
+    quando ele fica completo até a gravação anterior terminar: no máximo dois
+    lotes em memória, e quem envia mais rápido que o banco grava espera.
+    """
+    if formato not in LEITORES:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(LEITORES)})")
+
+    leitor = LEITORES[formato]()
+    resultado = ResultadoIngestao()
+    inicio = time.perf_counter()
+    lote = []
+    gravando = None
+
+    def somar(parcial):
+        resultado.lotes += 1
+        resultado.inseridas += parcial['inseridas']
+        resultado.duplicadas += parcial['duplicadas']
+        resultado.classificadas += parcial['classificadas']
+        for linha, motivo in parcial['rejeitados']:
+            resultado.rejeitar(linha, motivo)
+
+    async def enviar(registros):
+        nonlocal gravando
+        if gravando is not None:
+            somar(await gravando)
+        gravando = asyncio.ensure_future(executar(carregar_lote, registros))
+        logger.info(
+            f"Ingestão: {resultado.lidas} lidas, {resultado.inseridas} inseridas "
+            f"({resultado.lidas / (time.perf_counter() - inicio):.0f} linhas/s)"
+        )
+
+    numero = 0
+    try:
+        async for texto in linhas:
+            numero += 1
+            try:
+                brutos = list(leitor.linhas(texto))
+            except ValueError as e:
+                resultado.lidas += 1
+                resultado.rejeitar(numero, str(e))
+                continue
+
+            for bruto in brutos:
+                resultado.lidas += 1
+                try:
+                    registro = normalizar_registro(bruto)
+                except ErroLinha as e:
+                    resultado.rejeitar(numero, str(e))
+                    continue
+                registro['_linha'] = numero
+                lote.append(registro)
+
+            if len(lote) >= tamanho_lote:
+                await enviar(lote)
+                lote = []
+
+        try:
+            leitor.finalizar()
+        except ErroLinha as e:
+            resultado.rejeitar(numero, str(e))
+
+        if lote:
+            await enviar(lote)
+        if gravando is not None:
+            somar(await gravando)
+            gravando = None
+    finally:
+        if gravando is not None and not gravando.done():
+            gravando.cancel()
+        resultado.segundos = time.perf_counter() - inicio
+        if resultado.inseridas:
+            notificar_escrita()
+
+    logger.info(
+        f"Ingestão concluída: {resultado.inseridas} inseridas, {resultado.duplicadas} duplicadas, "
+        f"{resultado.rejeitadas} rejeitadas em {resultado.segundos:.1f}s ({resultado.linhas_por_s} linhas/s)"
+    )
+    return resultado
+
+
+def formato_do_arquivo(caminho):
+    extensao = os.path.splitext(caminho)[1].lower().lstrip('.')
+    return {'jsonl': 'ndjson', 'json': 'ndjson'}.get(extensao, extensao)
+
+
+async def linhas_de_bytes(blocos):
+    """Quebra um corpo recebido em blocos de bytes (ex.: request.stream())
+    em linhas de texto, sem juntar o corpo inteiro em memória."""
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    resto = ''
+    async for bloco in blocos:
+        resto += decodificador.decode(bloco)
+        *linhas, resto = resto.split('\n')
+        for linha in linhas:
+            yield linha + '\n'
+    resto += decodificador.decode(b'', final=True)
+    if resto:
+        yield resto
+
+
+async def _linhas_arquivo(arquivo):
+    for texto in arquivo:
+        yield texto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão em lote de eventos de risco (NDJSON ou CSV)")
+    parser.add_argument("arquivo", help="Caminho do arquivo, ou - para ler da entrada padrão")
+    parser.add_argument("--formato", choices=sorted(LEITORES), help="Padrão: pela extensão do arquivo")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    formato = args.formato or ('ndjson' if args.arquivo == '-' else formato_do_arquivo(args.arquivo))
+    arquivo = sys.stdin if args.arquivo == '-' else open(args.arquivo, encoding='utf-8', newline='')
+    try:
+        resultado = asyncio.run(ingerir(_linhas_arquivo(arquivo), formato, args.tamanho_lote))
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+
+    print(json.dumps(resultado.como_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
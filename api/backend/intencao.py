@@ -0,0 +1,148 @@
+import re
+import unicodedata
+
+# Padrões sem acento e em minúsculas, como a mensagem depois de _normalizar.
+# Dentro de cada dimensão vale a primeira opção da lista que aparecer na
+# mensagem (ex.: "críticos e altos" filtra por Crítico).
+NIVEIS = [
+    ('Crítico', ['critico', 'criticos', 'critica', 'criticas']),
+    ('Alto', ['alto risco', 'alto', 'altos']),
+    ('Médio', ['medio', 'medios']),
+    ('Baixo', ['baixo risco', 'baixo', 'baixos']),
+]
+
+STATUS = [
+    ('aberto', ['aberto', 'abertos', 'pendente', 'pendentes']),
+    ('em_andamento', ['em andamento', 'andamento', 'sendo tratado', 'sendo tratados']),
+    ('resolvido', ['resolvido', 'resolvidos', 'fechado', 'fechados']),
+]
+
+ORDENS = [
+    ('impacto', ['maior impacto', 'mais caro', 'mais caros', 'maior valor', 'maiores valores']),
+    ('clientes', ['mais clientes', 'mais afetados', 'maior numero de clientes']),
+    ('data', ['mais recente', 'mais recentes', 'ultimos', 'recentes']),
+    ('indisponibilidade', ['indisponibilidade', 'mais tempo fora']),
+]
+
+MESES = {
+    'janeiro': '01', 'fevereiro': '02', 'marco': '03', 'abril': '04',
+    'maio': '05', 'junho': '06', 'julho': '07', 'agosto': '08',
+    'setembro': '09', 'outubro': '10', 'novembro': '11', 'dezembro': '12'
+}
+
+TERMOS = [
+    ('fraude', ['fraude', 'fraudes']),
+    ('sistema', ['sistema', 'sistemas']),
+    ('pix', ['pix']),
+    ('transferência', ['transferencia', 'transferencias']),
+    ('cartão', ['cartao', 'cartoes']),
+    ('falha', ['falha', 'falhas']),
+    ('erro', ['erro', 'erros']),
+    ('indisponibilidade', ['indisponibilidade']),
+    ('ataque', ['ataque', 'ataques']),
+    ('invasão', ['invasao', 'invasoes']),
+]
+
+RESUMO_GERAL = ['todos os eventos', 'resumo geral', 'visao geral', 'panorama']
+
+# Perguntas conceituais ("o que é fraude?") não viram busca por termo
+CONCEITUAL = ['o que e', 'o que significa']
+
+_PALAVRA = re.compile(r'\w+')
+
+_TIPO_POR_FILTRO = {'nivel_risco': 'nivel', 'status': 'status', 'mes': 'mes', 'termo': 'texto'}
+
+
+def _normalizar(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode().lower()
+
+
+class DetectorIntencao:
+    """Extrai de uma vez todos os filtros de uma pergunta (nível, status,
+    mês, termos, ordenação).
+
+    Os padrões viram uma tabela de sequências de palavras, montada uma vez;
+    a mensagem é percorrida palavra a palavra, tentando primeiro a sequência
+    mais longa em cada posição ("alto risco" antes de "alto"). O mesmo
+    padrão pode valer para mais de uma dimensão (ex.: "indisponibilidade" é
+    ordenação e termo de busca).
+    """
+
+    def __init__(self, ano_padrao='2024'):
+        self.ano_padrao = ano_padrao
+        self._efeitos = {}
+        prioridade = 0
+
+        def registrar(dimensao, grupos):
+            nonlocal prioridade
+            for valor, padroes in grupos:
+                for padrao in padroes:
+                    chave = tuple(padrao.split())
+                    self._efeitos.setdefault(chave, []).append((dimensao, valor, prioridade))
+                prioridade += 1
+
+        registrar('nivel_risco', NIVEIS)
+        registrar('status', STATUS)
+        registrar('ordem', ORDENS)
+        registrar('mes', [(numero, [nome]) for nome, numero in MESES.items()])
+        registrar('termo', TERMOS)
+        registrar('resumo_geral', [(True, RESUMO_GERAL)])
+        registrar('conceitual', [(True, CONCEITUAL)])
+
+        self._tamanhos = sorted({len(chave) for chave in self._efeitos}, reverse=True)
+        self._palavras = {palavra for chave in self._efeitos for palavra in chave}
+
+    def detectar(self, mensagem: str) -> dict:
+        encontrados = {}
+        termos = []
+        ano = None
+
+        palavras = _PALAVRA.findall(_normalizar(mensagem))
+        total = len(palavras)
+        i = 0
+        while i < total:
+            palavra = palavras[i]
+            if palavra not in self._palavras:
+                if ano is None and len(palavra) == 4 and palavra.startswith('20') and palavra.isdigit():
+                    ano = palavra
+                i += 1
+                continue
+
+            efeitos = None
+            for tamanho in self._tamanhos:
+                if i + tamanho <= total:
+                    efeitos = self._efeitos.get(tuple(palavras[i:i + tamanho]))
+                    if efeitos:
+                        break
+            if not efeitos:
+                i += 1
+                continue
+
+            for dimensao, valor, prioridade in efeitos:
+                if dimensao == 'termo':
+                    if valor not in termos:
+                        termos.append(valor)
+                elif dimensao not in encontrados or prioridade < encontrados[dimensao][1]:
+                    encontrados[dimensao] = (valor, prioridade)
+            i += tamanho
+
+        params = {dimensao: valor for dimensao, (valor, _) in encontrados.items()
+                  if dimensao not in ('resumo_geral', 'conceitual')}
+
+        if 'mes' in params:
+            params['mes'] = f"{ano or self.ano_padrao}-{params['mes']}"
+
+        if termos and 'conceitual' not in encontrados:
+            params['termo'] = ' '.join(termos)
+
+        filtros = [f for f in _TIPO_POR_FILTRO if f in params]
+        if len(filtros) > 1:
+            tipo = 'combinada'
+        elif filtros:
+            tipo = _TIPO_POR_FILTRO[filtros[0]]
+        elif 'resumo_geral' in encontrados:
+            tipo = 'resumo_geral'
+        else:
+            tipo = None
+
+        return {'tipo': tipo, 'params': params}
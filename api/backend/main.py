@@ -1,21 +1,67 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Optional, List, Union
+from pydantic import BaseModel, Field
 
-from .database import get_eventos, get_evento_by_id, atualizar_status_evento
-from .yoyo_service import processar_mensagem_yoyo
+from .compressao import CompressaoMiddleware
+from .metricas import MetricasHTTPMiddleware, exportar_prometheus
+from .serializacao import RespostaORJSON
+from .http_cache import (
+    cabecalhos_cache,
+    gerar_etag,
+    nao_modificado,
+    resposta_com_cache,
+    versao_atual,
+    get_metricas_cache_versao
+)
+from .classificador import ClassificadorIndisponivel, get_classificador, get_metricas_classificador
+from .ingestao import TAMANHO_LOTE, ingerir, linhas_de_bytes
+from .database import get_metricas_pool, get_metricas_cache_eventos
+from .database_async import (
+    get_eventos_pagina,
+    get_totais_por_nivel,
+    get_resumo_dashboard,
+    get_evento_by_id,
+    get_eventos_by_ids,
+    buscar_eventos_por_texto,
+    atualizar_status_evento
+)
+from .yoyo_service import (
+    processar_mensagem_yoyo,
+    processar_mensagem_yoyo_stream,
+    get_metricas_cache_yoyo
+)
 
 
 class ChatMessage(BaseModel):
     role: str
     content: str
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carrega o modelo de classificação uma vez, antes da primeira requisição
+    try:
+        await asyncio.to_thread(get_classificador)
+    except ClassificadorIndisponivel as e:
+        logger.warning(f"Classificação indisponível: {e}")
+    yield
+
 app = FastAPI(
     title="API Monitoramento de Risco Operacional",
     description="Backend para dashboard = chatbot Yoyo",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=RespostaORJSON
 )
 
 app.add_middleware(
@@ -29,8 +75,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+app.add_middleware(CompressaoMiddleware, minimo_bytes=int(os.getenv('HTTP_COMPRESSAO_MINIMO', 1024)))
+# Por último para ficar por fora: mede também o CORS e a compressão
+app.add_middleware(MetricasHTTPMiddleware)
+
 class ChatRequest(BaseModel):
     mensagem: str
     contexto_tela: Optional[dict] = None
@@ -38,50 +89,217 @@ class ChatRequest(BaseModel):
     nome_usuario: Optional[str] = None
     conversation_state: Optional[str] = None
 
+class EventosBatchRequest(BaseModel):
+    ids: List[str]
+
+class EventoClassificacao(BaseModel):
+    impacto_financeiro: float = Field(..., ge=0)
+    clientes_afetados: int = Field(..., ge=0)
+    tempo_indisponibilidade: float = Field(..., ge=0)
+    frequencia_evento: int = Field(..., ge=0)
+    criticidade_sistema: int = Field(..., ge=1, le=5)
+    falha_processo: int = Field(..., ge=0, le=1)
+    fraude_interna: int = Field(..., ge=0, le=1)
+    recorrencia: int = Field(..., ge=0)
+
+class ClassificacaoLoteRequest(BaseModel):
+    eventos: List[EventoClassificacao]
+
 class StatusUpdateRequest(BaseModel):
     evento_id: str
     status: str
 
 
-@app.get("/")
-def root():
-    return {
-        "mensagem": "API Monitoramento de Risco Operacional",
-        "versao": "1.0.0",
-        "endpoints": {
-            "eventos": "/api/eventos",
-            "evento_id": "/api/eventos/{id}",
-            "chat": "/api/yoyo/chat"
-        }
+INFO_API = {
+    "mensagem": "API Monitoramento de Risco Operacional",
+    "versao": "1.0.0",
+    "endpoints": {
+        "eventos": "/api/eventos",
+        "evento_id": "/api/eventos/{id}",
+        "eventos_batch": "/api/eventos/batch",
+        "eventos_busca": "/api/eventos/search?q=",
+        "eventos_ingestao": "/api/eventos/ingestao",
+        "dashboard_resumo": "/api/dashboard/resumo",
+        "classificar": "/api/classificar",
+        "chat": "/api/yoyo/chat",
+        "chat_stream": "/api/yoyo/chat/stream",
+        "metricas": "/metrics"
     }
+}
+ETAG_INFO_API = '"' + hashlib.sha1(json.dumps(INFO_API, sort_keys=True).encode()).hexdigest()[:16] + '"'
+# Só muda com um novo deploy
+CACHE_CONTROL_INFO_API = "public, max-age=3600"
+
+@app.get("/")
+async def root(request: Request):
+    resposta_304 = nao_modificado(request, ETAG_INFO_API, CACHE_CONTROL_INFO_API)
+    if resposta_304:
+        return resposta_304
+    return RespostaORJSON(INFO_API, headers=cabecalhos_cache(ETAG_INFO_API, CACHE_CONTROL_INFO_API))
+LIMITE_MAXIMO_EVENTOS = 1000
+
 @app.get("/api/eventos")
-def listar_eventos(
+async def listar_eventos(
+    request: Request,
     data_inicio: Optional[str] = Query(None, description="YYYY-MM-DD"),
     data_fim: Optional[str] = Query(None, description="YYYY-MM-DD"),
-    nivel_risco: Optional[str] = Query(None, description="Crítico/Alto/Médio/Baixo")
+    nivel_risco: Optional[str] = Query(None, description="Crítico/Alto/Médio/Baixo"),
+    cursor: Optional[str] = Query(None, description="proximo_cursor retornado pela página anterior"),
+    limit: int = Query(500, ge=1, le=LIMITE_MAXIMO_EVENTOS, description="Eventos por página"),
+    fields: Optional[str] = Query(None, description="Colunas separadas por vírgula (ex: evento_id,nivel_risco)")
 ):
-    eventos = get_eventos(data_inicio, data_fim, nivel_risco)
+    campos = [c.strip() for c in fields.split(",") if c.strip()] if fields else None
 
-    return {
-        "total": len(eventos),
+    etag = gerar_etag(request, await versao_atual())
+    resposta_304 = nao_modificado(request, etag)
+    if resposta_304 is not None:
+        return resposta_304
+
+    try:
+        eventos, proximo_cursor = await get_eventos_pagina(
+            data_inicio, data_fim, nivel_risco,
+            cursor=cursor, limite=limit, campos=campos
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    resposta = {
+        "quantidade": len(eventos),
+        "proximo_cursor": proximo_cursor,
         "eventos": eventos
     }
 
+    # Os totais do filtro só mudam entre consultas, não entre páginas
+    if not cursor:
+        totais = await get_totais_por_nivel(data_inicio, data_fim, nivel_risco)
+        resposta["total"] = totais["total"]
+        resposta["totais_por_nivel"] = totais["por_nivel"]
+
+    return resposta_com_cache(resposta, etag)
+
+@app.get("/api/dashboard/resumo")
+async def resumo_dashboard(
+    request: Request,
+    data_inicio: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    data_fim: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    granularidade: str = Query("dia", description="dia, semana ou mes")
+):
+    etag = gerar_etag(request, await versao_atual())
+    resposta_304 = nao_modificado(request, etag)
+    if resposta_304 is not None:
+        return resposta_304
+
+    try:
+        resumo = await get_resumo_dashboard(data_inicio, data_fim, granularidade)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return resposta_com_cache(resumo, etag)
+
+@app.get("/api/eventos/search")
+async def buscar_eventos(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Palavras da descrição (aceita \"frase\", or e -exclusão)"),
+    limit: int = Query(15, ge=1, le=100, description="Máximo de eventos")
+):
+    etag = gerar_etag(request, await versao_atual())
+    resposta_304 = nao_modificado(request, etag)
+    if resposta_304 is not None:
+        return resposta_304
+
+    try:
+        eventos = await buscar_eventos_por_texto(q, limite=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return resposta_com_cache({"quantidade": len(eventos), "eventos": eventos}, etag)
+
+@app.post("/api/eventos/batch")
+async def eventos_em_lote(request: EventosBatchRequest):
+    if len(request.ids) > LIMITE_MAXIMO_EVENTOS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {LIMITE_MAXIMO_EVENTOS} IDs por requisição")
+
+    eventos = await get_eventos_by_ids(request.ids)
+    encontrados = {evento.evento_id for evento in eventos}
+
+    return RespostaORJSON({
+        "quantidade": len(eventos),
+        "eventos": eventos,
+        "nao_encontrados": [evento_id for evento_id in dict.fromkeys(request.ids) if evento_id not in encontrados]
+    })
+
+FORMATOS_INGESTAO = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv"
+}
+
+@app.post("/api/eventos/ingestao")
+async def ingerir_eventos(
+    request: Request,
+    formato: Optional[str] = Query(None, description="ndjson ou csv (padrão: pelo Content-Type)"),
+    tamanho_lote: int = Query(TAMANHO_LOTE, ge=100, le=50000, description="Linhas por COPY")
+):
+    tipo = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    formato = formato or FORMATOS_INGESTAO.get(tipo)
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(
+            status_code=415,
+            detail="Envie NDJSON (application/x-ndjson) ou CSV (text/csv), ou informe ?formato="
+        )
+
+    # O corpo é lido conforme os lotes são gravados, sem ficar inteiro em memória
+    resultado = await ingerir(linhas_de_bytes(request.stream()), formato, tamanho_lote)
+    return resultado.como_dict()
+
 @app.get("/api/eventos/{evento_id}")
-def detalhe_evento(evento_id: str):
-    evento = get_evento_by_id(evento_id)
+async def detalhe_evento(evento_id: str, request: Request):
+    etag = gerar_etag(request, await versao_atual())
+    resposta_304 = nao_modificado(request, etag)
+    if resposta_304 is not None:
+        return resposta_304
+
+    evento = await get_evento_by_id(evento_id)
 
     if not evento:
         raise HTTPException(status_code=404, detail="Evento não encontrado")
-    return evento
+    return resposta_com_cache(evento, etag)
+
+LIMITE_CLASSIFICACAO_LOTE = 10000
+
+@app.post("/api/classificar")
+async def classificar_eventos(request: Union[ClassificacaoLoteRequest, EventoClassificacao]):
+    lote = isinstance(request, ClassificacaoLoteRequest)
+    eventos = [ev.model_dump() for ev in request.eventos] if lote else [request.model_dump()]
+
+    if len(eventos) > LIMITE_CLASSIFICACAO_LOTE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {LIMITE_CLASSIFICACAO_LOTE} eventos por requisição")
+
+    # Carregar o modelo (joblib, se a carga do lifespan falhou) e o
+    # predict_proba são CPU; fora do event loop
+    try:
+        classificador = await asyncio.to_thread(get_classificador)
+    except ClassificadorIndisponivel as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    resultados = await asyncio.to_thread(classificador.classificar, eventos)
+
+    if not lote:
+        return {**resultados[0], "versao_modelo": classificador.versao}
+
+    return {
+        "quantidade": len(resultados),
+        "versao_modelo": classificador.versao,
+        "resultados": resultados
+    }
 
 @app.post("/api/yoyo/chat")
-def chat_yoyo(request: ChatRequest):
+async def chat_yoyo(request: ChatRequest):
     historico_dict = None
     if request.historico:
         historico_dict = [{"role": msg.role, "content": msg.content} for msg in request.historico]
 
-    resultado = processar_mensagem_yoyo(
+    resultado = await processar_mensagem_yoyo(
         mensagem=request.mensagem,
         contexto_tela=request.contexto_tela,
         historico=historico_dict,
@@ -91,15 +309,60 @@ def chat_yoyo(request: ChatRequest):
 
     return resultado
 
+@app.post("/api/yoyo/chat/stream")
+async def chat_yoyo_stream(request: ChatRequest):
+    historico_dict = None
+    if request.historico:
+        historico_dict = [{"role": msg.role, "content": msg.content} for msg in request.historico]
+
+    frames = processar_mensagem_yoyo_stream(
+        mensagem=request.mensagem,
+        contexto_tela=request.contexto_tela,
+        historico=historico_dict,
+        nome_usuario=request.nome_usuario,
+        conversation_state=request.conversation_state
+    )
+
+    # Server-Sent Events: um evento 'token' por trecho da resposta e um
+    # evento 'fim' com conversation_state/nome_usuario
+    async def eventos_sse():
+        async for frame in frames:
+            tipo = frame.pop("tipo")
+            yield f"event: {tipo}\ndata: {json.dumps(frame, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        eventos_sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.patch("/api/eventos/{evento_id}/status")
-def atualizar_status(evento_id: str, request: StatusUpdateRequest):
-    resultado = atualizar_status_evento(evento_id, request.status)
+async def atualizar_status(evento_id: str, request: StatusUpdateRequest):
+    resultado = await atualizar_status_evento(evento_id, request.status)
     if not resultado.get("sucesso"):
         raise HTTPException(status_code=400, detail=resultado.get("erro"))
     return resultado
 
+@app.get("/metrics")
+async def metricas_prometheus():
+    return Response(
+        content=exportar_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+        headers={"Cache-Control": "no-store"}
+    )
+
 @app.get("/health")
-def health_check():
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+async def health_check():
+    return {
+        "status": "ok",
+        "timestamp": datetime.now().isoformat(),
+        "pool": get_metricas_pool(),
+        "cache": {
+            **get_metricas_cache_yoyo(),
+            "eventos_por_id": get_metricas_cache_eventos(),
+            "versao_dados": get_metricas_cache_versao()
+        },
+        "classificador": get_metricas_classificador()
+    }
 
 
@@ -0,0 +1,279 @@
+"""Métricas de latência por etapa no formato texto do Prometheus.
+
+``medir('etapa')`` serve como context manager e como decorador (funções
+síncronas e assíncronas): registra a duração no histograma
+``risco_etapa_duracao_segundos`` e, se houver um exportador configurado,
+abre um span com o mesmo nome. O exportador padrão não faz nada; com
+``METRICAS_OTEL=1`` e o pacote opentelemetry-api instalado, as etapas viram
+spans do OpenTelemetry (o SDK/OTLP é configurado fora da aplicação, ex.:
+``opentelemetry-instrument``).
+"""
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Etapas de banco ficam nos primeiros buckets; geração do Gemini, nos últimos
+LIMITES_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metricas = []
+_lock_registro = threading.Lock()
+
+
+def registrar(metrica):
+    with _lock_registro:
+        _metricas.append(metrica)
+    return metrica
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def exportar(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} counter"]
+        for chave, valor in valores:
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}")
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome, descricao, rotulos=(), limites=LIMITES_PADRAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(sorted(limites))
+        # chave dos rótulos -> [contagem por bucket..., soma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0] * len(self.limites) + [0.0, 0]
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exportar(self):
+        with self._lock:
+            series = sorted((chave, list(serie)) for chave, serie in self._series.items())
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        for chave, serie in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.limites, serie):
+                acumulado += quantidade
+                rotulos = _formatar_rotulos(self.rotulos, chave, f'le="{_formatar_numero(limite)}"')
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave, 'le="+Inf"')
+            linhas.append(f"{self.nome}_bucket{rotulos} {serie[-1]}")
+            linhas.append(f"{self.nome}_sum{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(serie[-2])}")
+            linhas.append(f"{self.nome}_count{_formatar_rotulos(self.rotulos, chave)} {serie[-1]}")
+        return linhas
+
+
+class Medidor:
+    """Valor instantâneo lido na hora da exportação (ex.: conexões em uso).
+
+    ``coletar`` retorna um número ou um dict {valor do rótulo: número}."""
+
+    def __init__(self, nome, descricao, coletar, rotulo=None):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulo = rotulo
+        self._coletar = coletar
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} gauge"]
+        try:
+            valores = self._coletar()
+        except Exception as e:
+            logger.warning(f"Falha ao coletar {self.nome}: {e}")
+            return linhas
+        if self.rotulo is None:
+            linhas.append(f"{self.nome} {_formatar_numero(valores)}")
+        else:
+            for chave, valor in sorted(valores.items()):
+                linhas.append(f"{self.nome}{_formatar_rotulos((self.rotulo,), (chave,))} {_formatar_numero(valor)}")
+        return linhas
+
+
+def exportar_prometheus():
+    with _lock_registro:
+        metricas = list(_metricas)
+    linhas = []
+    for metrica in metricas:
+        linhas.extend(metrica.exportar())
+    return '\n'.join(linhas) + '\n'
+
+
+DURACAO_ETAPA = registrar(Histograma(
+    'risco_etapa_duracao_segundos',
+    'Duração de cada etapa (consultas ao banco, etapas da Yoyo, geração do LLM)',
+    rotulos=('etapa',)
+))
+ERROS_ETAPA = registrar(Contador(
+    'risco_etapa_erros_total',
+    'Etapas que terminaram com exceção',
+    rotulos=('etapa',)
+))
+
+
+class ExportadorNulo:
+    """Não exporta nada (padrão; útil também em testes e benchmarks)."""
+
+    def span(self, etapa):
+        return nullcontext()
+
+
+class ExportadorOpenTelemetry:
+    def __init__(self, nome_servico='monitoramento-risco-operacional'):
+        from opentelemetry import trace
+        self._tracer = trace.get_tracer(nome_servico)
+
+    def span(self, etapa):
+        return self._tracer.start_as_current_span(etapa)
+
+
+def _exportador_inicial():
+    if os.getenv('METRICAS_OTEL', '').lower() not in ('1', 'true', 'sim'):
+        return ExportadorNulo()
+    try:
+        return ExportadorOpenTelemetry()
+    except ImportError:
+        logger.warning("METRICAS_OTEL ativo, mas opentelemetry-api não está instalado; spans desativados")
+        return ExportadorNulo()
+
+
+_exportador = _exportador_inicial()
+
+
+def configurar_exportador(exportador):
+    global _exportador
+    _exportador = exportador or ExportadorNulo()
+
+
+def observar(etapa, segundos, erro=False):
+    DURACAO_ETAPA.observar(segundos, etapa=etapa)
+    if erro:
+        ERROS_ETAPA.incrementar(etapa=etapa)
+
+
+class medir:
+    """Mede a duração de uma etapa: ``with medir('yoyo.prompt'):`` ou
+    ``@medir('db.get_eventos')`` sobre uma função síncrona ou assíncrona."""
+
+    __slots__ = ('etapa', '_inicio', '_span')
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+        self._inicio = None
+        self._span = None
+
+    def __enter__(self):
+        self._span = _exportador.span(self.etapa)
+        self._span.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, tb):
+        observar(self.etapa, time.perf_counter() - self._inicio, erro=tipo is not None)
+        return self._span.__exit__(tipo, erro, tb)
+
+    def __call__(self, fn):
+        etapa = self.etapa
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper_async(*args, **kwargs):
+                with medir(etapa):
+                    return await fn(*args, **kwargs)
+            return wrapper_async
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with medir(etapa):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+DURACAO_HTTP = registrar(Histograma(
+    'risco_http_requisicao_duracao_segundos',
+    'Duração das requisições HTTP até o último byte da resposta',
+    rotulos=('metodo', 'rota', 'status')
+))
+
+
+class MetricasHTTPMiddleware:
+    """Mede cada requisição HTTP por método, rota e status.
+
+    A rota é o caminho declarado no FastAPI (``/api/eventos/{evento_id}``),
+    não a URL, para que os IDs não multipliquem as séries. O tempo inclui o
+    envio do corpo, então no SSE da Yoyo cobre a resposta inteira.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem['type'] == 'http.response.start':
+                status = mensagem['status']
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = scope.get('route')
+            DURACAO_HTTP.observar(
+                time.perf_counter() - inicio,
+                metodo=scope['method'],
+                rota=getattr(rota, 'path', 'nao_encontrada'),
+                status=status
+            )
@@ -0,0 +1,19 @@
+from . import (
+    m001_rollups,
+    m002_indices_compostos,
+    m003_versao_dados,
+    m004_busca_texto,
+    m005_ingestao,
+    m006_nivel_risco,
+    m007_rollups_datas
+)
+
+MIGRACOES = [
+    m001_rollups,
+    m002_indices_compostos,
+    m003_versao_dados,
+    m004_busca_texto,
+    m005_ingestao,
+    m006_nivel_risco,
+    m007_rollups_datas
+]
@@ -0,0 +1,151 @@
+from ..rollups import SQL_RECONSTRUIR
+
+VERSAO = '001'
+DESCRICAO = 'Rollups diários e mensais de eventos_risco mantidos por trigger'
+TRANSACIONAL = True
+
+
+def _tabela_rollup(nome, chave):
+    return f"""
+    CREATE TABLE IF NOT EXISTS {nome} (
+        {chave} DATE NOT NULL,
+        nivel_risco VARCHAR(20) NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        total BIGINT NOT NULL DEFAULT 0,
+        impacto_total NUMERIC(20, 2) NOT NULL DEFAULT 0,
+        impacto_qtd BIGINT NOT NULL DEFAULT 0,
+        clientes_total BIGINT NOT NULL DEFAULT 0,
+        clientes_qtd BIGINT NOT NULL DEFAULT 0,
+        data_min TIMESTAMP,
+        data_max TIMESTAMP,
+        PRIMARY KEY ({chave}, nivel_risco, status)
+    )
+    """
+
+
+def _aplicar_delta(tabela, chave, expr_chave, delta):
+    # delta: SELECT com (data_evento, nivel_risco, status, impacto_financeiro,
+    # clientes_afetados, sinal); sinal = +1 para linhas novas e -1 para antigas
+    return f"""
+        INSERT INTO {tabela} AS r
+            ({chave}, nivel_risco, status, total, impacto_total, impacto_qtd,
+             clientes_total, clientes_qtd, data_min, data_max)
+        SELECT
+            {expr_chave}, nivel_risco, COALESCE(status, ''),
+            SUM(sinal),
+            SUM(sinal * COALESCE(impacto_financeiro, 0)),
+            COALESCE(SUM(sinal) FILTER (WHERE impacto_financeiro IS NOT NULL), 0),
+            SUM(sinal * COALESCE(clientes_afetados, 0)),
+            COALESCE(SUM(sinal) FILTER (WHERE clientes_afetados IS NOT NULL), 0),
+            MIN(data_evento) FILTER (WHERE sinal > 0),
+            MAX(data_evento) FILTER (WHERE sinal > 0)
+        FROM ({delta}) AS delta
+        GROUP BY {expr_chave}, nivel_risco, COALESCE(status, '')
+        ON CONFLICT ({chave}, nivel_risco, status) DO UPDATE SET
+            total = r.total + EXCLUDED.total,
+            impacto_total = r.impacto_total + EXCLUDED.impacto_total,
+            impacto_qtd = r.impacto_qtd + EXCLUDED.impacto_qtd,
+            clientes_total = r.clientes_total + EXCLUDED.clientes_total,
+            clientes_qtd = r.clientes_qtd + EXCLUDED.clientes_qtd,
+            data_min = LEAST(r.data_min, EXCLUDED.data_min),
+            data_max = GREATEST(r.data_max, EXCLUDED.data_max);
+    """
+
+
+def _aplicar_nos_rollups(delta):
+    return (
+        _aplicar_delta('eventos_risco_diario', 'dia', 'data_evento::date', delta)
+        + _aplicar_delta('eventos_risco_mensal', 'mes', "date_trunc('month', data_evento)::date", delta)
+    )
+
+
+def _recalcular_datas(antigos):
+    # LEAST/GREATEST só alargam data_min/data_max; quando linhas saem de um
+    # bucket as datas são recalculadas: o diário a partir de eventos_risco
+    # (usa idx_data_evento_desc) e o mensal a partir do diário
+    return f"""
+        UPDATE eventos_risco_diario AS r
+        SET data_min = b.data_min, data_max = b.data_max
+        FROM (
+            SELECT t.dia, t.nivel_risco, t.status,
+                   MIN(e.data_evento) AS data_min, MAX(e.data_evento) AS data_max
+            FROM (SELECT DISTINCT data_evento::date AS dia, nivel_risco, COALESCE(status, '') AS status
+                  FROM {antigos}) AS t
+            LEFT JOIN eventos_risco AS e
+              ON e.data_evento >= t.dia AND e.data_evento < t.dia + 1
+             AND e.nivel_risco = t.nivel_risco AND COALESCE(e.status, '') = t.status
+            GROUP BY t.dia, t.nivel_risco, t.status
+        ) AS b
+        WHERE r.dia = b.dia AND r.nivel_risco = b.nivel_risco AND r.status = b.status;
+
+        UPDATE eventos_risco_mensal AS r
+        SET data_min = b.data_min, data_max = b.data_max
+        FROM (
+            SELECT t.mes, t.nivel_risco, t.status,
+                   MIN(d.data_min) AS data_min, MAX(d.data_max) AS data_max
+            FROM (SELECT DISTINCT date_trunc('month', data_evento)::date AS mes, nivel_risco,
+                         COALESCE(status, '') AS status
+                  FROM {antigos}) AS t
+            LEFT JOIN eventos_risco_diario AS d
+              ON d.dia >= t.mes AND d.dia < (t.mes + INTERVAL '1 month')::date
+             AND d.nivel_risco = t.nivel_risco AND d.status = t.status
+            GROUP BY t.mes, t.nivel_risco, t.status
+        ) AS b
+        WHERE r.mes = b.mes AND r.nivel_risco = b.nivel_risco AND r.status = b.status;
+    """
+
+
+_COLUNAS = "data_evento, nivel_risco, status, impacto_financeiro, clientes_afetados"
+_NOVOS = f"SELECT {_COLUNAS}, 1 AS sinal FROM novos"
+_ANTIGOS = f"SELECT {_COLUNAS}, -1 AS sinal FROM antigos"
+
+_FUNCAO_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION eventos_risco_atualizar_rollups() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- As tabelas de transição só existem no ramo do TG_OP correspondente
+    IF TG_OP = 'INSERT' THEN
+        {_aplicar_nos_rollups(_NOVOS)}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {_aplicar_nos_rollups(_NOVOS + ' UNION ALL ' + _ANTIGOS)}
+        {_recalcular_datas('antigos')}
+    ELSIF TG_OP = 'DELETE' THEN
+        {_aplicar_nos_rollups(_ANTIGOS)}
+        {_recalcular_datas('antigos')}
+    ELSIF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE eventos_risco_diario, eventos_risco_mensal;
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+COMANDOS = [
+    _tabela_rollup('eventos_risco_diario', 'dia'),
+    _tabela_rollup('eventos_risco_mensal', 'mes'),
+    _FUNCAO_TRIGGER,
+    "DROP TRIGGER IF EXISTS trg_rollups_insert ON eventos_risco",
+    "DROP TRIGGER IF EXISTS trg_rollups_update ON eventos_risco",
+    "DROP TRIGGER IF EXISTS trg_rollups_delete ON eventos_risco",
+    "DROP TRIGGER IF EXISTS trg_rollups_truncate ON eventos_risco",
+    """
+    CREATE TRIGGER trg_rollups_insert AFTER INSERT ON eventos_risco
+    REFERENCING NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION eventos_risco_atualizar_rollups()
+    """,
+    """
+    CREATE TRIGGER trg_rollups_update AFTER UPDATE ON eventos_risco
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION eventos_risco_atualizar_rollups()
+    """,
+    """
+    CREATE TRIGGER trg_rollups_delete AFTER DELETE ON eventos_risco
+    REFERENCING OLD TABLE AS antigos
+    FOR EACH STATEMENT EXECUTE FUNCTION eventos_risco_atualizar_rollups()
+    """,
+    """
+    CREATE TRIGGER trg_rollups_truncate AFTER TRUNCATE ON eventos_risco
+    FOR EACH STATEMENT EXECUTE FUNCTION eventos_risco_atualizar_rollups()
+    """,
+    *SQL_RECONSTRUIR
+]
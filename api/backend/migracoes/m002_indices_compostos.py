@@ -0,0 +1,22 @@
+VERSAO = '002'
+DESCRICAO = 'Índices compostos para os padrões de acesso de eventos_risco'
+# CREATE INDEX CONCURRENTLY não roda dentro de transação; os comandos são
+# idempotentes para a migração poder ser repetida se parar no meio
+TRANSACIONAL = False
+
+COMANDOS = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nivel_impacto
+    ON eventos_risco (nivel_risco, impacto_financeiro DESC)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_status_impacto
+    ON eventos_risco (status, impacto_financeiro DESC)
+    """,
+    # Também atende o cursor (data_evento, evento_id) de /api/eventos
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_data_evento_desc
+    ON eventos_risco (data_evento DESC, evento_id DESC)
+    """,
+    "ANALYZE eventos_risco"
+]
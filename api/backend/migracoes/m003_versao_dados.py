@@ -0,0 +1,30 @@
+VERSAO = '003'
+DESCRICAO = 'Contador de versão dos dados de eventos_risco mantido por trigger'
+TRANSACIONAL = True
+
+COMANDOS = [
+    """
+    CREATE TABLE IF NOT EXISTS versao_dados (
+        id SMALLINT PRIMARY KEY CHECK (id = 1),
+        versao BIGINT NOT NULL DEFAULT 0,
+        atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "INSERT INTO versao_dados (id) VALUES (1) ON CONFLICT (id) DO NOTHING",
+    # Um incremento por comando (não por linha), inclusive para escritas de
+    # fora da API como o notebook
+    """
+    CREATE OR REPLACE FUNCTION eventos_risco_incrementar_versao() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE versao_dados SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP WHERE id = 1;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS trg_versao_dados ON eventos_risco",
+    """
+    CREATE TRIGGER trg_versao_dados AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON eventos_risco
+    FOR EACH STATEMENT EXECUTE FUNCTION eventos_risco_incrementar_versao()
+    """
+]
@@ -0,0 +1,32 @@
+from ..database import DESCRICAO_TSV
+
+VERSAO = '004'
+DESCRICAO = 'Busca textual em descricao: tsvector em português, unaccent e pg_trgm'
+# Os índices GIN são criados com CONCURRENTLY; todos os comandos são
+# idempotentes para a migração poder ser repetida se parar no meio
+TRANSACIONAL = False
+
+COMANDOS = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # unaccent() é STABLE (depende do search_path); com o dicionário fixo o
+    # resultado é determinístico e a função pode ir num índice
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+    $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+    # Índice na expressão em vez de coluna gerada: ADD COLUMN ... STORED
+    # reescreveria a tabela sob ACCESS EXCLUSIVE, e o índice CONCURRENTLY
+    # não bloqueia as escritas
+    f"""
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_descricao_tsv
+    ON eventos_risco USING GIN ({DESCRICAO_TSV})
+    """,
+    # Substring (ex.: "transf", códigos) que o dicionário não reconhece como palavra
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_descricao_trgm
+    ON eventos_risco USING GIN (LOWER(f_unaccent(descricao)) gin_trgm_ops)
+    """,
+    "ANALYZE eventos_risco"
+]
@@ -0,0 +1,9 @@
+VERSAO = '005'
+DESCRICAO = 'Sequência para os IDs gerados na ingestão em lote'
+TRANSACIONAL = True
+
+COMANDOS = [
+    # Sufixo de 4 dígitos de EVT-<timestamp>-<sufixo>; substitui o randint do
+    # notebook, que colide com milhares de eventos no mesmo segundo
+    "CREATE SEQUENCE IF NOT EXISTS eventos_risco_evento_seq"
+]
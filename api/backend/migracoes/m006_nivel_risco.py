@@ -0,0 +1,18 @@
+VERSAO = '006'
+DESCRICAO = 'Grava nivel_risco sempre como Crítico/Alto/Médio/Baixo'
+TRANSACIONAL = True
+
+COMANDOS = [
+    # O notebook gravava 'critico'/'medio'; os filtros da API comparam com a
+    # forma do backend. Os triggers dos rollups e de versao_dados acompanham.
+    """
+    UPDATE eventos_risco
+    SET nivel_risco = CASE nivel_risco
+        WHEN 'critico' THEN 'Crítico'
+        WHEN 'alto' THEN 'Alto'
+        WHEN 'medio' THEN 'Médio'
+        WHEN 'baixo' THEN 'Baixo'
+    END
+    WHERE nivel_risco IN ('critico', 'alto', 'medio', 'baixo')
+    """
+]
@@ -0,0 +1,9 @@
+from .m001_rollups import COMANDOS as COMANDOS_ROLLUPS
+
+VERSAO = '007'
+DESCRICAO = 'Rollups recalculam data_min/data_max após DELETE/UPDATE e acompanham TRUNCATE'
+TRANSACIONAL = True
+
+# Bancos com a 001 antiga: recria a função e os triggers (agora com o de
+# TRUNCATE) e reconstrói os rollups para corrigir datas de eventos já removidos
+COMANDOS = list(COMANDOS_ROLLUPS)
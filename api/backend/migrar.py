@@ -0,0 +1,80 @@
+import argparse
+
+from .database import RECHECAGEM_SCHEMA, get_db_connection
+from .migracoes import MIGRACOES
+
+
+def _versoes_aplicadas(conn):
+    conn.run("""
+        CREATE TABLE IF NOT EXISTS schema_migracoes (
+            versao VARCHAR(20) PRIMARY KEY,
+            descricao TEXT,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return {r[0] for r in conn.run("SELECT versao FROM schema_migracoes")}
+
+
+def _aplicar(conn, migracao):
+    # Migrações não transacionais (ex.: CREATE INDEX CONCURRENTLY) rodam
+    # comando a comando em autocommit e precisam ser idempotentes
+    if migracao.TRANSACIONAL:
+        conn.run("BEGIN")
+
+    for comando in migracao.COMANDOS:
+        conn.run(comando)
+
+    conn.run(
+        "INSERT INTO schema_migracoes (versao, descricao) VALUES (:versao, :descricao)",
+        versao=migracao.VERSAO,
+        descricao=migracao.DESCRICAO
+    )
+
+    if migracao.TRANSACIONAL:
+        conn.run("COMMIT")
+
+
+def aplicar_migracoes():
+    aplicadas = []
+
+    with get_db_connection() as conn:
+        ja_aplicadas = _versoes_aplicadas(conn)
+        for migracao in MIGRACOES:
+            if migracao.VERSAO in ja_aplicadas:
+                continue
+            print(f"Aplicando migração {migracao.VERSAO}: {migracao.DESCRICAO}")
+            _aplicar(conn, migracao)
+            aplicadas.append(migracao.VERSAO)
+
+    return aplicadas
+
+
+def listar_migracoes():
+    with get_db_connection() as conn:
+        ja_aplicadas = _versoes_aplicadas(conn)
+
+    return [
+        (migracao.VERSAO, migracao.DESCRICAO, migracao.VERSAO in ja_aplicadas)
+        for migracao in MIGRACOES
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações do banco de eventos de risco")
+    parser.add_argument('--listar', action='store_true', help="mostra as migrações e se já foram aplicadas")
+    args = parser.parse_args()
+
+    if args.listar:
+        for versao, descricao, aplicada in listar_migracoes():
+            print(f"{versao} [{'x' if aplicada else ' '}] {descricao}")
+        return
+
+    aplicadas = aplicar_migracoes()
+    if not aplicadas:
+        print("Banco já está atualizado.")
+    else:
+        print(f"A API em execução passa a usar as migrações em até {RECHECAGEM_SCHEMA:g}s (DB_RECHECAGEM_SCHEMA).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Registro das colunas de eventos_risco e tipos de linha compactos.
+
+Cada consulta de database.py declara as colunas que seleciona como uma das
+tuplas abaixo e recebe as linhas como dataclasses com ``slots``: sem o dict
+por linha (dezenas de bytes de tabela hash a mais por evento) e serializadas
+direto pelo orjson na borda da API.
+"""
+from dataclasses import dataclass, fields, make_dataclass
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(slots=True)
+class Evento:
+    """Linha completa de eventos_risco, na ordem das colunas do SELECT."""
+
+    evento_id: str
+    data_evento: datetime
+    data_resolucao: Optional[datetime]
+    tempo_resolucao_horas: Optional[float]
+    nivel_risco: str
+    descricao: Optional[str]
+    impacto_financeiro: Optional[Decimal]
+    impacto_cliente: Optional[int]
+    clientes_afetados: Optional[int]
+    tempo_indisponibilidade: Optional[float]
+    frequencia_evento: Optional[int]
+    criticidade_sistema: Optional[int]
+    falha_processo: Optional[int]
+    fraude_interna: Optional[int]
+    recorrencia: Optional[int]
+    status: Optional[str]
+    created_at: Optional[datetime]
+
+
+# Colunas que não existem na tabela, mas são calculadas nas consultas
+_CALCULADAS = {'relevancia': Optional[float]}
+
+ESQUEMA_EVENTOS = {campo.name: campo.type for campo in fields(Evento)}
+_TIPOS = {**ESQUEMA_EVENTOS, **_CALCULADAS}
+
+# Formatos de linha usados pelas consultas
+COLUNAS_EVENTO = tuple(ESQUEMA_EVENTOS)
+COLUNAS_EVENTO_RESUMO = ('evento_id', 'data_evento', 'nivel_risco', 'descricao',
+                         'impacto_financeiro', 'clientes_afetados', 'status')
+COLUNAS_EVENTO_CONSULTA = ('evento_id', 'data_evento', 'nivel_risco', 'descricao',
+                           'impacto_financeiro', 'clientes_afetados',
+                           'tempo_indisponibilidade', 'criticidade_sistema', 'status')
+COLUNAS_EVENTO_BUSCA = COLUNAS_EVENTO_RESUMO + ('relevancia',)
+
+
+def lista_select(colunas):
+    return ', '.join(c for c in colunas if c not in _CALCULADAS)
+
+
+@lru_cache(maxsize=64)
+def modelo_linha(colunas):
+    """Dataclass com só as ``colunas`` pedidas (tupla, na ordem do SELECT),
+    criada uma vez por combinação."""
+    colunas = tuple(colunas)
+    if colunas == COLUNAS_EVENTO:
+        return Evento
+    desconhecidas = [c for c in colunas if c not in _TIPOS]
+    if desconhecidas:
+        raise ValueError(f"Colunas fora do esquema de eventos_risco: {', '.join(desconhecidas)}")
+    return make_dataclass(
+        'Evento_' + '_'.join(colunas),
+        [(coluna, _TIPOS[coluna]) for coluna in colunas],
+        slots=True
+    )
+
+
+def linhas_para_modelos(colunas, linhas):
+    modelo = modelo_linha(tuple(colunas))
+    return [modelo(*linha) for linha in linhas]
+
+
+def campo(registro, chave, padrao=None):
+    """Lê um campo tanto de uma linha do banco quanto de um dict (eventos
+    enviados pelo frontend, agregados)."""
+    if isinstance(registro, dict):
+        return registro.get(chave, padrao)
+    return getattr(registro, chave, padrao)
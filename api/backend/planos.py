@@ -0,0 +1,89 @@
+import argparse
+import json
+import sys
+from datetime import date, timedelta
+
+from .database import (
+    get_db_connection,
+    _consulta_eventos,
+    _consulta_pagina,
+    _consulta_dinamica,
+    _consulta_resumo_dashboard,
+    _consulta_texto,
+    _consulta_texto_trigrama,
+    _usar_busca_texto
+)
+
+
+def _consultas_verificadas():
+    hoje = date.today()
+    inicio = (hoje - timedelta(days=30)).isoformat()
+    mes = hoje.strftime('%Y-%m')
+
+    consultas = {
+        'get_eventos (período)': _consulta_eventos(inicio, hoje.isoformat()),
+        'get_eventos_pagina (período)': _consulta_pagina(inicio, hoje.isoformat())[:2],
+        'buscar_eventos_dinamico (mês)': _consulta_dinamica(mes=mes, ordem='data'),
+        'buscar_eventos_dinamico (nível por impacto)': _consulta_dinamica(nivel_risco='Crítico'),
+        'buscar_eventos_dinamico (status por impacto)': _consulta_dinamica(status='aberto'),
+        'get_resumo_dashboard (período)': _consulta_resumo_dashboard(inicio, hoje.isoformat()),
+    }
+
+    if _usar_busca_texto():
+        consultas['buscar_eventos_por_texto (full-text)'] = _consulta_texto('falha sistema')
+        consultas['buscar_eventos_por_texto (trigrama)'] = _consulta_texto_trigrama('transf')
+
+    return consultas
+
+
+def _varreduras_sequenciais(plano, tabela='eventos_risco'):
+    encontrados = []
+    if plano.get('Node Type') == 'Seq Scan' and plano.get('Relation Name') == tabela:
+        encontrados.append(plano)
+    for filho in plano.get('Plans', []):
+        encontrados.extend(_varreduras_sequenciais(filho, tabela))
+    return encontrados
+
+
+def verificar_planos():
+    """Roda EXPLAIN de cada consulta com enable_seqscan desligado.
+
+    Com a varredura sequencial desencorajada, o planejador só a escolhe se
+    nenhum índice puder atender o filtro ou a ordenação, o que indica uma
+    consulta não sargável. Funciona mesmo em bancos pequenos, onde o plano
+    normal preferiria a varredura por ser mais barata.
+    """
+    resultados = {}
+
+    with get_db_connection() as conn:
+        conn.run("BEGIN")
+        conn.run("SET LOCAL enable_seqscan = off")
+        for nome, (query, params) in _consultas_verificadas().items():
+            linhas = conn.run(f"EXPLAIN (FORMAT JSON) {query}", **params)
+            plano = linhas[0][0]
+            if isinstance(plano, str):
+                plano = json.loads(plano)
+            resultados[nome] = _varreduras_sequenciais(plano[0]['Plan'])
+        conn.run("ROLLBACK")
+
+    return resultados
+
+
+def main():
+    argparse.ArgumentParser(
+        description="Falha se alguma consulta de eventos_risco não conseguir usar índice"
+    ).parse_args()
+
+    falhas = 0
+    for nome, varreduras in verificar_planos().items():
+        if varreduras:
+            falhas += 1
+            print(f"FALHA  {nome}: Seq Scan em eventos_risco")
+        else:
+            print(f"ok     {nome}")
+
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Regra de pontuação de risco do notebook (classificar_nivel_risco),
+vetorizada sobre colunas, e o job que reclassifica eventos_risco.
+
+Uso:
+    python -m api.backend.pontuacao reclassificar [--lote 50000] [--simular]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .cache import notificar_escrita
+from .database import get_db_connection
+from .estatisticas import normalizar_nivel
+
+# Limites inferiores dos pontos 2, 3 e 4 de cada dimensão (abaixo do
+# primeiro, 1 ponto), como em classificar_nivel_risco do notebook
+LIMITES_FINANCEIRO = [50_000, 250_000, 1_000_000]
+LIMITES_CLIENTES = [100, 1_000, 10_000]
+LIMITES_TEMPO = [1, 4, 8]
+MAX_PONTOS_SISTEMA = 4
+
+PESO_FINANCEIRO = 0.35
+PESO_CLIENTES = 0.30
+PESO_TEMPO = 0.20
+PESO_SISTEMA = 0.15
+
+# Score mínimo de cada nível, do mais grave para o mais leve
+CORTES_NIVEL = [(2.6, 'critico'), (2.2, 'alto'), (1.75, 'medio')]
+NIVEL_PADRAO = 'baixo'
+
+LOTE_RECLASSIFICACAO = 50_000
+
+
+def _coluna(valores):
+    # NULL do banco (None vira NaN) conta como zero, o menor ponto de cada dimensão
+    return np.nan_to_num(np.asarray(valores, dtype=np.float64))
+
+
+def pontuar(impacto_financeiro, clientes_afetados, tempo_indisponibilidade, criticidade_sistema):
+    """Score ponderado de cada evento; recebe uma sequência por coluna."""
+    pontos_financeiro = np.digitize(_coluna(impacto_financeiro), LIMITES_FINANCEIRO) + 1
+    pontos_clientes = np.digitize(_coluna(clientes_afetados), LIMITES_CLIENTES) + 1
+    pontos_tempo = np.digitize(_coluna(tempo_indisponibilidade), LIMITES_TEMPO) + 1
+    pontos_sistema = np.minimum(_coluna(criticidade_sistema), MAX_PONTOS_SISTEMA)
+
+    # Mesma ordem das operações do notebook, para o score sair idêntico
+    return (
+        pontos_financeiro * PESO_FINANCEIRO +
+        pontos_clientes * PESO_CLIENTES +
+        pontos_tempo * PESO_TEMPO +
+        pontos_sistema * PESO_SISTEMA
+    )
+
+
+def classificar_niveis(impacto_financeiro, clientes_afetados, tempo_indisponibilidade, criticidade_sistema):
+    score = pontuar(impacto_financeiro, clientes_afetados, tempo_indisponibilidade, criticidade_sistema)
+    return np.select(
+        [score >= corte for corte, _ in CORTES_NIVEL],
+        [nivel for _, nivel in CORTES_NIVEL],
+        default=NIVEL_PADRAO
+    )
+
+
+def classificar_nivel_risco(evento):
+    """Versão de um evento só, com a mesma assinatura da do notebook."""
+    return str(classificar_niveis(
+        [evento['impacto_financeiro']],
+        [evento['clientes_afetados']],
+        [evento['tempo_indisponibilidade']],
+        [evento['criticidade_sistema']]
+    )[0])
+
+
+SQL_LOTE = """
+    SELECT id, impacto_financeiro::float8, clientes_afetados, tempo_indisponibilidade,
+           criticidade_sistema, nivel_risco
+    FROM eventos_risco
+    WHERE id > :ultimo_id
+    ORDER BY id
+    LIMIT :lote
+"""
+
+SQL_ATUALIZAR = """
+    UPDATE eventos_risco e
+    SET nivel_risco = novos.nivel_risco
+    FROM unnest(CAST(:ids AS INT[]), CAST(:niveis AS VARCHAR[])) AS novos(id, nivel_risco)
+    WHERE e.id = novos.id
+"""
+
+
+def reclassificar(lote=LOTE_RECLASSIFICACAO, simular=False, progresso=None):
+    """Reaplica a regra a toda a tabela, em lotes por id.
+
+    Cada lote é lido, pontuado de uma vez e só os eventos cujo nível mudou
+    são regravados, num único UPDATE por lote. Os lotes são independentes,
+    então o job pode ser interrompido e rodado de novo.
+    """
+    inicio = time.perf_counter()
+    lidos = alterados = 0
+    mudancas = {}
+    ultimo_id = 0
+
+    with get_db_connection() as conn:
+        while True:
+            linhas = conn.run(SQL_LOTE, ultimo_id=ultimo_id, lote=lote)
+            if not linhas:
+                break
+
+            ids, impacto, clientes, tempo, criticidade, atuais = zip(*linhas)
+            # A regra devolve a forma do notebook ('critico'); grava a do
+            # backend ('Crítico'), a usada nos filtros. Linhas antigas em
+            # minúsculas também são regravadas.
+            novos = [normalizar_nivel(n) for n in classificar_niveis(impacto, clientes, tempo, criticidade).tolist()]
+            alterar = [
+                (id_, novo, atual) for id_, novo, atual in zip(ids, novos, atuais)
+                if novo != atual
+            ]
+            for _, novo, atual in alterar:
+                chave = f"{atual} -> {novo}"
+                mudancas[chave] = mudancas.get(chave, 0) + 1
+
+            if alterar and not simular:
+                conn.run(
+                    SQL_ATUALIZAR,
+                    ids=[id_ for id_, _, _ in alterar],
+                    niveis=[novo for _, novo, _ in alterar]
+                )
+
+            lidos += len(linhas)
+            alterados += len(alterar)
+            ultimo_id = ids[-1]
+
+            if progresso:
+                progresso(lidos, alterados, time.perf_counter() - inicio)
+
+    if alterados and not simular:
+        notificar_escrita()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'lidos': lidos,
+        'alterados': alterados,
+        'simulacao': simular,
+        'mudancas': dict(sorted(mudancas.items(), key=lambda item: -item[1])),
+        'segundos': round(segundos, 3),
+        'linhas_por_s': round(lidos / segundos, 1) if segundos else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pontuação de risco de eventos_risco")
+    parser.add_argument(
+        'acao',
+        choices=['reclassificar'],
+        help="reclassificar: reaplica a regra de pontuação a todos os eventos"
+    )
+    parser.add_argument('--lote', type=int, default=LOTE_RECLASSIFICACAO, help="Eventos lidos por consulta")
+    parser.add_argument('--simular', action='store_true', help="Só conta o que mudaria, sem gravar")
+    args = parser.parse_args()
+
+    if args.acao == 'reclassificar':
+        def progresso(lidos, alterados, segundos):
+            print(f"{lidos} lidos, {alterados} alterados ({lidos / segundos:.0f} linhas/s)")
+
+        resultado = reclassificar(args.lote, args.simular, progresso)
+        verbo = "mudariam" if resultado['simulacao'] else "alterados"
+        print(
+            f"Reclassificação: {resultado['lidos']} eventos, {resultado['alterados']} {verbo} "
+            f"em {resultado['segundos']}s ({resultado['linhas_por_s']} linhas/s)"
+        )
+        for mudanca, quantidade in resultado['mudancas'].items():
+            print(f"  {mudanca}: {quantidade}")
+
+
+if __name__ == '__main__':
+    main()
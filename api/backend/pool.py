@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolEsgotadoError(Exception):
+    pass
+
+
+class _ConexaoPool:
+    __slots__ = ('conn', 'criada_em', 'ultimo_uso')
+
+    def __init__(self, conn):
+        agora = time.monotonic()
+        self.conn = conn
+        self.criada_em = agora
+        self.ultimo_uso = agora
+
+
+class _Espera:
+    __slots__ = ('evento', 'item')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.item = None
+
+
+class PoolConexoes:
+    """Pool limitado de conexões reutilizáveis.
+
+    As conexões ociosas ficam numa pilha (a mais recente é reutilizada
+    primeiro), são descartadas depois de ``max_ocioso`` segundos sem uso ou
+    ``max_vida`` segundos de existência, e passam por um ``SELECT 1`` antes
+    de serem entregues se ficaram paradas mais que ``intervalo_checagem``.
+    ``observar_espera``, se informado, recebe o tempo de cada aquisição.
+    """
+
+    def __init__(self, fabrica, tamanho_max=10, timeout_espera=10.0,
+                 max_ocioso=300.0, max_vida=1800.0, intervalo_checagem=30.0,
+                 observar_espera=None):
+        self._fabrica = fabrica
+        self._observar_espera = observar_espera
+        self.tamanho_max = tamanho_max
+        self.timeout_espera = timeout_espera
+        self.max_ocioso = max_ocioso
+        self.max_vida = max_vida
+        self.intervalo_checagem = intervalo_checagem
+
+        self._ociosas = deque()
+        self._total = 0
+        self._em_uso = 0
+        self._fila = deque()
+        self._lock = threading.Lock()
+
+        self._criadas = 0
+        self._destruidas = 0
+        self._aquisicoes = 0
+        self._esperas = 0
+        self._tempo_espera_total = 0.0
+        self._tempo_espera_max = 0.0
+        self._timeouts = 0
+        self._falhas_checagem = 0
+
+    def _expirada(self, item, agora):
+        if agora - item.criada_em >= self.max_vida:
+            return True
+        return agora - item.ultimo_uso >= self.max_ocioso
+
+    def _remover_expiradas(self, agora):
+        expiradas = []
+        # A base da pilha guarda as conexões paradas há mais tempo
+        while self._ociosas and self._expirada(self._ociosas[0], agora):
+            expiradas.append(self._ociosas.popleft())
+        self._total -= len(expiradas)
+        return expiradas
+
+    def _fechar(self, item):
+        try:
+            item.conn.close()
+        except Exception as e:
+            logger.debug(f"Erro ao fechar conexão do pool: {e}")
+        with self._lock:
+            self._destruidas += 1
+
+    def _criar(self):
+        item = _ConexaoPool(self._fabrica())
+        with self._lock:
+            self._criadas += 1
+        return item
+
+    def _saudavel(self, item):
+        try:
+            item.conn.run("SELECT 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Conexão do pool falhou na checagem de saúde: {e}")
+            with self._lock:
+                self._falhas_checagem += 1
+            return False
+
+    def _reservar(self):
+        # Chamado com o lock: entrega uma conexão ociosa ou reserva uma vaga
+        # para criar uma nova (None). Retorna False se o pool está cheio.
+        if self._ociosas:
+            self._em_uso += 1
+            return self._ociosas.pop()
+        if self._total < self.tamanho_max:
+            self._total += 1
+            self._em_uso += 1
+            return None
+        return False
+
+    def _atender_fila(self):
+        # Chamado com o lock: repassa vagas livres para quem espera, em ordem
+        while self._fila:
+            reserva = self._reservar()
+            if reserva is False:
+                return
+            espera = self._fila.popleft()
+            espera.item = reserva
+            espera.evento.set()
+
+    def adquirir(self, timeout=None):
+        timeout = self.timeout_espera if timeout is None else timeout
+        inicio = time.monotonic()
+
+        with self._lock:
+            expiradas = self._remover_expiradas(inicio)
+            self._atender_fila()
+            reserva = False if self._fila else self._reservar()
+            espera = None
+            if reserva is False:
+                espera = _Espera()
+                self._fila.append(espera)
+
+        for expirada in expiradas:
+            self._fechar(expirada)
+
+        if espera is not None:
+            espera.evento.wait(timeout)
+            with self._lock:
+                if espera.evento.is_set():
+                    reserva = espera.item
+                else:
+                    self._fila.remove(espera)
+                    self._timeouts += 1
+                    raise PoolEsgotadoError(
+                        f"Nenhuma conexão livre após {timeout:.1f}s "
+                        f"({self.tamanho_max} conexões em uso)"
+                    )
+
+        item = reserva
+        try:
+            if item is not None and time.monotonic() - item.ultimo_uso >= self.intervalo_checagem:
+                if not self._saudavel(item):
+                    self._fechar(item)
+                    item = None
+            if item is None:
+                item = self._criar()
+        except Exception:
+            with self._lock:
+                self._total -= 1
+                self._em_uso -= 1
+                self._atender_fila()
+            raise
+
+        tempo_espera = time.monotonic() - inicio
+        with self._lock:
+            self._aquisicoes += 1
+            if espera is not None:
+                self._esperas += 1
+            self._tempo_espera_total += tempo_espera
+            self._tempo_espera_max = max(self._tempo_espera_max, tempo_espera)
+
+        if self._observar_espera is not None:
+            self._observar_espera(tempo_espera)
+
+        return item
+
+    def devolver(self, item, descartar=False):
+        agora = time.monotonic()
+        with self._lock:
+            self._em_uso -= 1
+            self._total -= 1
+            fechar = descartar or agora - item.criada_em >= self.max_vida
+            if not fechar:
+                item.ultimo_uso = agora
+                self._ociosas.append(item)
+                self._total += 1
+            self._atender_fila()
+
+        if fechar:
+            self._fechar(item)
+
+    @contextmanager
+    def conexao(self, timeout=None):
+        item = self.adquirir(timeout)
+        descartar = False
+        try:
+            yield item.conn
+        except Exception:
+            # Garante que uma transação aberta não volte suja para o pool
+            try:
+                item.conn.run("ROLLBACK")
+            except Exception:
+                descartar = True
+            raise
+        finally:
+            self.devolver(item, descartar=descartar)
+
+    def fechar_todas(self):
+        with self._lock:
+            ociosas = list(self._ociosas)
+            self._ociosas.clear()
+            self._total -= len(ociosas)
+            self._atender_fila()
+        for item in ociosas:
+            self._fechar(item)
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'tamanho_max': self.tamanho_max,
+                'total': self._total,
+                'em_uso': self._em_uso,
+                'ociosas': len(self._ociosas),
+                'criadas': self._criadas,
+                'destruidas': self._destruidas,
+                'aquisicoes': self._aquisicoes,
+                'esperas': self._esperas,
+                'tempo_espera_total_s': round(self._tempo_espera_total, 6),
+                'tempo_espera_medio_s': round(self._tempo_espera_total / self._aquisicoes, 6) if self._aquisicoes else 0.0,
+                'tempo_espera_max_s': round(self._tempo_espera_max, 6),
+                'timeouts': self._timeouts,
+                'falhas_checagem': self._falhas_checagem,
+            }
@@ -0,0 +1,140 @@
+import logging
+import math
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from .modelos import campo
+
+logger = logging.getLogger(__name__)
+
+CARACTERES_POR_TOKEN = 4
+
+
+def estimar_tokens(texto):
+    # Aproximação do tokenizer do Gemini para texto em português; evita uma
+    # chamada a count_tokens por mensagem
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def _celula(valor, max_caracteres=None, moeda=False):
+    if valor is None or valor == '':
+        return '-'
+    if isinstance(valor, (float, Decimal)):
+        # Reais sem centavos; horas, médias etc. com até 2 casas
+        if moeda:
+            return f"{valor:.0f}"
+        return f"{valor:.2f}".rstrip('0').rstrip('.')
+    texto = str(valor).replace('|', '/').replace('\n', ' ')
+    if max_caracteres and len(texto) > max_caracteres:
+        texto = texto[:max_caracteres - 1] + '…'
+    return texto
+
+
+def tabela(colunas, registros, max_caracteres=None):
+    """Codifica registros (linhas do banco ou dicts) como linhas separadas
+    por '|', com uma linha de cabeçalho. ``colunas`` é uma lista de (chave,
+    rótulo); colunas com rótulo terminado em '_rs' são valores em reais."""
+    linhas = ['|'.join(rotulo for _, rotulo in colunas)]
+    for registro in registros:
+        linhas.append('|'.join(
+            _celula(campo(registro, chave), max_caracteres, rotulo.endswith('_rs'))
+            for chave, rotulo in colunas
+        ))
+    return linhas
+
+
+@dataclass(slots=True)
+class SecaoPrompt:
+    """Trecho do prompt que pode ser cortado linha a linha.
+
+    As ``fixas`` primeiras linhas (ex.: cabeçalho de tabela) nunca são
+    cortadas; das demais ficam as primeiras, ou as últimas quando
+    ``manter_final`` (histórico de conversa).
+    """
+
+    nome: str
+    titulo: str = ''
+    linhas: list = field(default_factory=list)
+    relevancia: int = 0
+    obrigatoria: bool = False
+    fixas: int = 0
+    manter_final: bool = False
+
+    def texto(self, quantidade=None):
+        cabecalho = self.linhas[:self.fixas]
+        corpo = self.linhas[self.fixas:]
+        omitidas = 0
+        if quantidade is not None and quantidade < len(corpo):
+            omitidas = len(corpo) - quantidade
+            corpo = corpo[-quantidade:] if self.manter_final and quantidade else corpo[:quantidade]
+
+        partes = [self.titulo] if self.titulo else []
+        partes += cabecalho + corpo
+        if omitidas:
+            partes.append(f"(+{omitidas} linhas omitidas)")
+        return '\n'.join(partes)
+
+    def ajustar(self, limite_tokens):
+        """Maior versão da seção que cabe em ``limite_tokens``, ou None."""
+        texto = self.texto()
+        if estimar_tokens(texto) <= limite_tokens:
+            return texto
+
+        corpo = len(self.linhas) - self.fixas
+        # Maior quantidade de linhas que cabe (o tamanho cresce com a quantidade)
+        baixo, alto = 0, corpo - 1
+        while baixo < alto:
+            meio = (baixo + alto + 1) // 2
+            if estimar_tokens(self.texto(meio)) <= limite_tokens:
+                baixo = meio
+            else:
+                alto = meio - 1
+
+        if baixo == 0:
+            return None
+        return self.texto(baixo)
+
+
+class MontadorPrompt:
+    """Junta as seções do prompt dentro de um orçamento de tokens.
+
+    Seções obrigatórias entram sempre; as demais são escolhidas por
+    relevância (e cortadas se preciso) até o orçamento acabar, mas aparecem
+    no prompt na ordem em que foram adicionadas.
+    """
+
+    def __init__(self, orcamento_tokens):
+        self.orcamento_tokens = orcamento_tokens
+        self._secoes = []
+
+    def adicionar(self, secao):
+        if secao.titulo or secao.linhas:
+            self._secoes.append(secao)
+
+    def montar(self):
+        textos = {}
+        restante = self.orcamento_tokens
+
+        for i, secao in enumerate(self._secoes):
+            if secao.obrigatoria:
+                textos[i] = secao.texto()
+                restante -= estimar_tokens(textos[i])
+
+        opcionais = [i for i, secao in enumerate(self._secoes) if not secao.obrigatoria]
+        for i in sorted(opcionais, key=lambda i: -self._secoes[i].relevancia):
+            texto = self._secoes[i].ajustar(restante)
+            if texto is not None:
+                textos[i] = texto
+                restante -= estimar_tokens(texto)
+
+        partes = [textos[i] for i in sorted(textos)]
+        contagens = {self._secoes[i].nome: estimar_tokens(textos[i]) for i in sorted(textos)}
+        descartadas = [s.nome for i, s in enumerate(self._secoes) if i not in textos]
+
+        prompt = '\n\n'.join(partes)
+        logger.info(
+            f"Prompt: ~{estimar_tokens(prompt)} tokens (orçamento {self.orcamento_tokens}) - "
+            + ', '.join(f"{nome}={tokens}" for nome, tokens in contagens.items())
+            + (f" | descartadas: {', '.join(descartadas)}" if descartadas else '')
+        )
+        return prompt, contagens
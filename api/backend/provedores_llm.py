@@ -0,0 +1,214 @@
+"""Provedores de LLM da Yoyo: o Gemini e um substituto local determinístico.
+
+Um provedor gera texto a partir do prompt (``gerar`` e o gerador assíncrono
+``gerar_stream``) e diz quais erros valem nova tentativa. Limites de uso,
+novas tentativas e disjuntor ficam no ClienteLLM (cliente_llm.py), iguais
+para qualquer provedor. ``LLM_PROVEDOR`` escolhe qual usar (padrão gemini).
+"""
+import abc
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from .metricas import Contador, registrar
+
+logger = logging.getLogger(__name__)
+
+TOKENS_LLM = registrar(Contador(
+    'yoyo_llm_tokens_total',
+    'Tokens contados pelo Gemini (usage_metadata)',
+    rotulos=('tipo',)
+))
+
+
+class ProvedorLLM(abc.ABC):
+    nome = None
+
+    @abc.abstractmethod
+    async def gerar(self, prompt):
+        """Texto completo gerado para ``prompt``."""
+
+    @abc.abstractmethod
+    def gerar_stream(self, prompt):
+        """Gerador assíncrono com os trechos do texto, na ordem."""
+
+    def erro_temporario(self, erro):
+        """Se ``erro`` passa sozinho (rate limit, indisponibilidade) e a
+        chamada pode ser tentada de novo."""
+        return False
+
+    def espera_sugerida(self, erro):
+        """Segundos pedidos pelo servidor antes da nova tentativa, ou None."""
+        return None
+
+
+def _espera_sugerida_google(erro):
+    # Cabeçalho Retry-After (transporte REST), RetryInfo dos detalhes (gRPC e
+    # REST) e, por fim, o "retry in Xs" da mensagem
+    resposta = getattr(erro, 'response', None)
+    valor = (getattr(resposta, 'headers', None) or {}).get('retry-after')
+    if valor:
+        try:
+            return max(float(valor), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(valor).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+
+    for detalhe in getattr(erro, 'details', None) or []:
+        if isinstance(detalhe, dict):
+            atraso = re.fullmatch(r'([\d.]+)s', str(detalhe.get('retryDelay', '')))
+            if atraso:
+                return float(atraso.group(1))
+        elif getattr(detalhe, 'retry_delay', None) is not None:
+            return detalhe.retry_delay.seconds + detalhe.retry_delay.nanos / 1e9
+
+    atraso = re.search(r'retry in ([\d.]+)\s*s', str(erro), re.IGNORECASE)
+    return float(atraso.group(1)) if atraso else None
+
+
+class ProvedorGemini(ProvedorLLM):
+    """Gemini pelo SDK google-generativeai.
+
+    O SDK só é importado e configurado na primeira chamada, então importar a
+    aplicação não exige chave, rede nem o pacote instalado. Com ``endpoint``
+    o SDK fala REST com outro servidor (ex.: benchmarks/gemini_stub.py).
+    """
+
+    nome = 'gemini'
+
+    def __init__(self, modelo='gemini-2.5-flash', api_key=None, endpoint=None, config_geracao=None):
+        self.modelo = modelo
+        self.endpoint = endpoint
+        self.config_geracao = config_geracao
+        self._api_key = api_key
+        self._modelo = None
+        self._erros_temporarios = ()
+        self._lock = threading.Lock()
+
+    def _obter_modelo(self):
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    import google.generativeai as genai
+                    from google.api_core import exceptions as google_exceptions
+
+                    if self.endpoint:
+                        genai.configure(
+                            api_key=self._api_key or 'stub',
+                            transport='rest',
+                            client_options={'api_endpoint': self.endpoint}
+                        )
+                    else:
+                        genai.configure(api_key=self._api_key)
+
+                    # Rate limit/cota (429) e indisponibilidade (503)
+                    self._erros_temporarios = (
+                        google_exceptions.TooManyRequests,
+                        google_exceptions.ResourceExhausted,
+                        google_exceptions.ServiceUnavailable,
+                    )
+                    self._modelo = genai.GenerativeModel(self.modelo, generation_config=self.config_geracao)
+        return self._modelo
+
+    async def gerar(self, prompt):
+        modelo = self._obter_modelo()
+        if self.endpoint:
+            # O cliente assíncrono do SDK não funciona com transport='rest'
+            response = await asyncio.to_thread(modelo.generate_content, prompt)
+        else:
+            response = await modelo.generate_content_async(prompt)
+        self._registrar_uso(response)
+        return response.text
+
+    async def gerar_stream(self, prompt):
+        modelo = self._obter_modelo()
+        if self.endpoint:
+            response = await asyncio.to_thread(modelo.generate_content, prompt, stream=True)
+            chunks = iter(response)
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                yield self._texto_chunk(chunk)
+        else:
+            response = await modelo.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                yield self._texto_chunk(chunk)
+        self._registrar_uso(response)
+
+    def erro_temporario(self, erro):
+        return isinstance(erro, self._erros_temporarios)
+
+    def espera_sugerida(self, erro):
+        return _espera_sugerida_google(erro)
+
+    def _registrar_uso(self, response):
+        uso = getattr(response, 'usage_metadata', None)
+        if uso is None:
+            return
+        TOKENS_LLM.incrementar(getattr(uso, 'prompt_token_count', 0) or 0, tipo='entrada')
+        TOKENS_LLM.incrementar(getattr(uso, 'candidates_token_count', 0) or 0, tipo='saida')
+
+    def _texto_chunk(self, chunk):
+        # Chunks sem texto (ex.: bloqueio de segurança) levantam ValueError
+        try:
+            return chunk.text
+        except ValueError:
+            return ''
+
+
+class ProvedorLocal(ProvedorLLM):
+    """Substituto do Gemini sem rede: o mesmo prompt gera sempre o mesmo
+    texto, depois de ``latencia`` segundos. Serve para rodar a Yoyo offline
+    e para medir a API sem depender do LLM."""
+
+    nome = 'local'
+
+    def __init__(self, latencia=0.0, chunks=8, intervalo_chunk=0.0):
+        self.latencia = latencia
+        self.chunks = chunks
+        self.intervalo_chunk = intervalo_chunk
+
+    def _texto(self, prompt):
+        resumo = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        return (
+            f"Resposta local {resumo}, gerada sem o modelo de linguagem a partir de um prompt "
+            f"de {len(prompt)} caracteres.\n\nOs dados do contexto foram recebidos, mas esta "
+            f"resposta não os analisa."
+        )
+
+    async def gerar(self, prompt):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return self._texto(prompt)
+
+    async def gerar_stream(self, prompt):
+        texto = self._texto(prompt)
+        tamanho = -(-len(texto) // self.chunks)
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        for i in range(0, len(texto), tamanho):
+            if i and self.intervalo_chunk:
+                await asyncio.sleep(self.intervalo_chunk)
+            yield texto[i:i + tamanho]
+
+
+def criar_provedor(nome=None, config_geracao=None):
+    nome = (nome or os.getenv('LLM_PROVEDOR') or 'gemini').lower()
+    if nome == 'local':
+        return ProvedorLocal(
+            latencia=float(os.getenv('LLM_LOCAL_LATENCIA', 0)),
+            intervalo_chunk=float(os.getenv('LLM_LOCAL_INTERVALO_CHUNK', 0))
+        )
+    if nome == 'gemini':
+        return ProvedorGemini(
+            modelo=os.getenv('GEMINI_MODELO', 'gemini-2.5-flash'),
+            api_key=os.getenv('GEMINI_API_KEY'),
+            endpoint=os.getenv('GEMINI_API_ENDPOINT') or None,
+            config_geracao=config_geracao
+        )
+    raise ValueError(f"LLM_PROVEDOR desconhecido: {nome} (use 'gemini' ou 'local')")
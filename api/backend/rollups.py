@@ -0,0 +1,85 @@
+import argparse
+import time
+
+from .database import get_db_connection
+
+TABELAS_ROLLUP = {
+    'eventos_risco_diario': 'dia',
+    'eventos_risco_mensal': 'mes'
+}
+
+_COLUNAS_AGREGADAS = """
+    COUNT(*),
+    COALESCE(SUM(impacto_financeiro), 0),
+    COUNT(*) FILTER (WHERE impacto_financeiro IS NOT NULL),
+    COALESCE(SUM(clientes_afetados), 0),
+    COUNT(*) FILTER (WHERE clientes_afetados IS NOT NULL),
+    MIN(data_evento),
+    MAX(data_evento)"""
+
+SQL_RECONSTRUIR = [
+    "LOCK TABLE eventos_risco IN SHARE MODE",
+    "TRUNCATE eventos_risco_diario, eventos_risco_mensal",
+    f"""
+    INSERT INTO eventos_risco_diario
+        (dia, nivel_risco, status, total, impacto_total, impacto_qtd,
+         clientes_total, clientes_qtd, data_min, data_max)
+    SELECT
+        data_evento::date, nivel_risco, COALESCE(status, ''),{_COLUNAS_AGREGADAS}
+    FROM eventos_risco
+    GROUP BY data_evento::date, nivel_risco, COALESCE(status, '')
+    """,
+    """
+    INSERT INTO eventos_risco_mensal
+        (mes, nivel_risco, status, total, impacto_total, impacto_qtd,
+         clientes_total, clientes_qtd, data_min, data_max)
+    SELECT
+        date_trunc('month', dia)::date, nivel_risco, status,
+        SUM(total), SUM(impacto_total), SUM(impacto_qtd),
+        SUM(clientes_total), SUM(clientes_qtd), MIN(data_min), MAX(data_max)
+    FROM eventos_risco_diario
+    GROUP BY date_trunc('month', dia)::date, nivel_risco, status
+    """
+]
+
+
+def reconstruir_rollups():
+    inicio = time.perf_counter()
+
+    with get_db_connection() as conn:
+        conn.run("BEGIN")
+        for comando in SQL_RECONSTRUIR:
+            conn.run(comando)
+        conn.run("COMMIT")
+
+        dias = conn.run("SELECT COUNT(*) FROM eventos_risco_diario")[0][0]
+        meses = conn.run("SELECT COUNT(*) FROM eventos_risco_mensal")[0][0]
+
+    return {
+        'buckets_diarios': dias,
+        'buckets_mensais': meses,
+        'segundos': round(time.perf_counter() - inicio, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rollups diários e mensais de eventos_risco"
+    )
+    parser.add_argument(
+        'acao',
+        choices=['reconstruir'],
+        help="reconstruir: recalcula os rollups a partir de eventos_risco"
+    )
+    args = parser.parse_args()
+
+    if args.acao == 'reconstruir':
+        resultado = reconstruir_rollups()
+        print(
+            f"Rollups reconstruídos: {resultado['buckets_diarios']} buckets diários, "
+            f"{resultado['buckets_mensais']} mensais em {resultado['segundos']}s"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _serializar_extra(valor):
+    # datetime, date e dataclasses o orjson já serializa em C; só os DECIMAL
+    # do pg8000 passam por aqui
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def dumps(conteudo):
+    return orjson.dumps(conteudo, default=_serializar_extra, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RespostaORJSON(JSONResponse):
+    """Resposta JSON serializada com orjson.
+
+    Para evitar o ``jsonable_encoder`` do FastAPI, que percorre cada valor em
+    Python, o handler deve retornar a instância diretamente em vez de um dict.
+    """
+
+    def render(self, content):
+        return dumps(content)
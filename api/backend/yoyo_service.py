@@ -1,17 +1,28 @@
-import google.generativeai as genai
+import asyncio
 import os
 import re
 import logging
 import time
 from dotenv import load_dotenv
+from .cache import CacheTTL, registrar_invalidacao
+from .cache_respostas import CacheRespostas, gerar_chave, normalizar_mensagem
+from .cliente_llm import CircuitoAbertoError, ClienteLLM, Disjuntor, LimiteLLMError
+from .intencao import DetectorIntencao
+from .metricas import Contador, Histograma, Medidor, medir, observar, registrar
+from .modelos import campo
+from .prompt import MontadorPrompt, SecaoPrompt, estimar_tokens, tabela
+from .provedores_llm import criar_provedor
 from .database import (
-    get_estatisticas_completas,
+    get_estatisticas_agregadas,
     get_top_eventos_criticos,
-    get_eventos_por_mes,
-    get_evento_by_id,
+    get_eventos_por_mes
+)
+from .database_async import (
+    executar as executar_db,
+    get_eventos_by_ids,
     buscar_eventos_dinamico,
     buscar_eventos_por_texto,
-    get_resumo_por_nivel
+    get_versao_dados
 )
 
 load_dotenv()
@@ -19,8 +30,59 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-genai.configure(api_key=GEMINI_API_KEY)
+CONFIG_GERACAO = {
+    'temperature': 0.3,
+    'top_p': 0.9,
+    'max_output_tokens': 4000,
+}
+
+GEMINI_MAX_TENTATIVAS = int(os.getenv('GEMINI_MAX_TENTATIVAS', 3))
+GEMINI_ESPERA_BASE = float(os.getenv('GEMINI_ESPERA_BASE', 2))
+GEMINI_ESPERA_MAX = float(os.getenv('GEMINI_ESPERA_MAX', 30))
+# Cota do modelo (requisições e tokens por minuto; 0 desativa o limite)
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', 1000))
+GEMINI_TPM = int(os.getenv('GEMINI_TPM', 1000000))
+GEMINI_CONCORRENCIA = int(os.getenv('GEMINI_CONCORRENCIA', 8))
+GEMINI_FILA_MAX = int(os.getenv('GEMINI_FILA_MAX', 100))
+GEMINI_FILA_TIMEOUT = float(os.getenv('GEMINI_FILA_TIMEOUT', 15))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60))
+# Disjuntor: com o LLM falhando ou lento, a Yoyo responde só com os dados
+LLM_DISJUNTOR_TAXA = float(os.getenv('LLM_DISJUNTOR_TAXA', 0.5))
+LLM_DISJUNTOR_LENTIDAO = float(os.getenv('LLM_DISJUNTOR_LENTIDAO', 20))
+LLM_DISJUNTOR_MIN_CHAMADAS = int(os.getenv('LLM_DISJUNTOR_MIN_CHAMADAS', 10))
+LLM_DISJUNTOR_JANELA = float(os.getenv('LLM_DISJUNTOR_JANELA', 60))
+LLM_DISJUNTOR_TEMPO_ABERTO = float(os.getenv('LLM_DISJUNTOR_TEMPO_ABERTO', 30))
+LLM_DISJUNTOR_TIMEOUTS = int(os.getenv('LLM_DISJUNTOR_TIMEOUTS', 3))
+YOYO_PROMPT_MAX_TOKENS = int(os.getenv('YOYO_PROMPT_MAX_TOKENS', 6000))
+# Tempo máximo de cada consulta do contexto; a seção que passar disso fica
+# fora do prompt em vez de atrasar (ou derrubar) a resposta
+YOYO_TIMEOUT_CONSULTA = float(os.getenv('YOYO_TIMEOUT_CONSULTA', 3))
+
+TAMANHO_PROMPT = registrar(Histograma(
+    'yoyo_prompt_tokens',
+    'Tamanho estimado do prompt enviado ao Gemini, em tokens',
+    limites=(250, 500, 1000, 2000, 3000, 4000, 5000, 6000, 8000, 12000)
+))
+TOKENS_SECAO = registrar(Contador(
+    'yoyo_prompt_secao_tokens_total',
+    'Tokens estimados de cada seção incluída no prompt',
+    rotulos=('secao',)
+))
+SECOES_OMITIDAS = registrar(Contador(
+    'yoyo_secoes_omitidas_total',
+    'Seções de dados deixadas fora do prompt por timeout ou erro na consulta',
+    rotulos=('secao', 'motivo')
+))
+ERROS_LLM = registrar(Contador(
+    'yoyo_llm_erros_total',
+    'Respostas de erro devolvidas ao usuário, por categoria',
+    rotulos=('erro',)
+))
+RESPOSTAS_SOMENTE_DADOS = registrar(Contador(
+    'yoyo_respostas_somente_dados_total',
+    'Respostas montadas só com os dados do banco, com o disjuntor do LLM aberto',
+    rotulos=('modo',)
+))
 
 
 class ConversationState:
@@ -60,6 +122,7 @@ ACESSO AOS DADOS:
 - Use os DADOS DA TELA para responder perguntas sobre o período/filtro atual.
 - Quando o usuário mencionar um ID de evento (formato EVT-XXXXXXXXXXXXXX-XXXX), você receberá os detalhes completos desse evento automaticamente.
 - Você pode analisar qualquer evento do banco, basta o usuário informar o ID.
+- Listas de eventos e estatísticas vêm em tabelas: a primeira linha é o cabeçalho e as colunas são separadas por "|". Valores em R$ vêm sem formatação; "-" indica valor ausente.
 
 ESCOPO:
 - Explicar eventos de risco operacional.
@@ -100,17 +163,124 @@ Você é assistente técnica de apoio à decisão, integrada ao sistema de monit
 Você TEM ACESSO ao banco de dados completo E aos dados da tela do usuário.
 """
 
+# Relevância de cada seção de contexto para o orçamento do prompt: quando não
+# cabe tudo, as seções menos relevantes para a pergunta são cortadas primeiro
+RELEVANCIA_SECOES = {
+    'eventos_mencionados': 100,
+    'consulta': 90,
+    'tela': 80,
+    'estatisticas': 70,
+    'historico': 60,
+    'eventos_tela': 50,
+    'top_criticos': 40,
+    'por_mes': 30,
+}
+
+AJUSTES_RELEVANCIA = {
+    'mes': {'por_mes': 85},
+    'nivel': {'estatisticas': 85},
+    'status': {'estatisticas': 85},
+    'resumo_geral': {'estatisticas': 95, 'top_criticos': 75, 'por_mes': 75},
+    None: {'eventos_tela': 75, 'top_criticos': 55},
+}
+
+COLUNAS_EVENTO_DETALHE = [
+    ('evento_id', 'id'), ('nivel_risco', 'nivel'), ('data_evento', 'data'),
+    ('impacto_financeiro', 'impacto_rs'), ('clientes_afetados', 'clientes'),
+    ('tempo_indisponibilidade', 'indisp_h'), ('criticidade_sistema', 'criticidade_1a5'),
+    ('status', 'status'), ('descricao', 'descricao'),
+]
+COLUNAS_EVENTO_LISTA = [
+    ('evento_id', 'id'), ('nivel_risco', 'nivel'), ('data_evento', 'data'),
+    ('impacto_financeiro', 'impacto_rs'), ('clientes_afetados', 'clientes'),
+    ('status', 'status'), ('descricao', 'descricao'),
+]
+COLUNAS_EVENTO_TELA = [
+    ('evento_id', 'id'), ('nivel_risco', 'nivel'), ('data_evento', 'data'),
+    ('impacto_financeiro', 'impacto_rs'), ('clientes_afetados', 'clientes'),
+    ('descricao', 'descricao'),
+]
+COLUNAS_EVENTO_RESUMO = [
+    ('evento_id', 'id'), ('nivel_risco', 'nivel'), ('impacto_financeiro', 'impacto_rs'),
+    ('clientes_afetados', 'clientes'), ('status', 'status'),
+]
+COLUNAS_RESUMO_NIVEL = [
+    ('nivel', 'nivel'), ('total', 'eventos'), ('impacto_total', 'impacto_total_rs'),
+    ('impacto_medio', 'impacto_medio_rs'), ('clientes_total', 'clientes_total'),
+    ('clientes_medio', 'clientes_medio'),
+]
+COLUNAS_MES = [('mes', 'mes'), ('total', 'eventos'), ('criticos', 'criticos'), ('impacto', 'impacto_rs')]
+
+
+class LimpadorIncremental:
+    """Aplica a limpeza de _limpar_saudacao_resposta a uma resposta que chega
+    em pedaços.
+
+    Segura o começo da resposta até dar para reconhecer uma saudação, o
+    trecho a partir de um marcador Markdown ainda sem par (o par pode vir
+    depois de uma quebra de linha), um cabeçalho incompleto e espaços
+    finais. Um marcador que fica mais de MAX_SEGURADO caracteres sem par é
+    tratado como texto.
+    """
+
+    TAMANHO_SAUDACAO = 20
+    MAX_SEGURADO = 2000
+
+    def __init__(self, yoyo):
+        self._yoyo = yoyo
+        self._pendente = ''
+        self._inicio_resposta = True
+        self._inicio_linha = True
+
+    def alimentar(self, texto: str) -> str:
+        self._pendente += texto
+
+        if self._inicio_resposta:
+            inicio = self._pendente.lstrip()
+            if len(inicio) < self.TAMANHO_SAUDACAO and '\n' not in inicio:
+                return ''
+            self._pendente = self._yoyo._remover_saudacao(inicio)
+            self._inicio_resposta = False
+
+        return self._emitir()
+
+    def finalizar(self) -> str:
+        if self._inicio_resposta:
+            self._pendente = self._yoyo._remover_saudacao(self._pendente.lstrip())
+            self._inicio_resposta = False
+
+        limpo = self._yoyo._remover_markdown(self._pendente, self._inicio_linha)
+        self._pendente = ''
+        return limpo.rstrip()
+
+    def _emitir(self) -> str:
+        linha_atual = self._pendente[self._pendente.rfind('\n') + 1:]
+        segurado = ''
+        em_inicio_de_linha = self._inicio_linha or '\n' in self._pendente
+        if em_inicio_de_linha and re.fullmatch(r'#+\s*', linha_atual):
+            segurado = linha_atual
+            self._pendente = self._pendente[:-len(linha_atual)]
+
+        limpo = self._yoyo._remover_markdown(self._pendente, self._inicio_linha)
+
+        # O que sobrou de '*' e '`' depois da limpeza ainda não tem par
+        corte = len(limpo.rstrip())
+        for marcador in re.finditer(r'[*`]', limpo[:corte]):
+            if corte - marcador.start() <= self.MAX_SEGURADO:
+                corte = marcador.start()
+                break
+
+        emitido = limpo[:corte]
+        self._pendente = limpo[corte:] + segurado
+        if emitido:
+            self._inicio_linha = emitido.endswith('\n')
+
+        return emitido
+
 
 class YoyoIA:
-    def __init__(self):
-        self.model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            generation_config={
-                'temperature': 0.3,
-                'top_p': 0.9,
-                'max_output_tokens': 4000,
-            }
-        )
+    def __init__(self, provedor=None):
+        self.provedor = provedor or criar_provedor(config_geracao=CONFIG_GERACAO)
 
         self.name_patterns = [
             r'(?:meu nome é|me chamo|pode me chamar de|sou o|sou a|eu sou)\s+([A-Za-zÀ-ÿ]+)',
@@ -121,108 +291,69 @@ class YoyoIA:
 
         self.evento_id_pattern = re.compile(r'EVT-\d{14}-\d{4}', re.IGNORECASE)
 
-        self.meses_map = {
-            'janeiro': '01', 'fevereiro': '02', 'março': '03', 'marco': '03',
-            'abril': '04', 'maio': '05', 'junho': '06', 'julho': '07',
-            'agosto': '08', 'setembro': '09', 'outubro': '10',
-            'novembro': '11', 'dezembro': '12'
-        }
-
-    def _detectar_consulta_inteligente(self, mensagem: str) -> dict:
-        mensagem_lower = mensagem.lower()
-        consulta = {'tipo': None, 'params': {}}
-
-        if any(p in mensagem_lower for p in ['crítico', 'critico', 'críticos', 'criticos']):
-            consulta['tipo'] = 'nivel'
-            consulta['params']['nivel_risco'] = 'Crítico'
-        elif any(p in mensagem_lower for p in ['alto risco', 'alto']):
-            consulta['tipo'] = 'nivel'
-            consulta['params']['nivel_risco'] = 'Alto'
-        elif any(p in mensagem_lower for p in ['médio', 'medio']):
-            consulta['tipo'] = 'nivel'
-            consulta['params']['nivel_risco'] = 'Médio'
-        elif any(p in mensagem_lower for p in ['baixo risco', 'baixo']):
-            consulta['tipo'] = 'nivel'
-            consulta['params']['nivel_risco'] = 'Baixo'
-
-        if any(p in mensagem_lower for p in ['aberto', 'abertos', 'pendente', 'pendentes']):
-            consulta['tipo'] = 'status'
-            consulta['params']['status'] = 'aberto'
-        elif any(p in mensagem_lower for p in ['em andamento', 'andamento', 'sendo tratado']):
-            consulta['tipo'] = 'status'
-            consulta['params']['status'] = 'em_andamento'
-        elif any(p in mensagem_lower for p in ['resolvido', 'resolvidos', 'fechado', 'fechados']):
-            consulta['tipo'] = 'status'
-            consulta['params']['status'] = 'resolvido'
-
-        if any(p in mensagem_lower for p in ['maior impacto', 'mais caro', 'mais caros', 'maior valor', 'maiores valores']):
-            consulta['params']['ordem'] = 'impacto'
-        elif any(p in mensagem_lower for p in ['mais clientes', 'mais afetados', 'maior número de clientes']):
-            consulta['params']['ordem'] = 'clientes'
-        elif any(p in mensagem_lower for p in ['mais recente', 'últimos', 'ultimos', 'recentes']):
-            consulta['params']['ordem'] = 'data'
-        elif any(p in mensagem_lower for p in ['indisponibilidade', 'mais tempo fora']):
-            consulta['params']['ordem'] = 'indisponibilidade'
-
-        for mes_nome, mes_num in self.meses_map.items():
-            if mes_nome in mensagem_lower:
-                ano_match = re.search(r'20\d{2}', mensagem_lower)
-                ano = ano_match.group() if ano_match else '2024'
-                consulta['tipo'] = 'mes'
-                consulta['params']['mes'] = f"{ano}-{mes_num}"
-                break
-
-        termos_busca = ['fraude', 'sistema', 'pix', 'transferência', 'cartão', 'cartao',
-                        'falha', 'erro', 'indisponibilidade', 'ataque', 'invasão']
-        for termo in termos_busca:
-            if termo in mensagem_lower and 'o que é' not in mensagem_lower and 'o que significa' not in mensagem_lower:
-                consulta['tipo'] = 'texto'
-                consulta['params']['termo'] = termo
-                break
-
-        if any(p in mensagem_lower for p in ['todos os eventos', 'resumo geral', 'visão geral', 'panorama']):
-            consulta['tipo'] = 'resumo_geral'
+        self.cache_contexto = registrar_invalidacao(
+            CacheTTL(ttl=float(os.getenv('YOYO_CACHE_TTL', 60)), nome='contexto_global')
+        )
 
-        return consulta
+        self.cache_respostas = registrar_invalidacao(CacheRespostas(
+            ttl=float(os.getenv('YOYO_CACHE_RESPOSTAS_TTL', 300)),
+            max_entradas=int(os.getenv('YOYO_CACHE_RESPOSTAS_MAX', 500)),
+            caminho_sqlite=os.getenv('YOYO_CACHE_RESPOSTAS_SQLITE') or None,
+            nome='respostas'
+        ))
+
+        self.detector_intencao = DetectorIntencao()
+
+        self.cliente_llm = ClienteLLM(
+            self.provedor,
+            concorrencia=GEMINI_CONCORRENCIA,
+            fila_max=GEMINI_FILA_MAX,
+            fila_timeout=GEMINI_FILA_TIMEOUT,
+            rpm=GEMINI_RPM,
+            tpm=GEMINI_TPM,
+            max_tentativas=GEMINI_MAX_TENTATIVAS,
+            espera_base=GEMINI_ESPERA_BASE,
+            espera_max=GEMINI_ESPERA_MAX,
+            timeout=LLM_TIMEOUT,
+            disjuntor=Disjuntor(
+                janela=LLM_DISJUNTOR_JANELA,
+                min_chamadas=LLM_DISJUNTOR_MIN_CHAMADAS,
+                taxa_falhas=LLM_DISJUNTOR_TAXA,
+                lentidao=LLM_DISJUNTOR_LENTIDAO,
+                tempo_aberto=LLM_DISJUNTOR_TEMPO_ABERTO,
+                max_timeouts=LLM_DISJUNTOR_TIMEOUTS
+            ),
+            contar_tokens=estimar_tokens
+        )
 
-    def _buscar_dados_consulta(self, consulta: dict) -> list:
-        if not consulta.get('tipo'):
-            return []
+    @medir('yoyo.intencao')
+    def _detectar_consulta_inteligente(self, mensagem: str) -> dict:
+        return self.detector_intencao.detectar(mensagem)
 
-        try:
-            if consulta['tipo'] == 'nivel':
-                return buscar_eventos_dinamico(
-                    nivel_risco=consulta['params'].get('nivel_risco'),
-                    ordem=consulta['params'].get('ordem', 'impacto'),
-                    limite=20
-                )
-            elif consulta['tipo'] == 'status':
-                return buscar_eventos_dinamico(
-                    status=consulta['params'].get('status'),
-                    ordem=consulta['params'].get('ordem', 'impacto'),
-                    limite=20
-                )
-            elif consulta['tipo'] == 'mes':
-                return buscar_eventos_dinamico(
-                    mes=consulta['params'].get('mes'),
-                    ordem=consulta['params'].get('ordem', 'impacto'),
-                    limite=20
-                )
-            elif consulta['tipo'] == 'texto':
-                return buscar_eventos_por_texto(
-                    termo=consulta['params'].get('termo'),
-                    limite=15
-                )
-            elif consulta['tipo'] == 'resumo_geral':
-                return buscar_eventos_dinamico(
-                    ordem=consulta['params'].get('ordem', 'impacto'),
-                    limite=30
-                )
-        except Exception as e:
-            logger.error(f"Erro na busca dinâmica: {e}")
+    @medir('yoyo.consulta')
+    async def _buscar_dados_consulta(self, consulta: dict) -> list:
+        tipo = consulta.get('tipo')
+        if not tipo:
             return []
 
-        return []
+        params = consulta.get('params', {})
+
+        # Só termo: busca textual ordenada por relevância
+        if tipo == 'texto':
+            return await buscar_eventos_por_texto(
+                termo=params.get('termo'),
+                limite=15
+            )
+
+        # Qualquer combinação de nível, status, mês e termo vira uma consulta só
+        return await buscar_eventos_dinamico(
+            nivel_risco=params.get('nivel_risco'),
+            status=params.get('status'),
+            mes=params.get('mes'),
+            termo=params.get('termo'),
+            ordem=params.get('ordem', 'impacto'),
+            limite=30 if tipo == 'resumo_geral' else 20
+        )
 
     def _extrair_nome(self, mensagem: str) -> str | None:
         mensagem_lower = mensagem.lower().strip()
@@ -260,17 +391,18 @@ class YoyoIA:
         apresentacoes = ['meu nome é', 'me chamo', 'pode me chamar de', 'sou o ', 'sou a ', 'eu sou ']
         return any(ap in mensagem_lower for ap in apresentacoes)
 
-    def _buscar_eventos_mencionados(self, mensagem: str) -> list:
+    @medir('yoyo.eventos_mencionados')
+    async def _buscar_eventos_mencionados(self, mensagem: str) -> list:
         ids_encontrados = self.evento_id_pattern.findall(mensagem.upper())
-        eventos = []
-        for evento_id in ids_encontrados:
-            evento = get_evento_by_id(evento_id)
-            if evento:
-                eventos.append(evento)
-                logger.info(f"Evento encontrado no banco: {evento_id}")
+        if not ids_encontrados:
+            return []
+
+        eventos = await get_eventos_by_ids(ids_encontrados)
+        for evento in eventos:
+            logger.info(f"Evento encontrado no banco: {evento.evento_id}")
         return eventos
 
-    def processar(self, mensagem: str, contexto_tela: dict = None, historico: list = None,
+    async def processar(self, mensagem: str, contexto_tela: dict = None, historico: list = None,
                   nome_usuario: str = None, conversation_state: str = None):
         historico = historico or []
         conversation_state = conversation_state or ConversationState.INICIO
@@ -320,34 +452,59 @@ class YoyoIA:
                 nome_usuario = nome_extraido
                 logger.info(f"Nome atualizado durante conversa: {nome_usuario}")
 
-            prompt = self._montar_prompt(mensagem, contexto_tela, historico, nome_usuario)
+            consulta = self._detectar_consulta_inteligente(mensagem)
+            chave_cache = await self._chave_resposta(mensagem, consulta, contexto_tela, nome_usuario)
+            resposta_cache = await self.cache_respostas.obter_async(chave_cache) if chave_cache else None
 
-            max_tentativas = 3
-            for tentativa in range(max_tentativas):
-                try:
-                    response = self.model.generate_content(prompt)
-                    resposta_texto = response.text
-                    resposta_texto = self._limpar_saudacao_resposta(resposta_texto)
+            if resposta_cache is not None:
+                logger.info("Resposta servida do cache de respostas")
+                result = {
+                    "resposta": resposta_cache,
+                    "conversation_state": ConversationState.ATIVO,
+                    "sucesso": True
+                }
+                if contem_nome and nome_extraido:
+                    result["nome_usuario"] = nome_usuario
+                return result
+
+            prompt, dados = await self._montar_prompt(mensagem, contexto_tela, historico, nome_usuario, consulta)
+
+            try:
+                with medir('llm.geracao'):
+                    resposta_texto = await self.cliente_llm.gerar(prompt)
+                resposta_texto = self._limpar_saudacao_resposta(resposta_texto)
+
+                if chave_cache:
+                    await self.cache_respostas.guardar_async(chave_cache, resposta_texto)
 
-                    result = {
-                        "resposta": resposta_texto,
-                        "conversation_state": ConversationState.ATIVO,
-                        "sucesso": True
-                    }
+                result = {
+                    "resposta": resposta_texto,
+                    "conversation_state": ConversationState.ATIVO,
+                    "sucesso": True
+                }
 
-                    if contem_nome and nome_extraido:
-                        result["nome_usuario"] = nome_usuario
+                if contem_nome and nome_extraido:
+                    result["nome_usuario"] = nome_usuario
 
-                    return result
+                return result
+
+            except CircuitoAbertoError:
+                RESPOSTAS_SOMENTE_DADOS.incrementar(modo='completa')
+                result = {
+                    "resposta": self._resposta_somente_dados(consulta, dados, contexto_tela),
+                    "conversation_state": ConversationState.ATIVO,
+                    "somente_dados": True,
+                    "sucesso": True
+                }
+                if contem_nome and nome_extraido:
+                    result["nome_usuario"] = nome_usuario
+                return result
 
-                except Exception as e:
-                    erro_str = str(e).lower()
-                    if ('rate' in erro_str or 'quota' in erro_str or '429' in erro_str) and tentativa < max_tentativas - 1:
-                        logger.warning(f"Rate limit atingido, aguardando 5s antes da tentativa {tentativa + 2}...")
-                        time.sleep(5)
-                        continue
-                    logger.error(f"Erro ao processar com Gemini: {str(e)}")
-                    return self._tratar_erro(e, contexto_tela)
+            except Exception as e:
+                logger.error(f"Erro ao processar com Gemini: {str(e)}")
+                erro = self._tratar_erro(e, contexto_tela)
+                ERROS_LLM.incrementar(erro=erro['erro'])
+                return erro
 
         logger.warning(f"Estado desconhecido: {conversation_state}")
         return {
@@ -356,9 +513,132 @@ class YoyoIA:
             "sucesso": False
         }
 
+    async def processar_stream(self, mensagem: str, contexto_tela: dict = None, historico: list = None,
+                               nome_usuario: str = None, conversation_state: str = None):
+        """Versão de processar que produz a resposta aos poucos.
+
+        Gera dicts {'tipo': 'token', 'texto': ...} conforme o Gemini responde
+        e termina com {'tipo': 'fim', ...} contendo os metadados da resposta
+        (conversation_state, nome_usuario, sucesso, erro).
+        """
+        historico = historico or []
+        conversation_state = conversation_state or ConversationState.INICIO
+
+        if conversation_state != ConversationState.ATIVO:
+            resultado = await self.processar(mensagem, contexto_tela, historico, nome_usuario, conversation_state)
+            yield {'tipo': 'token', 'texto': resultado['resposta']}
+            yield self._frame_final(resultado)
+            return
+
+        logger.info(f"Processando (stream) - Nome: {nome_usuario}, Mensagem: {mensagem[:50]}...")
+
+        contem_nome = self._contem_apresentacao_nome(mensagem)
+        nome_extraido = self._extrair_nome(mensagem)
+        if contem_nome and nome_extraido and nome_extraido != nome_usuario:
+            nome_usuario = nome_extraido
+            logger.info(f"Nome atualizado durante conversa: {nome_usuario}")
+
+        consulta = self._detectar_consulta_inteligente(mensagem)
+        chave_cache = await self._chave_resposta(mensagem, consulta, contexto_tela, nome_usuario)
+        resposta_cache = await self.cache_respostas.obter_async(chave_cache) if chave_cache else None
+
+        if resposta_cache is not None:
+            logger.info("Resposta servida do cache de respostas")
+            yield {'tipo': 'token', 'texto': resposta_cache}
+            result = {"conversation_state": ConversationState.ATIVO, "sucesso": True}
+            if contem_nome and nome_extraido:
+                result["nome_usuario"] = nome_usuario
+            yield self._frame_final(result)
+            return
+
+        prompt, dados = await self._montar_prompt(mensagem, contexto_tela, historico, nome_usuario, consulta)
+
+        emitiu = False
+        limpador = LimpadorIncremental(self)
+        partes = []
+        inicio_geracao = time.perf_counter()
+        primeiro_chunk = True
+        try:
+            async for chunk in self.cliente_llm.gerar_stream(prompt):
+                if primeiro_chunk:
+                    observar('llm.primeiro_chunk', time.perf_counter() - inicio_geracao)
+                    primeiro_chunk = False
+                texto = limpador.alimentar(chunk)
+                if texto:
+                    emitiu = True
+                    partes.append(texto)
+                    yield {'tipo': 'token', 'texto': texto}
+
+            observar('llm.geracao_stream', time.perf_counter() - inicio_geracao)
+            texto = limpador.finalizar()
+            if texto:
+                partes.append(texto)
+                yield {'tipo': 'token', 'texto': texto}
+
+            if chave_cache:
+                await self.cache_respostas.guardar_async(chave_cache, ''.join(partes))
+
+            result = {
+                "conversation_state": ConversationState.ATIVO,
+                "sucesso": True
+            }
+            if contem_nome and nome_extraido:
+                result["nome_usuario"] = nome_usuario
+
+            yield self._frame_final(result)
+
+        except CircuitoAbertoError:
+            RESPOSTAS_SOMENTE_DADOS.incrementar(modo='stream')
+            yield {'tipo': 'token', 'texto': self._resposta_somente_dados(consulta, dados, contexto_tela)}
+            result = {"conversation_state": ConversationState.ATIVO, "somente_dados": True, "sucesso": True}
+            if contem_nome and nome_extraido:
+                result["nome_usuario"] = nome_usuario
+            yield self._frame_final(result)
+
+        except Exception as e:
+            observar('llm.geracao_stream', time.perf_counter() - inicio_geracao, erro=True)
+            logger.error(f"Erro ao processar com Gemini (stream): {str(e)}")
+            erro = self._tratar_erro(e, contexto_tela)
+            ERROS_LLM.incrementar(erro=erro['erro'])
+            if not emitiu:
+                yield {'tipo': 'token', 'texto': erro['resposta']}
+            yield self._frame_final(erro)
+
+    @medir('yoyo.chave_cache')
+    async def _chave_resposta(self, mensagem: str, consulta: dict, contexto_tela: dict, nome_usuario: str):
+        # Só perguntas que viram uma consulta conhecida (nível, status, mês,
+        # texto, resumo geral) entram no cache; as demais costumam depender
+        # do histórico da conversa
+        if not self.cache_respostas.ativo or not consulta.get('tipo'):
+            return None
+
+        try:
+            versao = await get_versao_dados()
+        except Exception as e:
+            logger.warning(f"Não foi possível ler a versão dos dados, cache de respostas ignorado: {e}")
+            return None
+
+        # Sem versao_dados (migração 003) as escritas de outros processos não
+        # mudariam a chave, então a resposta não é cacheada
+        if versao is None:
+            return None
+
+        return gerar_chave(normalizar_mensagem(mensagem), consulta, versao, nome_usuario, contexto_tela)
+
+    def _frame_final(self, resultado: dict) -> dict:
+        frame = {'tipo': 'fim'}
+        for chave in ('conversation_state', 'nome_usuario', 'aguardando_nome', 'somente_dados', 'sucesso', 'erro'):
+            if chave in resultado:
+                frame[chave] = resultado[chave]
+        return frame
+
     def _limpar_saudacao_resposta(self, resposta: str) -> str:
         resposta = resposta.strip()
+        resposta = self._remover_saudacao(resposta)
+        resposta = self._remover_markdown(resposta)
+        return resposta.strip()
 
+    def _remover_saudacao(self, resposta: str) -> str:
         padroes_remover = [
             r'^olá[,!.]?\s*',
             r'^oi[,!.]?\s*',
@@ -371,17 +651,22 @@ class YoyoIA:
         for padrao in padroes_remover:
             resposta = re.sub(padrao, '', resposta, flags=re.IGNORECASE)
 
+        return resposta
+
+    def _remover_markdown(self, resposta: str, inicio_de_linha: bool = True) -> str:
         resposta = re.sub(r'\*\*([^*]+)\*\*', r'\1', resposta)
         resposta = re.sub(r'\*([^*]+)\*', r'\1', resposta)
-        resposta = re.sub(r'^#+\s*', '', resposta, flags=re.MULTILINE)
+        if inicio_de_linha:
+            resposta = re.sub(r'^#+\s*', '', resposta, flags=re.MULTILINE)
+        else:
+            resposta = re.sub(r'(?<=\n)#+\s*', '', resposta)
         resposta = re.sub(r'`([^`]+)`', r'\1', resposta)
-
-        return resposta.strip()
+        return resposta
 
     def _tratar_erro(self, erro: Exception, contexto_tela: dict = None) -> dict:
         erro_str = str(erro).lower()
 
-        if 'rate' in erro_str or 'quota' in erro_str or '429' in erro_str:
+        if isinstance(erro, LimiteLLMError) or self.provedor.erro_temporario(erro):
             return {
                 "resposta": "Estou recebendo muitas solicitações no momento. Aguarde alguns segundos e tente novamente.",
                 "erro": "RATE_LIMIT",
@@ -421,159 +706,270 @@ class YoyoIA:
             "sucesso": False
         }
 
-    def _montar_prompt(self, mensagem: str, contexto_tela: dict, historico: list, nome_usuario: str):
-        prompt = PROMPT_BASE
+    @medir('yoyo.prompt')
+    async def _montar_prompt(self, mensagem: str, contexto_tela: dict, historico: list, nome_usuario: str,
+                             consulta: dict = None):
+        if consulta is None:
+            consulta = self._detectar_consulta_inteligente(mensagem)
+        relevancia = dict(RELEVANCIA_SECOES)
+        for tipo in self._tipos_relevancia(consulta):
+            relevancia.update(AJUSTES_RELEVANCIA.get(tipo, {}))
+        if consulta.get('params', {}).get('nivel_risco') == 'Crítico':
+            relevancia['top_criticos'] = max(relevancia['top_criticos'], 85)
+
+        montador = MontadorPrompt(YOYO_PROMPT_MAX_TOKENS)
+        montador.adicionar(SecaoPrompt('base', PROMPT_BASE.strip(), obrigatoria=True))
 
         if nome_usuario:
-            prompt += f"\n\nUSUÁRIO ATUAL: {nome_usuario} (use o nome de forma natural quando apropriado)"
+            montador.adicionar(SecaoPrompt(
+                'usuario', f"USUÁRIO ATUAL: {nome_usuario} (use o nome de forma natural quando apropriado)",
+                obrigatoria=True
+            ))
+
+        # As consultas são independentes: vão todas ao mesmo tempo, cada uma em
+        # uma conexão do pool, e o prompt espera só pela mais lenta
+        consultas = {
+            'eventos_mencionados': self._buscar_eventos_mencionados(mensagem),
+            'consulta': self._buscar_dados_consulta(consulta),
+        }
+        if contexto_tela:
+            consultas.update(self._consultas_contexto_global())
+        with medir('yoyo.consultas'):
+            resultados = await asyncio.gather(*(
+                self._consultar(nome, coro) for nome, coro in consultas.items()
+            ))
+        dados = dict(zip(consultas, resultados))
 
         if contexto_tela:
-            prompt += "\n\n" + self._formatar_contexto_tela(contexto_tela)
+            for secao in self._secoes_contexto_tela(contexto_tela, dados):
+                secao.relevancia = relevancia[secao.nome]
+                montador.adicionar(secao)
 
-        eventos_buscados = self._buscar_eventos_mencionados(mensagem)
+        eventos_buscados = dados['eventos_mencionados']
         if eventos_buscados:
-            prompt += "\n\nEVENTOS BUSCADOS DO BANCO (mencionados pelo usuário):"
-            for ev in eventos_buscados:
-                impacto = ev.get('impacto_financeiro', 0)
-                prompt += f"""
-EVENTO: {ev.get('evento_id')}
-- Nível de risco: {ev.get('nivel_risco', 'N/A').upper()}
-- Data: {ev.get('data_evento', 'N/A')}
-- Descrição: {ev.get('descricao', 'Sem descrição')}
-- Impacto financeiro: R$ {impacto:,.2f}
-- Clientes afetados: {ev.get('clientes_afetados', 0)}
-- Tempo indisponibilidade: {ev.get('tempo_indisponibilidade', 0)} horas
-- Criticidade do sistema: {ev.get('criticidade_sistema', 'N/A')}/5
-- Status: {ev.get('status', 'N/A')}
-"""
+            montador.adicionar(SecaoPrompt(
+                'eventos_mencionados',
+                "EVENTOS BUSCADOS DO BANCO (mencionados pelo usuário):",
+                tabela(COLUNAS_EVENTO_DETALHE, eventos_buscados),
+                relevancia=relevancia['eventos_mencionados'], fixas=1
+            ))
 
-        consulta = self._detectar_consulta_inteligente(mensagem)
-        eventos_consulta = self._buscar_dados_consulta(consulta)
+        eventos_consulta = dados['consulta']
 
         if eventos_consulta:
             tipo_consulta = consulta.get('tipo', 'geral')
-            params = consulta.get('params', {})
-
-            descricao_busca = "EVENTOS ENCONTRADOS"
-            if tipo_consulta == 'nivel':
-                descricao_busca = f"EVENTOS DE NÍVEL {params.get('nivel_risco', '').upper()}"
-            elif tipo_consulta == 'status':
-                descricao_busca = f"EVENTOS COM STATUS '{params.get('status', '').upper()}'"
-            elif tipo_consulta == 'mes':
-                descricao_busca = f"EVENTOS DO MÊS {params.get('mes', '')}"
-            elif tipo_consulta == 'texto':
-                descricao_busca = f"EVENTOS RELACIONADOS A '{params.get('termo', '').upper()}'"
-            elif tipo_consulta == 'resumo_geral':
-                descricao_busca = "PRINCIPAIS EVENTOS DO BANCO (ordenados por impacto)"
-
-            prompt += f"\n\n{descricao_busca} ({len(eventos_consulta)} eventos encontrados):"
-
-            for i, ev in enumerate(eventos_consulta, 1):
-                impacto = ev.get('impacto_financeiro', 0)
-                prompt += f"""
-{i}. ID: {ev.get('evento_id')} - {ev.get('nivel_risco', 'N/A').upper()}
-   Data: {ev.get('data_evento', 'N/A')}
-   Descrição: {ev.get('descricao', 'Sem descrição')[:150]}
-   Impacto: R$ {impacto:,.2f} | Clientes: {ev.get('clientes_afetados', 0)} | Status: {ev.get('status', 'N/A')}"""
+            montador.adicionar(SecaoPrompt(
+                'consulta',
+                f"{self._descricao_consulta(consulta)} ({len(eventos_consulta)} eventos encontrados):",
+                tabela(COLUNAS_EVENTO_LISTA, eventos_consulta, max_caracteres=150),
+                relevancia=relevancia['consulta'], fixas=1
+            ))
 
             logger.info(f"Consulta inteligente: {tipo_consulta} - {len(eventos_consulta)} eventos encontrados")
 
         if historico and len(historico) > 0:
-            prompt += "\n\nHISTÓRICO DA CONVERSA (mensagens recentes):"
+            linhas = []
             for msg in historico[-10:]:
                 role = "Usuário" if msg.get('role') == 'user' else "Yoyo"
-                prompt += f"\n{role}: {msg.get('content', '')}"
+                linhas.append(f"{role}: {msg.get('content', '')}")
+            montador.adicionar(SecaoPrompt(
+                'historico', "HISTÓRICO DA CONVERSA (mensagens recentes):", linhas,
+                relevancia=relevancia['historico'], manter_final=True
+            ))
+
+        montador.adicionar(SecaoPrompt('mensagem', f"MENSAGEM ATUAL DO USUÁRIO:\n{mensagem}", obrigatoria=True))
+        montador.adicionar(SecaoPrompt(
+            'instrucao',
+            "INSTRUÇÃO FINAL: Responda de forma útil, técnica e objetiva. Use os dados do contexto para embasar sua resposta. Seja direta. NÃO cumprimente nem se apresente novamente.",
+            obrigatoria=True
+        ))
+
+        with medir('yoyo.prompt_montagem'):
+            prompt, contagens = montador.montar()
+
+        TAMANHO_PROMPT.observar(estimar_tokens(prompt))
+        for secao, tokens in contagens.items():
+            TOKENS_SECAO.incrementar(tokens, secao=secao)
+        return prompt, dados
+
+    def _descricao_consulta(self, consulta: dict) -> str:
+        if consulta.get('tipo') == 'resumo_geral':
+            return "PRINCIPAIS EVENTOS DO BANCO (ordenados por impacto)"
+
+        params = consulta.get('params', {})
+        filtros = []
+        if params.get('nivel_risco'):
+            filtros.append(f"DE NÍVEL {params['nivel_risco'].upper()}")
+        if params.get('status'):
+            filtros.append(f"COM STATUS '{params['status'].upper()}'")
+        if params.get('mes'):
+            filtros.append(f"DO MÊS {params['mes']}")
+        if params.get('termo'):
+            filtros.append(f"RELACIONADOS A '{params['termo'].upper()}'")
+        return "EVENTOS " + ", ".join(filtros) if filtros else "EVENTOS ENCONTRADOS"
+
+    def _resposta_somente_dados(self, consulta: dict, dados: dict, contexto_tela: dict) -> str:
+        """Resposta sem o LLM, com os dados já buscados para o prompt; usada
+        enquanto o disjuntor está aberto."""
+        paragrafos = [
+            "No momento não consigo analisar sua pergunta: o serviço de IA está instável. "
+            "Seguem os dados do banco relacionados a ela, sem interpretação."
+        ]
 
-        prompt += f"\n\nMENSAGEM ATUAL DO USUÁRIO:\n{mensagem}"
-        prompt += "\n\nINSTRUÇÃO FINAL: Responda de forma útil, técnica e objetiva. Use os dados do contexto para embasar sua resposta. Seja direta. NÃO cumprimente nem se apresente novamente."
+        eventos_mencionados = dados.get('eventos_mencionados')
+        if eventos_mencionados:
+            paragrafos.append("\n".join(
+                ["EVENTOS MENCIONADOS:"] + [self._linha_evento(e) for e in eventos_mencionados]
+            ))
 
-        return prompt
+        eventos_consulta = dados.get('consulta')
+        estatisticas = dados.get('estatisticas')
+        if eventos_consulta:
+            quantidade = f"{len(eventos_consulta)} evento{'s' if len(eventos_consulta) > 1 else ''}"
+            if len(eventos_consulta) > 10:
+                quantidade += ", os 10 primeiros"
+            paragrafos.append("\n".join(
+                [f"{self._descricao_consulta(consulta)} ({quantidade}):"]
+                + [f"{i}. {self._linha_evento(e)}" for i, e in enumerate(eventos_consulta[:10], 1)]
+            ))
+        elif estatisticas is not None:
+            stats = estatisticas.como_dict()
+            paragrafos.append(
+                f"BANCO COMPLETO: {stats['total_eventos']} eventos ({stats['criticos']} críticos, "
+                f"{stats['altos']} altos, {stats['medios']} médios, {stats['baixos']} baixos). "
+                f"Status: {stats['abertos']} abertos, {stats['em_andamento']} em andamento, "
+                f"{stats['resolvidos']} resolvidos. Impacto financeiro total: "
+                f"{self._formatar_moeda(stats['impacto_financeiro_total'])}."
+            )
+
+        if len(paragrafos) == 1:
+            paragrafos.append(self._gerar_resumo_dados(contexto_tela))
+
+        paragrafos.append("Tente novamente em alguns instantes para receber a análise completa.")
+        return "\n\n".join(paragrafos)
+
+    def _linha_evento(self, evento) -> str:
+        data = campo(evento, 'data_evento')
+        if hasattr(data, 'strftime'):
+            data = data.strftime('%d/%m/%Y %H:%M')
+        return (
+            f"{campo(evento, 'evento_id')} | {campo(evento, 'nivel_risco')} | {data} | "
+            f"impacto {self._formatar_moeda(campo(evento, 'impacto_financeiro'))} | "
+            f"{campo(evento, 'clientes_afetados') or 0} clientes | {campo(evento, 'status')}"
+        )
 
-    def _formatar_contexto_tela(self, contexto: dict):
-        texto = ""
+    def _formatar_moeda(self, valor) -> str:
+        texto = f"{float(valor or 0):,.2f}"
+        return "R$ " + texto.replace(',', '_').replace('.', ',').replace('_', '.')
 
-        try:
-            stats = get_estatisticas_completas()
-            top_criticos = get_top_eventos_criticos(5)
-            eventos_mes = get_eventos_por_mes()
-
-            texto += """ESTATÍSTICAS DO BANCO DE DADOS COMPLETO:"""
-            texto += f"""
-- Total de eventos no banco: {stats.get('total_eventos', 0)}
-- Eventos críticos: {stats.get('criticos', 0)}
-- Eventos alto risco: {stats.get('altos', 0)}
-- Eventos médio risco: {stats.get('medios', 0)}
-- Eventos baixo risco: {stats.get('baixos', 0)}
-- Impacto financeiro total: R$ {stats.get('impacto_financeiro_total', 0):,.2f}
-- Impacto financeiro médio: R$ {stats.get('impacto_financeiro_medio', 0):,.2f}
-- Total de clientes afetados: {stats.get('total_clientes_afetados', 0)}
-- Eventos abertos: {stats.get('abertos', 0)}
-- Eventos em andamento: {stats.get('em_andamento', 0)}
-- Eventos resolvidos: {stats.get('resolvidos', 0)}
-- Período dos dados: {stats.get('data_mais_antiga', 'N/A')} até {stats.get('data_mais_recente', 'N/A')}"""
-
-            if top_criticos:
-                texto += "\n\nTOP 5 EVENTOS MAIS CRÍTICOS (por impacto financeiro):"
-                for i, ev in enumerate(top_criticos, 1):
-                    impacto = ev.get('impacto_financeiro', 0)
-                    texto += f"""
-{i}. ID: {ev.get('evento_id')} - {ev.get('nivel_risco').upper()}
-   Impacto: R$ {impacto:,.2f} | Clientes: {ev.get('clientes_afetados', 0)} | Status: {ev.get('status', 'N/A')}"""
-
-            if eventos_mes:
-                texto += "\n\nEVENTOS POR MÊS (últimos meses):"
-                for mes in eventos_mes[:6]:
-                    texto += f"\n- {mes['mes']}: {mes['total']} eventos ({mes['criticos']} críticos) - Impacto: R$ {mes['impacto']:,.2f}"
-
-            resumo_nivel = get_resumo_por_nivel()
-            if resumo_nivel:
-                texto += "\n\nDETALHAMENTO POR NÍVEL DE RISCO:"
-                for nivel, dados in resumo_nivel.items():
-                    texto += f"""
-{nivel.upper()}: {dados['total']} eventos
-   - Impacto total: R$ {dados['impacto_total']:,.2f} | Médio: R$ {dados['impacto_medio']:,.2f}
-   - Clientes total: {dados['clientes_total']} | Médio: {dados['clientes_medio']:.0f}"""
+    def _consultas_contexto_global(self) -> dict:
+        # Dados iguais para todos os usuários; cada um fica no cache_contexto
+        # até o TTL expirar ou uma escrita em eventos_risco invalidar. Quem
+        # pede durante uma recarga espera no event loop, sem ocupar thread
+        obter = self.cache_contexto.obter_async
+        return {
+            'estatisticas': obter('estatisticas', lambda: executar_db(get_estatisticas_agregadas)),
+            'top_criticos': obter('top_criticos', lambda: executar_db(get_top_eventos_criticos, 5)),
+            'por_mes': obter('eventos_mes', lambda: executar_db(get_eventos_por_mes)),
+        }
 
+    async def _consultar(self, nome: str, coro):
+        """Resultado de uma consulta do contexto, ou None se ela falhar ou
+        passar de YOYO_TIMEOUT_CONSULTA."""
+        try:
+            return await asyncio.wait_for(coro, YOYO_TIMEOUT_CONSULTA)
+        except asyncio.TimeoutError:
+            # A consulta continua na thread do banco e, se for do contexto
+            # global, ainda preenche o cache para as próximas mensagens
+            logger.warning(f"Consulta '{nome}' passou de {YOYO_TIMEOUT_CONSULTA:.1f}s; seção omitida do prompt")
+            SECOES_OMITIDAS.incrementar(secao=nome, motivo='timeout')
         except Exception as e:
-            logger.warning(f"Erro ao buscar estatísticas do banco: {e}")
+            logger.warning(f"Erro na consulta '{nome}', seção omitida do prompt: {e}")
+            SECOES_OMITIDAS.incrementar(secao=nome, motivo='erro')
+        return None
 
-        texto += "\n\n" + "=" * 50
-        texto += "\nDADOS VISÍVEIS NA TELA DO USUÁRIO (filtro atual):"
+    def _tipos_relevancia(self, consulta: dict) -> list:
+        # Numa consulta combinada valem os ajustes de cada filtro presente
+        tipo = consulta.get('tipo')
+        if tipo != 'combinada':
+            return [tipo]
+        params = consulta.get('params', {})
+        return [t for filtro, t in (('nivel_risco', 'nivel'), ('status', 'status'), ('mes', 'mes'), ('termo', 'texto'))
+                if params.get(filtro)]
+
+    def _secoes_contexto_tela(self, contexto: dict, dados: dict) -> list:
+        secoes = []
+
+        estatisticas = dados.get('estatisticas')
+        if estatisticas is not None:
+            stats = estatisticas.como_dict()
+            por_nivel = [
+                {'nivel': nivel.upper(), **valores}
+                for nivel, valores in estatisticas.resumo_por_nivel().items()
+            ]
+            por_nivel.append({'nivel': 'TOTAL', **estatisticas.geral.como_dict()})
+
+            secoes.append(SecaoPrompt(
+                'estatisticas',
+                "ESTATÍSTICAS DO BANCO DE DADOS COMPLETO:",
+                [
+                    f"Status: {stats.get('abertos', 0)} abertos | {stats.get('em_andamento', 0)} em andamento | {stats.get('resolvidos', 0)} resolvidos",
+                    f"Período dos dados: {stats.get('data_mais_antiga', 'N/A')} até {stats.get('data_mais_recente', 'N/A')}",
+                    "Por nível de risco:",
+                    *tabela(COLUNAS_RESUMO_NIVEL, por_nivel)
+                ],
+                fixas=4
+            ))
+
+        top_criticos = dados.get('top_criticos')
+        if top_criticos:
+            secoes.append(SecaoPrompt(
+                'top_criticos',
+                "TOP 5 EVENTOS MAIS CRÍTICOS (por impacto financeiro):",
+                tabela(COLUNAS_EVENTO_RESUMO, top_criticos),
+                fixas=1
+            ))
+
+        eventos_mes = dados.get('por_mes')
+        if eventos_mes:
+            secoes.append(SecaoPrompt(
+                'por_mes',
+                "EVENTOS POR MÊS (últimos meses):",
+                tabela(COLUNAS_MES, eventos_mes[:6]),
+                fixas=1
+            ))
+
+        linhas_tela = []
 
         if contexto.get('kpis'):
             kpis = contexto['kpis']
-            texto += f"""
-
-KPIs DO FILTRO ATUAL:
-- Total de eventos na tela: {kpis.get('total', 0)}
-- Eventos críticos: {kpis.get('critico', 0)}
-- Eventos alto risco: {kpis.get('alto', 0)}
-- Eventos médio risco: {kpis.get('medio', 0)}
-- Eventos baixo risco: {kpis.get('baixo', 0)}"""
-
-        if contexto.get('eventos') and len(contexto['eventos']) > 0:
-            eventos = contexto['eventos']
-            texto += f"\n\nEVENTOS VISÍVEIS ({len(eventos)} eventos na tela do usuário):"
-
-            for i, ev in enumerate(eventos[:15], 1):
-                impacto = ev.get('impacto_financeiro', 0)
-                impacto_fmt = f"R$ {impacto:,.2f}" if impacto else "N/A"
-
-                texto += f"""
-{i}. ID: {ev.get('evento_id', 'N/A')}
-   - Nível: {ev.get('nivel_risco', 'N/A').upper()}
-   - Descrição: {ev.get('descricao', 'Sem descrição')}
-   - Impacto financeiro: {impacto_fmt}
-   - Clientes afetados: {ev.get('clientes_afetados', 0)}
-   - Data: {ev.get('data_evento', 'N/A')}"""
+            linhas_tela.append(
+                f"KPIs do filtro atual: {kpis.get('total', 0)} eventos na tela | {kpis.get('critico', 0)} críticos | "
+                f"{kpis.get('alto', 0)} alto | {kpis.get('medio', 0)} médio | {kpis.get('baixo', 0)} baixo"
+            )
 
         if contexto.get('periodo'):
-            texto += f"\n\nPERÍODO SELECIONADO PELO USUÁRIO: {contexto['periodo']}"
+            linhas_tela.append(f"PERÍODO SELECIONADO PELO USUÁRIO: {contexto['periodo']}")
 
         if contexto.get('data_selecionada'):
-            texto += f"\n\nFILTRO DE DATA APLICADO: {contexto['data_selecionada']} (o usuário está vendo apenas eventos desta data)"
+            linhas_tela.append(f"FILTRO DE DATA APLICADO: {contexto['data_selecionada']} (o usuário está vendo apenas eventos desta data)")
 
-        return texto
+        secoes.append(SecaoPrompt(
+            'tela',
+            "=" * 50 + "\nDADOS VISÍVEIS NA TELA DO USUÁRIO (filtro atual):",
+            linhas_tela
+        ))
+
+        if contexto.get('eventos') and len(contexto['eventos']) > 0:
+            eventos = contexto['eventos']
+            secoes.append(SecaoPrompt(
+                'eventos_tela',
+                f"EVENTOS VISÍVEIS ({len(eventos)} eventos na tela do usuário):",
+                tabela(COLUNAS_EVENTO_TELA, eventos[:15], max_caracteres=200),
+                fixas=1
+            ))
+
+        return secoes
 
     def _gerar_resumo_dados(self, contexto: dict):
         if not contexto or not contexto.get('kpis'):
@@ -601,10 +997,41 @@ KPIs DO FILTRO ATUAL:
 
 yoyo_instance = YoyoIA()
 
+registrar(Medidor(
+    'yoyo_llm_fila',
+    'Chamadas ao Gemini aguardando vaga e em execução',
+    yoyo_instance.cliente_llm.estado_fila,
+    rotulo='estado'
+))
+registrar(Medidor(
+    'yoyo_llm_disjuntor',
+    'Estado do disjuntor do LLM (1 no estado atual)',
+    yoyo_instance.cliente_llm.disjuntor.estados,
+    rotulo='estado'
+))
+
+
+def get_metricas_cache_yoyo():
+    return {
+        'contexto_global': yoyo_instance.cache_contexto.metricas(),
+        'respostas': yoyo_instance.cache_respostas.metricas()
+    }
+
+
+async def processar_mensagem_yoyo(mensagem: str, contexto_tela: dict = None, historico: list = None,
+                                  nome_usuario: str = None, conversation_state: str = None):
+    return await yoyo_instance.processar(
+        mensagem=mensagem,
+        contexto_tela=contexto_tela,
+        historico=historico,
+        nome_usuario=nome_usuario,
+        conversation_state=conversation_state
+    )
+
 
-def processar_mensagem_yoyo(mensagem: str, contexto_tela: dict = None, historico: list = None,
-                            nome_usuario: str = None, conversation_state: str = None):
-    return yoyo_instance.processar(
+def processar_mensagem_yoyo_stream(mensagem: str, contexto_tela: dict = None, historico: list = None,
+                                   nome_usuario: str = None, conversation_state: str = None):
+    return yoyo_instance.processar_stream(
         mensagem=mensagem,
         contexto_tela=contexto_tela,
         historico=historico,
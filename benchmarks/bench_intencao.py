@@ -0,0 +1,49 @@
+"""Throughput do DetectorIntencao usado pela Yoyo.
+
+    python -m benchmarks.bench_intencao [--iteracoes N]
+"""
+import argparse
+import time
+
+from api.backend.intencao import DetectorIntencao
+
+MENSAGENS = [
+    "Quais os eventos críticos?",
+    "me mostra os eventos abertos de fraude no pix em março de 2024",
+    "resumo geral do banco",
+    "quais eventos de alto risco estão em andamento com maior impacto?",
+    "o que é risco operacional?",
+    "eventos mais recentes com falha de sistema",
+    "Obrigada, pode detalhar o EVT-20240315103000-1234?",
+    "quais os eventos resolvidos em dezembro com mais clientes afetados",
+    "houve algum ataque ou invasão nos últimos meses?",
+    "Compare os eventos médios e baixos por indisponibilidade",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark do detector de intenção da Yoyo")
+    parser.add_argument('--iteracoes', type=int, default=20000, help="passadas pelo conjunto de mensagens")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    detector = DetectorIntencao()
+    construcao = time.perf_counter() - inicio
+
+    for mensagem in MENSAGENS:
+        detector.detectar(mensagem)
+
+    inicio = time.perf_counter()
+    for _ in range(args.iteracoes):
+        for mensagem in MENSAGENS:
+            detector.detectar(mensagem)
+    duracao = time.perf_counter() - inicio
+
+    total = args.iteracoes * len(MENSAGENS)
+    print(f"Construção do detector: {construcao * 1000:.2f} ms")
+    print(f"{total} mensagens em {duracao:.3f} s")
+    print(f"Throughput: {total / duracao:,.0f} mensagens/s ({duracao / total * 1e6:.2f} µs/mensagem)")
+
+
+if __name__ == '__main__':
+    main()
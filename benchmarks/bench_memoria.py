@@ -0,0 +1,68 @@
+"""Pico de memória de get_eventos: lista inteira do pg8000 + um dict por linha
+(como era) contra FETCH em lotes por cursor + dataclasses com slots.
+
+    python -m benchmarks.bench_memoria [--quantidade 500000] [--lote 10000]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from api.backend.database import _ler_em_lotes
+from api.backend.modelos import COLUNAS_EVENTO
+from benchmarks.bench_serializacao import gerar_linhas
+
+
+class ConexaoCursor:
+    """Imita o pg8000: cada FETCH devolve uma lista nova de linhas, copiadas
+    da "tabela" como se viessem do socket."""
+
+    def __init__(self, tabela):
+        self.tabela = tabela
+        self.posicao = 0
+
+    def run(self, sql, **params):
+        if not sql.startswith('FETCH'):
+            return None
+        quantidade = int(sql.split()[1])
+        bloco = self.tabela[self.posicao:self.posicao + quantidade]
+        self.posicao += len(bloco)
+        return [list(linha) for linha in bloco]
+
+
+def ler_antigo(tabela):
+    linhas = [list(linha) for linha in tabela]
+    return [dict(zip(COLUNAS_EVENTO, linha)) for linha in linhas]
+
+
+def ler_novo(tabela, lote):
+    return _ler_em_lotes(ConexaoCursor(tabela), 'SELECT 1', {}, COLUNAS_EVENTO, lote)
+
+
+def medir(funcao, *args):
+    gc.collect()
+    tracemalloc.start()
+    resultado = funcao(*args)
+    atual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return atual, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória da listagem de eventos")
+    parser.add_argument('--quantidade', type=int, default=500_000, help="linhas (~1 ano de eventos)")
+    parser.add_argument('--lote', type=int, default=10_000)
+    args = parser.parse_args()
+
+    # Os valores (datetimes, Decimals, strings) são compartilhados pelos dois
+    # caminhos e ficam fora da medição: só conta o que cada um aloca a mais
+    tabela = [tuple(linha) for linha in gerar_linhas(args.quantidade)]
+
+    print(f"{'caminho':>8} {'retido (MB)':>12} {'pico (MB)':>10} {'bytes/linha':>12}")
+    for nome, funcao, extra in (('antigo', ler_antigo, ()), ('novo', ler_novo, (args.lote,))):
+        retido, pico = medir(funcao, tabela, *extra)
+        print(f"{nome:>8} {retido / 1e6:>12.1f} {pico / 1e6:>10.1f} {retido / args.quantidade:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Serialização da saída de get_eventos: dicts + jsonable_encoder + json
+(caminho padrão do FastAPI) contra dataclasses + orjson (RespostaORJSON).
+
+    python -m benchmarks.bench_serializacao [--tamanhos 10000 100000 1000000]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from api.backend.modelos import COLUNAS_EVENTO, linhas_para_modelos
+from api.backend.serializacao import dumps
+
+
+def gerar_linhas(quantidade, semente=42):
+    """Linhas como o pg8000 devolve para o SELECT de get_eventos."""
+    aleatorio = random.Random(semente)
+    base = datetime(2024, 1, 1)
+    niveis = ['critico', 'alto', 'medio', 'baixo']
+    status = ['aberto', 'em_andamento', 'resolvido']
+    linhas = []
+    for i in range(quantidade):
+        data_evento = base + timedelta(minutes=aleatorio.randint(0, 525600))
+        horas = aleatorio.randint(1, 168)
+        linhas.append([
+            f"EVT-{data_evento:%Y%m%d%H%M%S}-{i % 10000:04d}",
+            data_evento,
+            data_evento + timedelta(hours=horas),
+            float(horas),
+            aleatorio.choice(niveis),
+            "Falha no processamento de transações PIX",
+            Decimal(aleatorio.randint(500, 10_000_000)) / 100,
+            1,
+            aleatorio.randint(0, 100_000),
+            round(aleatorio.expovariate(0.4), 2),
+            aleatorio.randint(1, 10),
+            aleatorio.randint(1, 5),
+            aleatorio.randint(0, 1),
+            aleatorio.randint(0, 1),
+            aleatorio.randint(1, 5),
+            aleatorio.choice(status),
+            data_evento,
+        ])
+    return linhas
+
+
+def serializar_antigo(linhas):
+    # O que os handlers faziam: dict(zip(...)) no database.py, depois o
+    # jsonable_encoder e o json.dumps do JSONResponse
+    eventos = [dict(zip(COLUNAS_EVENTO, linha)) for linha in linhas]
+    return json.dumps(
+        jsonable_encoder({'eventos': eventos}),
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def serializar_novo(linhas):
+    return dumps({'eventos': linhas_para_modelos(COLUNAS_EVENTO, linhas)})
+
+
+def medir(funcao, linhas, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = funcao(linhas)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, len(corpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialização da listagem de eventos")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=3, help="melhor de N execuções")
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'antigo (ms)':>12} {'novo (ms)':>10} {'ganho':>7} {'MB':>7}")
+    for tamanho in args.tamanhos:
+        linhas = gerar_linhas(tamanho)
+        # Os dois caminhos precisam produzir o mesmo JSON
+        amostra = linhas[:100]
+        assert json.loads(serializar_antigo(amostra)) == json.loads(serializar_novo(amostra))
+
+        repeticoes = 1 if tamanho >= 1_000_000 else args.repeticoes
+        antigo, _ = medir(serializar_antigo, linhas, repeticoes)
+        novo, tamanho_bytes = medir(serializar_novo, linhas, repeticoes)
+        print(
+            f"{tamanho:>10} {antigo * 1000:>12.0f} {novo * 1000:>10.0f} "
+            f"{antigo / novo:>6.1f}x {tamanho_bytes / 1e6:>7.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
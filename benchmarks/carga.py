@@ -0,0 +1,278 @@
+"""Teste de carga da API: latência p50/p95/p99 e requisições por segundo por
+cenário, com resultado em JSON para comparar execuções.
+
+    # 1. dados e stub do Gemini
+    python -m benchmarks.dados --linhas 1000000 --truncar --fim 2025-01-01
+    python -m benchmarks.gemini_stub --latencia 0.8 &
+    # 2. API apontando para o stub (sem cache de respostas nem cota, para medir o LLM;
+    #    LLM_PROVEDOR=local dispensa o stub e mede só a API)
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8089 YOYO_CACHE_RESPOSTAS_TTL=0 \\
+        GEMINI_RPM=0 GEMINI_TPM=0 uvicorn api.backend.main:app --port 8000 &
+    # 3. carga
+    python -m benchmarks.carga --url http://127.0.0.1:8000 --duracao 30 \\
+        --concorrencia 16 --saida benchmarks/resultados/$(git rev-parse --short HEAD).json
+    python -m benchmarks.carga ... --comparar benchmarks/resultados/anterior.json
+
+Cada cenário roda isolado, com ``--concorrencia`` clientes em laço fechado
+(cada um manda a próxima requisição assim que recebe a resposta). O cenário
+``status`` altera o status de eventos reais: use um banco de benchmark.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+MENSAGENS_CHAT = [
+    "Quais os eventos críticos?",
+    "Me mostra os eventos abertos",
+    "Quais eventos de fraude aconteceram?",
+    "Resumo geral dos eventos",
+    "Eventos em andamento de nível alto",
+    "Quais os eventos com maior impacto financeiro?",
+]
+
+CONTEXTO_TELA = {
+    "kpis": {"total": 1200, "critico": 45, "alto": 120, "medio": 340, "baixo": 695},
+    "periodo": "Últimos 30 dias",
+}
+
+NIVEIS = ["Crítico", "Alto", "Médio", "Baixo"]
+STATUS = ["aberto", "em_andamento", "resolvido"]
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+class Cenario:
+    """Um endpoint sob carga. ``requisicao(cliente, i)`` faz uma chamada e
+    retorna a resposta; ``preparar`` roda uma vez antes da medição."""
+
+    nome = None
+
+    async def preparar(self, cliente):
+        pass
+
+    async def requisicao(self, cliente, i):
+        raise NotImplementedError
+
+
+class CenarioEventos(Cenario):
+    nome = "eventos"
+
+    def __init__(self, dias_filtro=30):
+        self.dias_filtro = dias_filtro
+        self.filtros = []
+
+    async def preparar(self, cliente):
+        resposta = await cliente.get("/api/eventos", params={"limit": 1, "fields": "evento_id"})
+        resposta.raise_for_status()
+        eventos = resposta.json()["eventos"]
+        # O período termina no evento mais recente, não em hoje, para que
+        # dados gerados com --fim no passado também caiam no filtro
+        fim = datetime.fromisoformat(eventos[0]["data_evento"]) if eventos else datetime.now()
+        periodo = {
+            "data_inicio": (fim - timedelta(days=self.dias_filtro)).strftime("%Y-%m-%d"),
+            "data_fim": fim.strftime("%Y-%m-%d"),
+        }
+        # Os mesmos filtros do dashboard: sem filtro, por período e por nível
+        self.filtros = [{}, periodo] + [{**periodo, "nivel_risco": nivel} for nivel in NIVEIS]
+
+    async def requisicao(self, cliente, i):
+        return await cliente.get("/api/eventos", params=self.filtros[i % len(self.filtros)])
+
+
+class CenarioResumo(CenarioEventos):
+    nome = "resumo"
+
+    async def requisicao(self, cliente, i):
+        filtro = self.filtros[1]
+        granularidade = ("dia", "semana", "mes")[i % 3]
+        return await cliente.get("/api/dashboard/resumo", params={**filtro, "granularidade": granularidade})
+
+
+class CenarioEventoId(Cenario):
+    nome = "evento_id"
+
+    def __init__(self, amostra=1000):
+        self.amostra = amostra
+        self.ids = []
+
+    async def preparar(self, cliente):
+        resposta = await cliente.get("/api/eventos", params={"limit": self.amostra, "fields": "evento_id"})
+        resposta.raise_for_status()
+        self.ids = [evento["evento_id"] for evento in resposta.json()["eventos"]]
+        if not self.ids:
+            raise RuntimeError("Nenhum evento no banco; rode benchmarks.dados antes")
+        random.Random(42).shuffle(self.ids)
+
+    async def requisicao(self, cliente, i):
+        return await cliente.get(f"/api/eventos/{self.ids[i % len(self.ids)]}")
+
+
+class CenarioStatus(CenarioEventoId):
+    nome = "status"
+
+    async def requisicao(self, cliente, i):
+        evento_id = self.ids[i % len(self.ids)]
+        status = STATUS[(i // len(self.ids)) % len(STATUS)]
+        return await cliente.patch(
+            f"/api/eventos/{evento_id}/status",
+            json={"evento_id": evento_id, "status": status}
+        )
+
+
+class CenarioChat(Cenario):
+    nome = "chat"
+
+    async def requisicao(self, cliente, i):
+        return await cliente.post("/api/yoyo/chat", json={
+            "mensagem": MENSAGENS_CHAT[i % len(MENSAGENS_CHAT)],
+            "contexto_tela": CONTEXTO_TELA,
+            "nome_usuario": "Bench",
+            "conversation_state": "ATIVO",
+        })
+
+
+CENARIOS = {c.nome: c for c in (CenarioEventos, CenarioResumo, CenarioEventoId, CenarioStatus, CenarioChat)}
+
+
+async def executar_cenario(cenario, url, concorrencia, duracao, aquecimento, timeout):
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limites) as cliente:
+        await cenario.preparar(cliente)
+
+        contador = itertools.count()
+        latencias = []
+        erros = {}
+
+        def registrar_erro(chave):
+            erros[chave] = erros.get(chave, 0) + 1
+
+        for _ in range(aquecimento):
+            await cenario.requisicao(cliente, next(contador))
+
+        fim = time.perf_counter() + duracao
+
+        async def trabalhador():
+            while time.perf_counter() < fim:
+                i = next(contador)
+                inicio = time.perf_counter()
+                try:
+                    resposta = await cenario.requisicao(cliente, i)
+                except httpx.HTTPError as e:
+                    registrar_erro(type(e).__name__)
+                    continue
+                latencia = time.perf_counter() - inicio
+                if resposta.status_code >= 400:
+                    registrar_erro(str(resposta.status_code))
+                    continue
+                # A Yoyo responde 200 com sucesso=False quando o LLM falha, e
+                # só com os dados do banco quando o disjuntor está aberto
+                if cenario.nome == "chat":
+                    corpo = resposta.json()
+                    if not corpo.get("sucesso", True):
+                        registrar_erro(corpo.get("erro") or "sem_sucesso")
+                        continue
+                    if corpo.get("somente_dados"):
+                        registrar_erro("somente_dados")
+                        continue
+                latencias.append(latencia)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        decorrido = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "req_s": round(len(latencias) / decorrido, 2),
+        "p50_ms": round(percentil(latencias, 0.50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 0.95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 0.99) * 1000, 2),
+        "max_ms": round(latencias[-1] * 1000, 2) if latencias else 0.0,
+        "duracao_s": round(decorrido, 2),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(resultados, anterior=None):
+    print(f"{'cenário':<10} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>6}")
+    for nome, r in resultados.items():
+        print(
+            f"{nome:<10} {r['req_s']:>8.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+            f"{r['p99_ms']:>9.1f} {sum(r['erros'].values()):>6}"
+        )
+        base = (anterior or {}).get(nome)
+        if base:
+            def variacao(chave):
+                return f"{(r[chave] / base[chave] - 1) * 100:+.0f}%" if base[chave] else "-"
+            print(
+                f"{'  vs ant.':<10} {variacao('req_s'):>8} {variacao('p50_ms'):>9} "
+                f"{variacao('p95_ms'):>9} {variacao('p99_ms'):>9}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos endpoints da API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--cenarios", nargs="+", choices=sorted(CENARIOS),
+                        default=["eventos", "evento_id", "resumo", "status", "chat"])
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--duracao", type=float, default=20, help="segundos de medição por cenário")
+    parser.add_argument("--aquecimento", type=int, default=20, help="requisições descartadas antes de medir")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--saida", help="arquivo JSON com o resultado")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nome in args.cenarios:
+        print(f"Cenário {nome}: {args.concorrencia} clientes por {args.duracao:.0f}s...")
+        resultados[nome] = asyncio.run(executar_cenario(
+            CENARIOS[nome](), args.url, args.concorrencia, args.duracao, args.aquecimento, args.timeout
+        ))
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)["cenarios"]
+    imprimir(resultados, anterior)
+
+    if args.saida:
+        os.makedirs(os.path.dirname(args.saida) or ".", exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "parametros": {
+                    "url": args.url, "concorrencia": args.concorrencia,
+                    "duracao_s": args.duracao, "aquecimento": args.aquecimento,
+                },
+                "cenarios": resultados,
+            }, arquivo, ensure_ascii=False, indent=2)
+        print(f"Resultado salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Gerador de eventos sintéticos para os benchmarks, portado de gerar_evento
+e gerar_descricao do notebook (mesmas distribuições, mesma regra de nível),
+vetorizado com numpy para chegar a milhões de linhas.
+
+    python -m benchmarks.dados --linhas 1000000 [--truncar] [--dias 365]
+    python -m benchmarks.dados --linhas 10000 --ndjson eventos.ndjson
+
+Sem --ndjson, grava direto em eventos_risco com COPY, pela mesma conexão
+configurada no .env da API (DB_HOST, DB_NAME...). Com a mesma --semente, o
+mesmo --lote e um --fim fixo, os eventos gerados são sempre os mesmos.
+"""
+import argparse
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from api.backend.estatisticas import normalizar_nivel
+from api.backend.pontuacao import classificar_niveis
+
+COLUNAS = (
+    'evento_id', 'data_evento', 'data_resolucao', 'tempo_resolucao_horas',
+    'impacto_financeiro', 'impacto_cliente', 'clientes_afetados',
+    'tempo_indisponibilidade', 'frequencia_evento', 'criticidade_sistema',
+    'falha_processo', 'fraude_interna', 'recorrencia', 'nivel_risco',
+    'status', 'descricao'
+)
+
+# Horas de resolução (mínimo, máximo) por nível, como no notebook
+HORAS_RESOLUCAO = {'baixo': (1, 24), 'medio': (4, 48), 'alto': (12, 72), 'critico': (24, 168)}
+
+# O notebook deixava o status no padrão da tabela; a API trabalha com estes
+STATUS = ('aberto', 'em_andamento', 'resolvido')
+PESOS_STATUS = (0.25, 0.15, 0.60)
+
+TEMPLATES = {
+    'critico': {
+        'fraude': [
+            "Detectada tentativa de fraude em larga escala afetando {clientes} clientes. Impacto financeiro estimado de R$ {impacto:,.2f}. Sistema de criticidade {criticidade}/5 comprometido por {tempo:.1f} horas. Ação imediata de contenção requerida.",
+            "Incidente crítico de fraude interna identificado. Exposição financeira de R$ {impacto:,.2f} com {clientes} contas potencialmente comprometidas. Indisponibilidade de {tempo:.1f} horas em sistema crítico (nível {criticidade}).",
+            "Fraude sistêmica detectada com vazamento de dados sensíveis. Prejuízo projetado de R$ {impacto:,.2f}. {clientes} clientes afetados durante janela de {tempo:.1f} horas.",
+        ],
+        'indisponibilidade': [
+            "Indisponibilidade generalizada de sistema core (criticidade {criticidade}/5) por {tempo:.1f} horas. {clientes} clientes sem acesso a serviços essenciais. Impacto financeiro acumulado de R$ {impacto:,.2f}.",
+            "Falha crítica em infraestrutura causando paralisação total. Sistema de criticidade {criticidade} offline por {tempo:.1f} horas. Prejuízo estimado: R$ {impacto:,.2f}. Clientes impactados: {clientes}.",
+            "Colapso de serviços digitais afetando {clientes} usuários. Downtime de {tempo:.1f} horas em plataforma crítica (nível {criticidade}). Perdas financeiras de R$ {impacto:,.2f} e danos reputacionais significativos.",
+        ],
+        'processo': [
+            "Falha crítica de processo operacional com exposição de R$ {impacto:,.2f}. {clientes} operações afetadas. Tempo de recuperação: {tempo:.1f} horas. Sistema criticidade {criticidade}/5.",
+            "Ruptura em processo core causando prejuízo de R$ {impacto:,.2f}. Impacto em {clientes} clientes com indisponibilidade de {tempo:.1f} horas.",
+        ],
+    },
+    'alto': {
+        'fraude': [
+            "Tentativa de fraude detectada afetando {clientes} clientes. Exposição financeira de R$ {impacto:,.2f}. Tempo de contenção: {tempo:.1f} horas.",
+            "Atividade fraudulenta identificada em {clientes} contas. Impacto potencial de R$ {impacto:,.2f}. Sistema criticidade {criticidade} em alerta.",
+        ],
+        'indisponibilidade': [
+            "Degradação significativa de sistema (criticidade {criticidade}/5) por {tempo:.1f} horas. {clientes} clientes com serviço comprometido. Impacto financeiro: R$ {impacto:,.2f}.",
+            "Instabilidade em plataforma digital afetando {clientes} usuários. Intermitência de {tempo:.1f} horas. Perdas estimadas: R$ {impacto:,.2f}.",
+            "Falha parcial em sistema de criticidade {criticidade} impactando {clientes} clientes. Duração: {tempo:.1f} horas. Prejuízo: R$ {impacto:,.2f}.",
+        ],
+        'processo': [
+            "Falha de processo impactando {clientes} operações. Exposição financeira de R$ {impacto:,.2f}. Tempo de normalização: {tempo:.1f} horas.",
+            "Erro operacional em área crítica. {clientes} clientes afetados. Impacto de R$ {impacto:,.2f}.",
+        ],
+    },
+    'medio': {
+        'fraude': [
+            "Atividade suspeita detectada em {clientes} contas. Exposição controlada de R$ {impacto:,.2f}. Monitoramento ativo.",
+            "Alerta de possível fraude. {clientes} clientes sob análise. Impacto potencial: R$ {impacto:,.2f}.",
+        ],
+        'indisponibilidade': [
+            "Lentidão em sistema de criticidade {criticidade} por {tempo:.1f} horas. {clientes} clientes com experiência degradada. Impacto estimado: R$ {impacto:,.2f}.",
+            "Instabilidade pontual afetando {clientes} usuários. Duração: {tempo:.1f} horas. Sistema criticidade {criticidade}.",
+            "Performance reduzida em serviço digital. {clientes} clientes impactados por {tempo:.1f} horas. Custo operacional: R$ {impacto:,.2f}.",
+        ],
+        'processo': [
+            "Desvio de processo identificado. {clientes} operações revisadas. Exposição de R$ {impacto:,.2f}. Correção em andamento.",
+            "Inconsistência operacional afetando {clientes} transações. Impacto financeiro moderado: R$ {impacto:,.2f}.",
+        ],
+    },
+    'baixo': {
+        'fraude': [
+            "Alerta preventivo de atividade atípica em {clientes} contas. Sem impacto financeiro confirmado. Monitoramento padrão.",
+            "Transação suspeita isolada. Análise em curso. Exposição potencial: R$ {impacto:,.2f}.",
+        ],
+        'indisponibilidade': [
+            "Oscilação breve em sistema secundário ({tempo:.1f} horas). {clientes} clientes com impacto mínimo.",
+            "Manutenção não programada de {tempo:.1f} horas. Impacto restrito a {clientes} usuários. Sistema criticidade {criticidade}.",
+            "Timeout esporádico em serviço auxiliar. {clientes} sessões afetadas. Normalizado em {tempo:.1f} horas.",
+        ],
+        'processo': [
+            "Desvio menor de processo identificado. {clientes} operações verificadas. Sem impacto material.",
+            "Ajuste operacional necessário. Impacto de R$ {impacto:,.2f}. {clientes} registros revisados.",
+            "Inconsistência pontual em fluxo operacional. Correção aplicada. Impacto limitado.",
+        ],
+    },
+}
+
+CENARIOS = np.array(['indisponibilidade', 'processo', 'fraude'])
+
+
+def _cenarios(rng, fraude_interna, tempo_indisponibilidade, falha_processo, clientes_afetados):
+    # determinar_cenario do notebook, na mesma ordem de prioridade
+    sorteado = CENARIOS[rng.choice(3, size=len(fraude_interna), p=[0.50, 0.35, 0.15])]
+    return np.select(
+        [fraude_interna == 1, tempo_indisponibilidade >= 1.0, falha_processo == 1, clientes_afetados >= 100],
+        ['fraude', 'indisponibilidade', 'processo', 'indisponibilidade'],
+        default=sorteado
+    )
+
+
+def gerar_bloco(inicio, quantidade, total, fim, dias, semente):
+    """Eventos ``inicio`` a ``inicio + quantidade`` de ``total``, espalhados
+    uniformemente nos ``dias`` anteriores a ``fim``. O gerador de cada bloco
+    parte de (semente, inicio): mesma semente e mesmo lote, mesmos eventos."""
+    rng = np.random.default_rng([semente, inicio])
+    n = quantidade
+
+    impacto_financeiro = np.clip(rng.lognormal(10, 2.2, n).astype(np.int64), 500, 10_000_000)
+    clientes_afetados = np.clip(rng.lognormal(4, 2.8, n).astype(np.int64), 0, 100_000)
+    tempo_indisponibilidade = np.round(np.minimum(rng.exponential(2.5, n), 48), 2)
+    criticidade_sistema = rng.choice([1, 2, 3, 4, 5], size=n, p=[0.40, 0.30, 0.15, 0.10, 0.05])
+    frequencia_evento = rng.integers(1, 11, n)
+    impacto_cliente = (clientes_afetados > 0).astype(np.int64)
+    falha_processo = rng.integers(0, 2, n)
+    fraude_interna = (rng.integers(0, 4, n) == 3).astype(np.int64)
+    recorrencia = rng.integers(1, 6, n)
+
+    niveis = classificar_niveis(impacto_financeiro, clientes_afetados, tempo_indisponibilidade, criticidade_sistema)
+    horas_resolucao = np.empty(n, dtype=np.int64)
+    for nivel, (minimo, maximo) in HORAS_RESOLUCAO.items():
+        mascara = niveis == nivel
+        horas_resolucao[mascara] = rng.integers(minimo, maximo + 1, int(mascara.sum()))
+
+    # Um instante por evento, em ordem e sem repetir o par (segundo, sufixo)
+    # do evento_id enquanto houver menos de 10 mil eventos por segundo
+    passo = dias * 86400 / total
+    segundos = (np.arange(inicio, inicio + n) + rng.random(n)) * passo
+    base = fim - timedelta(days=dias)
+
+    cenarios = _cenarios(rng, fraude_interna, tempo_indisponibilidade, falha_processo, clientes_afetados)
+    escolha_template = rng.random(n)
+    status = np.array(STATUS)[rng.choice(len(STATUS), size=n, p=PESOS_STATUS)]
+
+    for i in range(n):
+        data_evento = base + timedelta(seconds=float(segundos[i]))
+        data_evento = data_evento.replace(microsecond=0)
+        nivel = str(niveis[i])
+        templates = TEMPLATES[nivel][str(cenarios[i])]
+        descricao = templates[int(escolha_template[i] * len(templates))].format(
+            clientes=int(clientes_afetados[i]),
+            impacto=float(impacto_financeiro[i]),
+            tempo=float(tempo_indisponibilidade[i]),
+            criticidade=int(criticidade_sistema[i])
+        )
+        yield (
+            f"EVT-{data_evento:%Y%m%d%H%M%S}-{(inicio + i) % 10000:04d}",
+            data_evento,
+            data_evento + timedelta(hours=int(horas_resolucao[i])),
+            int(horas_resolucao[i]),
+            int(impacto_financeiro[i]),
+            int(impacto_cliente[i]),
+            int(clientes_afetados[i]),
+            float(tempo_indisponibilidade[i]),
+            int(frequencia_evento[i]),
+            int(criticidade_sistema[i]),
+            int(falha_processo[i]),
+            int(fraude_interna[i]),
+            int(recorrencia[i]),
+            normalizar_nivel(nivel),
+            str(status[i]),
+            descricao
+        )
+
+
+def gerar_eventos(total, lote=100_000, dias=365, fim=None, semente=42):
+    """Blocos (listas de tuplas na ordem de COLUNAS) de até ``lote`` eventos."""
+    if total / (dias * 86400) >= 10_000:
+        raise ValueError("Mais de 10 mil eventos por segundo: os evento_id se repetiriam; aumente --dias")
+    fim = (fim or datetime.now()).replace(microsecond=0)
+    for inicio in range(0, total, lote):
+        yield list(gerar_bloco(inicio, min(lote, total - inicio), total, fim, dias, semente))
+
+
+def _csv(bloco):
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    for evento in bloco:
+        escritor.writerow(valor.isoformat() if isinstance(valor, datetime) else valor for valor in evento)
+    saida.seek(0)
+    return saida
+
+
+def carregar_no_banco(total, lote=100_000, dias=365, fim=None, semente=42, truncar=False):
+    from api.backend.database import _usar_rollups, get_db_connection
+    from api.backend.rollups import reconstruir_rollups
+
+    inicio = time.perf_counter()
+    with get_db_connection() as conn:
+        if truncar:
+            # TRUNCATE não dispara os triggers dos rollups: reconstrói no final
+            conn.run("TRUNCATE eventos_risco RESTART IDENTITY")
+
+        gravados = 0
+        for bloco in gerar_eventos(total, lote, dias, fim, semente):
+            conn.run(
+                f"COPY eventos_risco ({', '.join(COLUNAS)}) FROM STDIN WITH (FORMAT csv)",
+                stream=_csv(bloco)
+            )
+            gravados += len(bloco)
+            decorrido = time.perf_counter() - inicio
+            print(f"{gravados}/{total} eventos ({gravados / decorrido:,.0f}/s)")
+
+        conn.run("ANALYZE eventos_risco")
+
+    if truncar and _usar_rollups():
+        resultado = reconstruir_rollups()
+        print(f"Rollups reconstruídos em {resultado['segundos']}s")
+
+    return gravados, time.perf_counter() - inicio
+
+
+def gravar_ndjson(caminho, total, lote=100_000, dias=365, fim=None, semente=42):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        for bloco in gerar_eventos(total, lote, dias, fim, semente):
+            for evento in bloco:
+                registro = dict(zip(COLUNAS, evento))
+                registro['data_evento'] = registro['data_evento'].isoformat()
+                registro['data_resolucao'] = registro['data_resolucao'].isoformat()
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eventos sintéticos para benchmark (gerar_evento do notebook)")
+    parser.add_argument('--linhas', type=int, default=10_000, help="ex.: 10000, 1000000, 10000000")
+    parser.add_argument('--dias', type=int, default=365, help="período coberto")
+    parser.add_argument('--fim', type=datetime.fromisoformat, help="fim do período (padrão: agora)")
+    parser.add_argument('--lote', type=int, default=100_000, help="eventos por COPY")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--truncar', action='store_true', help="apaga eventos_risco antes de carregar")
+    parser.add_argument('--ndjson', help="grava num arquivo NDJSON em vez do banco (para a ingestão em lote)")
+    args = parser.parse_args()
+
+    if args.ndjson:
+        gravar_ndjson(args.ndjson, args.linhas, args.lote, args.dias, args.fim, args.semente)
+        print(f"{args.linhas} eventos gravados em {args.ndjson}")
+        return
+
+    gravados, segundos = carregar_no_banco(
+        args.linhas, args.lote, args.dias, args.fim, args.semente, args.truncar
+    )
+    print(f"Concluído: {gravados} eventos em {segundos:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
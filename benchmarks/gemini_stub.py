@@ -0,0 +1,131 @@
+"""Servidor que imita a API REST do Gemini (generateContent e
+streamGenerateContent) com latência configurável, para medir a Yoyo sem
+gastar cota nem depender da rede.
+
+    python -m benchmarks.gemini_stub --porta 8089 --latencia 0.8
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8089 uvicorn api.backend.main:app
+
+A resposta é sempre a mesma para o mesmo prompt; ``--taxa-429`` devolve
+"429 Too Many Requests" numa fração das chamadas, para exercitar as novas
+tentativas da Yoyo; com ``--retry-after`` o 429 traz o tempo de espera no
+cabeçalho Retry-After e no RetryInfo, como a API real.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# O SDK pede enum-encoding=int: 1 = STOP
+FINISH_STOP = 1
+
+
+def _texto_prompt(corpo):
+    partes = []
+    for conteudo in corpo.get('contents', []):
+        for parte in conteudo.get('parts', []):
+            partes.append(parte.get('text', ''))
+    return '\n'.join(partes)
+
+
+def _resposta(texto, tokens_prompt, tokens_saida, final=True):
+    candidato = {'content': {'parts': [{'text': texto}], 'role': 'model'}, 'index': 0}
+    if final:
+        candidato['finishReason'] = FINISH_STOP
+    return {
+        'candidates': [candidato],
+        'usageMetadata': {
+            'promptTokenCount': tokens_prompt,
+            'candidatesTokenCount': tokens_saida,
+            'totalTokenCount': tokens_prompt + tokens_saida
+        }
+    }
+
+
+def criar_app(latencia=0.8, jitter=0.2, chunks=8, intervalo_chunk=0.05, taxa_429=0.0,
+              palavras=120, semente=None, retry_after=0.0):
+    aleatorio = random.Random(semente)
+
+    def gerar_texto(prompt):
+        # Determinístico por prompt: o mesmo prompt sempre gera o mesmo texto
+        resumo = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        base = f"Resposta simulada {resumo}. Com base nos dados do contexto, os eventos analisados indicam"
+        complemento = ' '.join(f"ponto{i}" for i in range(max(palavras - 14, 0)))
+        return f"{base} {complemento}.".strip()
+
+    async def gerar(request):
+        acao = request.path_params['acao']
+        if taxa_429 and aleatorio.random() < taxa_429:
+            erro = {'code': 429, 'message': 'Resource has been exhausted (e.g. check quota).',
+                    'status': 'RESOURCE_EXHAUSTED'}
+            cabecalhos = {}
+            if retry_after:
+                erro['details'] = [{'@type': 'type.googleapis.com/google.rpc.RetryInfo',
+                                    'retryDelay': f'{retry_after:g}s'}]
+                cabecalhos['Retry-After'] = f'{retry_after:g}'
+            return JSONResponse({'error': erro}, status_code=429, headers=cabecalhos)
+
+        corpo = json.loads(await request.body())
+        prompt = _texto_prompt(corpo)
+        texto = gerar_texto(prompt)
+        tokens_prompt = max(len(prompt) // 4, 1)
+        tokens_saida = max(len(texto) // 4, 1)
+        espera = max(latencia + aleatorio.uniform(-jitter, jitter), 0)
+
+        if acao.endswith(':generateContent'):
+            await asyncio.sleep(espera)
+            return JSONResponse(_resposta(texto, tokens_prompt, tokens_saida))
+
+        if not acao.endswith(':streamGenerateContent'):
+            return JSONResponse({'error': {'code': 404, 'message': f'Ação desconhecida: {acao}'}}, status_code=404)
+
+        tamanho = -(-len(texto) // chunks)
+        pedacos = [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+
+        async def corpo_stream():
+            # O transporte REST do SDK lê um array JSON entregue aos poucos
+            await asyncio.sleep(espera)
+            yield '['
+            for i, pedaco in enumerate(pedacos):
+                if i:
+                    await asyncio.sleep(intervalo_chunk)
+                    yield ','
+                final = i == len(pedacos) - 1
+                yield json.dumps(_resposta(pedaco, tokens_prompt, tokens_saida if final else 0, final))
+            yield ']'
+
+        return StreamingResponse(corpo_stream(), media_type='application/json')
+
+    return Starlette(routes=[Route('/v1beta/models/{acao:path}', gerar, methods=['POST'])])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stub da API do Gemini com latência configurável")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8089)
+    parser.add_argument('--latencia', type=float, default=0.8, help="segundos até a resposta (ou o primeiro chunk)")
+    parser.add_argument('--jitter', type=float, default=0.2, help="variação uniforme de ± segundos na latência")
+    parser.add_argument('--chunks', type=int, default=8, help="pedaços por resposta em streaming")
+    parser.add_argument('--intervalo-chunk', type=float, default=0.05)
+    parser.add_argument('--taxa-429', type=float, default=0.0, help="fração de chamadas respondidas com 429")
+    parser.add_argument('--retry-after', type=float, default=0.0, help="segundos sugeridos no 429 (0 omite)")
+    parser.add_argument('--palavras', type=int, default=120, help="tamanho aproximado da resposta")
+    parser.add_argument('--semente', type=int, default=None)
+    args = parser.parse_args()
+
+    app = criar_app(
+        latencia=args.latencia, jitter=args.jitter, chunks=args.chunks,
+        intervalo_chunk=args.intervalo_chunk, taxa_429=args.taxa_429,
+        palavras=args.palavras, semente=args.semente, retry_after=args.retry_after
+    )
+    uvicorn.run(app, host=args.host, port=args.porta, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -9,9 +9,24 @@ import {
   ChatBot
 } from './components';
 import { useEvents } from './hooks/useEvents';
-import { groupEventsByDate, calculateDistribution } from './utils/utils';
+import { calculateDistribution } from './utils/utils';
 import styles from './App.module.css';
 
+const GRANULARIDADE_POR_PERIODO = {
+  '3m': 'semana',
+  '6m': 'mes',
+  '12m': 'mes'
+};
+
+const ROTULOS_PERIODO = {
+  '7d': 'Últimos 7 dias',
+  '15d': 'Últimos 15 dias',
+  '30d': 'Últimos 30 dias',
+  '3m': 'Últimos 3 meses, por semana',
+  '6m': 'Últimos 6 meses, por mês',
+  '12m': 'Últimos 12 meses, por mês'
+};
+
 function calcularDatasDoPeríodo(periodo) {
   const hoje = new Date();
   const dataFim = hoje.toISOString().split('T')[0];
@@ -44,8 +59,8 @@ function App() {
     }
     return calcularDatasDoPeríodo(selectedPeriod);
   }, [selectedPeriod, selectedDate]);
-  const { eventos, loading, error, kpis } = useEvents(filters);
-  const timelineData = groupEventsByDate(eventos);
+  const granularidade = selectedDate ? 'dia' : (GRANULARIDADE_POR_PERIODO[selectedPeriod] || 'dia');
+  const { eventos, timeline, loading, error, kpis } = useEvents(filters, granularidade);
   const distributionData = calculateDistribution(kpis);
 
   const formattedDate = selectedDate
@@ -120,7 +135,10 @@ function App() {
           <KPICards data={kpis} />
 
           <section className={styles.chartsGrid}>
-            <TimelineChart data={timelineData} periodLabel="Últimos 30 dias" />
+            <TimelineChart
+              data={timeline}
+              periodLabel={selectedDate ? formattedDate : (ROTULOS_PERIODO[selectedPeriod] || ROTULOS_PERIODO['30d'])}
+            />
             <DistributionChart data={distributionData} total={kpis.total} />
           </section>
 
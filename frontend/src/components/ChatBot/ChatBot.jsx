@@ -124,25 +124,27 @@ export function ChatBot({ eventos = [], kpis = {}, periodo = '', dataSelecionada
     setInputValue('');
     setIsTyping(true);
 
+    const botId = Date.now() + 1;
+    const time = new Date().toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' });
+    const exibirResposta = (text) => {
+      setMessages(prev => {
+        if (prev.some(m => m.id === botId)) {
+          return prev.map(m => (m.id === botId ? { ...m, text } : m));
+        }
+        return [...prev, { id: botId, type: 'bot', text, time }];
+      });
+    };
+
     try {
       const contextoTela = getContextoTela();
-      const response = await sendMessage(mensagem, contextoTela);
+      const response = await sendMessage(mensagem, contextoTela, (_, parcial) => {
+        setIsTyping(false);
+        exibirResposta(parcial);
+      });
 
-      const botResponse = {
-        id: Date.now() + 1,
-        type: 'bot',
-        text: response.resposta || 'Desculpe, não consegui processar sua mensagem.',
-        time: new Date().toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' })
-      };
-      setMessages(prev => [...prev, botResponse]);
+      exibirResposta(response.resposta || 'Desculpe, não consegui processar sua mensagem.');
     } catch (err) {
-      const errorResponse = {
-        id: Date.now() + 1,
-        type: 'bot',
-        text: 'Desculpe, ocorreu um erro ao processar sua mensagem. Tente novamente.',
-        time: new Date().toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' })
-      };
-      setMessages(prev => [...prev, errorResponse]);
+      exibirResposta('Desculpe, ocorreu um erro ao processar sua mensagem. Tente novamente.');
     } finally {
       setIsTyping(false);
     }
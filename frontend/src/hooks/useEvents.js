@@ -1,8 +1,24 @@
 import { useState, useEffect, useCallback } from 'react';
-import { fetchEventos } from '../services/api';
+import { fetchEventos, fetchDashboardResumo } from '../services/api';
+import { formatTimeline } from '../utils/utils';
 
-export function useEvents(filters) {
+const CAMPOS_DASHBOARD = [
+  'evento_id',
+  'data_evento',
+  'nivel_risco',
+  'descricao',
+  'impacto_financeiro',
+  'clientes_afetados',
+  'status'
+];
+
+// A tabela mostra 10 eventos e a Yoyo recebe 15 como contexto; KPIs e
+// gráficos vêm agregados de /api/dashboard/resumo
+const EVENTOS_RECENTES = 15;
+
+export function useEvents(filters, granularidade = 'dia') {
   const [eventos, setEventos] = useState([]);
+  const [timeline, setTimeline] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [total, setTotal] = useState(0);
@@ -15,13 +31,14 @@ export function useEvents(filters) {
     baixo: 0
   });
 
-  const calculateKPIs = useCallback((eventosData) => {
+  const calculateKPIs = useCallback((resumo) => {
+    const porNivel = resumo.por_nivel || {};
     const stats = {
-      total: eventosData.length,
-      critico: eventosData.filter(e => e.nivel_risco === 'critico').length,
-      alto: eventosData.filter(e => e.nivel_risco === 'alto').length,
-      medio: eventosData.filter(e => e.nivel_risco === 'medio').length,
-      baixo: eventosData.filter(e => e.nivel_risco === 'baixo').length
+      total: resumo.total || 0,
+      critico: porNivel['Crítico'] || 0,
+      alto: porNivel['Alto'] || 0,
+      medio: porNivel['Médio'] || 0,
+      baixo: porNivel['Baixo'] || 0
     };
     setKpis(stats);
     return stats;
@@ -32,11 +49,19 @@ export function useEvents(filters) {
       setLoading(true);
       setError(null);
 
-      const data = await fetchEventos(filters ?? {});
-      
-      setEventos(data.eventos || []);
-      setTotal(data.total || 0);
-      calculateKPIs(data.eventos || []);
+      const [resumo, recentes] = await Promise.all([
+        fetchDashboardResumo({ ...(filters ?? {}), granularidade }),
+        fetchEventos({
+          ...(filters ?? {}),
+          fields: CAMPOS_DASHBOARD,
+          limit: EVENTOS_RECENTES
+        })
+      ]);
+
+      setEventos(recentes.eventos || []);
+      setTimeline(formatTimeline(resumo.serie, granularidade));
+      setTotal(resumo.total || 0);
+      calculateKPIs(resumo);
 
       } catch (err) {
       setError(err.message);
@@ -44,7 +69,7 @@ export function useEvents(filters) {
     } finally {
       setLoading(false);
     }
-  }, [filters, calculateKPIs]);
+  }, [filters, granularidade, calculateKPIs]);
 
   useEffect(() => {
     loadEventos();
@@ -56,6 +81,7 @@ export function useEvents(filters) {
 
   return {
     eventos,
+    timeline,
     loading,
     error,
     total,
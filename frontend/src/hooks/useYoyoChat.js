@@ -1,5 +1,5 @@
 import { useState, useCallback, useRef } from 'react';
-import { sendChatMessage } from '../services/api';
+import { sendChatMessage, sendChatMessageStream } from '../services/api';
 
 const ConversationState = {
   INICIO: 'INICIO',
@@ -25,7 +25,7 @@ function saveToStorage(data) {
   } catch (e) {}
 }
 
-export function useYoyoChat() {
+export function useYoyoChat({ streaming = true } = {}) {
   const savedState = loadFromStorage();
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
@@ -35,18 +35,27 @@ export function useYoyoChat() {
   );
   const historicoRef = useRef([]);
 
-  const sendMessage = useCallback(async (mensagem, contextoTela = null) => {
+  const sendMessage = useCallback(async (mensagem, contextoTela = null, onToken = null) => {
     setLoading(true);
     setError(null);
 
     try {
-      const response = await sendChatMessage(
-        mensagem,
-        contextoTela,
-        historicoRef.current,
-        nomeUsuario,
-        conversationState
-      );
+      const response = streaming
+        ? await sendChatMessageStream(
+            mensagem,
+            contextoTela,
+            historicoRef.current,
+            nomeUsuario,
+            conversationState,
+            onToken || undefined
+          )
+        : await sendChatMessage(
+            mensagem,
+            contextoTela,
+            historicoRef.current,
+            nomeUsuario,
+            conversationState
+          );
 
       historicoRef.current = [
         ...historicoRef.current,
@@ -70,7 +79,7 @@ export function useYoyoChat() {
     } finally {
       setLoading(false);
     }
-  }, [nomeUsuario, conversationState]);
+  }, [nomeUsuario, conversationState, streaming]);
 
   const iniciarConversa = useCallback(async (contextoTela = null) => {
     setLoading(true);
@@ -23,6 +23,15 @@ export async function fetchEventos(filters = {}) {
     if (filters.nivel_risco) {
       params.nivel_risco = filters.nivel_risco;
     }
+    if (filters.cursor) {
+      params.cursor = filters.cursor;
+    }
+    if (filters.limit) {
+      params.limit = filters.limit;
+    }
+    if (filters.fields) {
+      params.fields = filters.fields.join(',');
+    }
 
     const response = await api.get('/api/eventos', { params });
     return response.data;
@@ -32,6 +41,28 @@ export async function fetchEventos(filters = {}) {
   }
 }
 
+export async function fetchDashboardResumo(filters = {}) {
+  try {
+    const params = {};
+
+    if (filters.data_inicio) {
+      params.data_inicio = filters.data_inicio;
+    }
+    if (filters.data_fim) {
+      params.data_fim = filters.data_fim;
+    }
+    if (filters.granularidade) {
+      params.granularidade = filters.granularidade;
+    }
+
+    const response = await api.get('/api/dashboard/resumo', { params });
+    return response.data;
+  } catch (error) {
+    console.error('Erro ao buscar resumo do dashboard:', error);
+    throw new Error('Falha ao buscar resumo do dashboard. Verifique se o backend está rodando.');
+  }
+}
+
 export async function fetchEventoById(eventoId) {
   try {
     const response = await api.get(`/api/eventos/${eventoId}`);
@@ -42,6 +73,16 @@ export async function fetchEventoById(eventoId) {
   }
 }
 
+export async function fetchEventosBatch(ids) {
+  try {
+    const response = await api.post('/api/eventos/batch', { ids });
+    return response.data;
+  } catch (error) {
+    console.error('Erro ao buscar eventos em lote:', error);
+    throw new Error('Falha ao buscar detalhes dos eventos.');
+  }
+}
+
 export async function sendChatMessage(mensagem, contexto_tela = null, historico = null, nome_usuario = null, conversation_state = null) {
   try {
     const response = await api.post('/api/yoyo/chat', {
@@ -60,6 +101,73 @@ export async function sendChatMessage(mensagem, contexto_tela = null, historico
   }
 }
 
+// Lê a resposta do Yoyo aos poucos (Server-Sent Events). onToken recebe cada
+// trecho de texto; a promise resolve com os metadados do evento 'fim' mais a
+// resposta completa, no mesmo formato de sendChatMessage.
+export async function sendChatMessageStream(mensagem, contexto_tela = null, historico = null, nome_usuario = null, conversation_state = null, onToken = () => {}) {
+  let response;
+  try {
+    response = await fetch(`${API_BASE_URL}/api/yoyo/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        mensagem,
+        contexto_tela,
+        historico,
+        nome_usuario,
+        conversation_state
+      })
+    });
+  } catch (error) {
+    console.error('Erro ao enviar mensagem:', error);
+    throw new Error('Falha ao processar mensagem. Tente novamente.');
+  }
+
+  if (!response.ok || !response.body) {
+    throw new Error('Falha ao processar mensagem. Tente novamente.');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let resposta = '';
+  let fim = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let separador;
+    while ((separador = buffer.indexOf('\n\n')) !== -1) {
+      const bloco = buffer.slice(0, separador);
+      buffer = buffer.slice(separador + 2);
+
+      let evento = 'message';
+      let dados = '';
+      for (const linha of bloco.split('\n')) {
+        if (linha.startsWith('event:')) evento = linha.slice(6).trim();
+        else if (linha.startsWith('data:')) dados += linha.slice(5).trim();
+      }
+      if (!dados) continue;
+
+      const payload = JSON.parse(dados);
+      if (evento === 'token') {
+        resposta += payload.texto;
+        onToken(payload.texto, resposta);
+      } else if (evento === 'fim') {
+        fim = payload;
+      }
+    }
+  }
+
+  if (!fim) {
+    throw new Error('Falha ao processar mensagem. Tente novamente.');
+  }
+
+  return { ...fim, resposta };
+}
+
 export async function checkBackendHealth() {
   try {
     const response = await api.get('/health');
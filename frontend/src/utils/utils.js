@@ -45,33 +45,18 @@ export function formatNumber(value) {
   return value.toLocaleString('pt-BR');
 }
 
-export function groupEventsByDate(eventos) {
-  const grouped = {};
-
-  eventos.forEach(evento => {
-    const date = formatDateShort(evento.data_evento);
-    
-    if (!grouped[date]) {
-      grouped[date] = {
-        dia: date,
-        critico: 0,
-        alto: 0,
-        medio: 0,
-        baixo: 0,
-        total: 0
-      };
-    }
-
-    const nivel = evento.nivel_risco.toLowerCase();
-    grouped[date][nivel]++;
-    grouped[date].total++;
-  });
+function formatBucket(inicio, granularidade) {
+  const [ano, mes, dia] = inicio.split('-');
+  if (granularidade === 'mes') return `${mes}/${ano}`;
+  if (granularidade === 'semana') return `${dia}/${mes}`;
+  return `${dia}/${mes}/${ano}`;
+}
 
-  return Object.values(grouped).sort((a, b) => {
-    const dateA = new Date(a.dia.split('/').reverse().join('-'));
-    const dateB = new Date(b.dia.split('/').reverse().join('-'));
-    return dateA - dateB;
-  });
+export function formatTimeline(serie = [], granularidade = 'dia') {
+  return serie.map(ponto => ({
+    ...ponto,
+    dia: formatBucket(ponto.inicio, granularidade)
+  }));
 }
 
 export function calculateDistribution(kpis) {
@@ -0,0 +1,82 @@
+import time
+
+from api.backend import database
+from api.backend.cache import CacheLRU
+
+
+def test_separa_encontrados_de_faltando():
+    cache = CacheLRU()
+    _, _, geracao = cache.obter_varios([])
+    cache.guardar_varios({'a': 1, 'b': 2}, geracao)
+    encontrados, faltando, _ = cache.obter_varios(['a', 'c', 'b'])
+    assert encontrados == {'a': 1, 'b': 2}
+    assert faltando == ['c']
+
+
+def test_remove_as_menos_usadas():
+    cache = CacheLRU(max_entradas=2)
+    cache.guardar_varios({'a': 1, 'b': 2})
+    cache.obter_varios(['a'])
+    cache.guardar_varios({'c': 3})
+    encontrados, faltando, _ = cache.obter_varios(['a', 'b', 'c'])
+    assert encontrados == {'a': 1, 'c': 3}
+    assert faltando == ['b']
+    assert cache.metricas()['removidas_lru'] == 1
+
+
+def test_expira_pelo_ttl():
+    cache = CacheLRU(ttl=0.05)
+    cache.guardar_varios({'a': 1})
+    time.sleep(0.06)
+    assert cache.obter_varios(['a'])[1] == ['a']
+
+
+def test_leitura_anterior_a_invalidacao_nao_volta_ao_cache():
+    cache = CacheLRU()
+    _, faltando, geracao = cache.obter_varios(['a'])
+    cache.invalidar()
+    cache.guardar_varios({'a': 'antigo'}, geracao)
+    assert cache.obter_varios(['a'])[1] == ['a']
+    assert cache.metricas()['descartadas'] == 1
+
+
+class ConexaoEventos:
+    def __init__(self, ao_consultar=None):
+        self.consultas = 0
+        self.ao_consultar = ao_consultar
+
+    def run(self, sql, **params):
+        self.consultas += 1
+        if self.ao_consultar:
+            self.ao_consultar()
+        return [self._linha(evento_id) for evento_id in params['ids']]
+
+    def _linha(self, evento_id):
+        return [evento_id if coluna == 'evento_id' else None for coluna in database.COLUNAS_EVENTO]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+
+def test_get_eventos_by_ids_usa_o_cache(monkeypatch):
+    conn = ConexaoEventos()
+    monkeypatch.setattr(database, 'get_db_connection', lambda: conn)
+    monkeypatch.setattr(database, '_cache_eventos', CacheLRU())
+
+    assert [e.evento_id for e in database.get_eventos_by_ids(['a', 'b'])] == ['a', 'b']
+    assert [e.evento_id for e in database.get_eventos_by_ids(['b', 'a'])] == ['b', 'a']
+    assert conn.consultas == 1
+
+
+def test_get_eventos_by_ids_escrita_durante_a_leitura(monkeypatch):
+    cache = CacheLRU()
+    conn = ConexaoEventos(ao_consultar=cache.invalidar)
+    monkeypatch.setattr(database, 'get_db_connection', lambda: conn)
+    monkeypatch.setattr(database, '_cache_eventos', cache)
+
+    database.get_eventos_by_ids(['a'])
+    database.get_eventos_by_ids(['a'])
+    assert conn.consultas == 2
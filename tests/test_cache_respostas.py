@@ -0,0 +1,35 @@
+import asyncio
+
+from api.backend import yoyo_service
+from api.backend.cache_respostas import CacheRespostas
+from api.backend.provedores_llm import ProvedorLocal
+
+CONSULTA = {'tipo': 'nivel', 'params': {'nivel_risco': 'Crítico'}}
+
+
+def _chave(monkeypatch, versao):
+    async def versao_dados():
+        return versao
+
+    monkeypatch.setattr(yoyo_service, 'get_versao_dados', versao_dados)
+    yoyo = yoyo_service.YoyoIA(provedor=ProvedorLocal())
+    return asyncio.run(yoyo._chave_resposta("eventos críticos", CONSULTA, {}, 'Ana'))
+
+
+def test_chave_muda_com_a_versao_dos_dados(monkeypatch):
+    assert _chave(monkeypatch, 1) != _chave(monkeypatch, 2)
+
+
+def test_sem_versao_dos_dados_nao_cacheia(monkeypatch):
+    assert _chave(monkeypatch, None) is None
+
+
+def test_sqlite_pelas_versoes_async(tmp_path):
+    cache = CacheRespostas(caminho_sqlite=str(tmp_path / 'respostas.db'))
+
+    async def cenario():
+        await cache.guardar_async('k', 'resposta')
+        return await cache.obter_async('k')
+
+    assert asyncio.run(cenario()) == 'resposta'
+    assert cache.metricas()['acertos'] == 1
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.backend.cache import CacheTTL, notificar_escrita, registrar_invalidacao
+
+
+def test_guarda_ate_o_ttl():
+    cache = CacheTTL(ttl=0.05)
+    cargas = []
+    carregar = lambda: cargas.append(1) or len(cargas)
+    assert cache.obter('k', carregar) == 1
+    assert cache.obter('k', carregar) == 1
+    time.sleep(0.06)
+    assert cache.obter('k', carregar) == 2
+
+
+def test_threads_simultaneas_compartilham_uma_carga():
+    cache = CacheTTL()
+    cargas = []
+    liberar = threading.Event()
+
+    def carregar():
+        cargas.append(1)
+        liberar.wait(1)
+        return 'valor'
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(cache.obter('k', carregar))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(cargas) == 1
+    assert resultados == ['valor'] * 5
+    assert cache.metricas()['coalescidas'] == 4
+
+
+def test_erro_vai_para_todos_e_nao_fica_no_cache():
+    cache = CacheTTL()
+
+    def carregar():
+        raise RuntimeError('banco fora')
+
+    with pytest.raises(RuntimeError):
+        cache.obter('k', carregar)
+    assert cache.obter('k', lambda: 'ok') == 'ok'
+    assert cache.metricas()['erros'] == 1
+
+
+def test_invalidacao_durante_a_carga_descarta_o_valor():
+    cache = CacheTTL()
+
+    def carregar():
+        cache.invalidar()
+        return 'antigo'
+
+    assert cache.obter('k', carregar) == 'antigo'
+    assert cache.obter('k', lambda: 'novo') == 'novo'
+
+
+def test_notificar_escrita_invalida_caches_registrados():
+    cache = registrar_invalidacao(CacheTTL())
+    cache.obter('k', lambda: 1)
+    notificar_escrita()
+    assert cache.obter('k', lambda: 2) == 2
+
+
+def test_obter_async_compartilha_uma_carga():
+    async def cenario():
+        cache = CacheTTL()
+        cargas = []
+
+        async def carregar():
+            cargas.append(1)
+            await asyncio.sleep(0.05)
+            return 'valor'
+
+        resultados = await asyncio.gather(*[cache.obter_async('k', carregar) for _ in range(10)])
+        return cargas, resultados
+
+    cargas, resultados = asyncio.run(cenario())
+    assert len(cargas) == 1
+    assert resultados == ['valor'] * 10
+
+
+def test_obter_async_timeout_nao_cancela_a_carga():
+    async def cenario():
+        cache = CacheTTL()
+
+        async def carregar():
+            await asyncio.sleep(0.05)
+            return 'valor'
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(cache.obter_async('k', carregar), 0.01)
+        await asyncio.sleep(0.06)
+        return await cache.obter_async('k', carregar), cache.metricas()
+
+    valor, metricas = asyncio.run(cenario())
+    assert valor == 'valor'
+    assert (metricas['cargas'], metricas['acertos']) == (1, 1)
+
+
+def test_obter_async_invalidacao_durante_a_carga():
+    async def cenario():
+        cache = CacheTTL()
+        versao = ['antigo']
+
+        async def carregar():
+            valor = versao[0]
+            await asyncio.sleep(0.02)
+            return valor
+
+        tarefa = asyncio.ensure_future(cache.obter_async('k', carregar))
+        await asyncio.sleep(0.005)
+        versao[0] = 'novo'
+        cache.invalidar()
+        # Quem chega depois da escrita não aproveita a carga antiga
+        depois = await cache.obter_async('k', carregar)
+        return await tarefa, depois, await cache.obter_async('k', carregar)
+
+    assert asyncio.run(cenario()) == ('antigo', 'novo', 'novo')
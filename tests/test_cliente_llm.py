@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import pytest
+
+from api.backend.cliente_llm import (
+    BaldeTokens,
+    ClienteLLM,
+    EsperaLLMEsgotadaError,
+    FilaLLMCheiaError,
+    GeracaoCanceladaError,
+)
+from api.backend.provedores_llm import ProvedorLLM
+
+
+class ProvedorTeste(ProvedorLLM):
+    nome = 'teste'
+
+    def __init__(self, latencia=0.0, chunks=('a', 'b', 'c'), falhas=()):
+        self.latencia = latencia
+        self.chunks = chunks
+        self.falhas = list(falhas)
+        self.chamadas = 0
+        self.inicios = []
+
+    async def gerar(self, prompt):
+        self.chamadas += 1
+        self.inicios.append(time.monotonic())
+        await asyncio.sleep(self.latencia)
+        if self.falhas:
+            raise self.falhas.pop(0)
+        return f"r:{prompt}"
+
+    async def gerar_stream(self, prompt):
+        self.chamadas += 1
+        for chunk in self.chunks:
+            await asyncio.sleep(self.latencia)
+            yield chunk
+
+    def erro_temporario(self, erro):
+        return isinstance(erro, ConnectionError)
+
+
+def test_balde_espera_e_divida():
+    balde = BaldeTokens(taxa=10, capacidade=2)
+    assert balde.espera() == 0
+    balde.consumir()
+    balde.consumir()
+    assert balde.espera() == pytest.approx(0.1, abs=0.01)
+    balde.consumir()
+    assert balde.espera() == pytest.approx(0.2, abs=0.01)
+    balde.devolver()
+    assert balde.espera() == pytest.approx(0.1, abs=0.01)
+
+
+def test_balde_pausar():
+    balde = BaldeTokens(taxa=10, capacidade=5)
+    balde.pausar(1.0)
+    assert balde.espera() == pytest.approx(1.1, abs=0.01)
+
+
+def test_prompts_identicos_compartilham_chamada():
+    async def cenario():
+        provedor = ProvedorTeste(latencia=0.05)
+        cliente = ClienteLLM(provedor)
+        respostas = await asyncio.gather(*[cliente.gerar('p') for _ in range(5)], cliente.gerar('q'))
+        return provedor.chamadas, respostas
+
+    chamadas, respostas = asyncio.run(cenario())
+    assert chamadas == 2
+    assert respostas == ['r:p'] * 5 + ['r:q']
+
+
+def test_erro_temporario_tenta_de_novo():
+    async def cenario():
+        provedor = ProvedorTeste(falhas=[ConnectionError('503')])
+        cliente = ClienteLLM(provedor, espera_base=0.01)
+        return await cliente.gerar('p'), provedor.chamadas
+
+    assert asyncio.run(cenario()) == ('r:p', 2)
+
+
+def test_fila_cheia_recusa_na_hora():
+    async def cenario():
+        cliente = ClienteLLM(ProvedorTeste(latencia=0.1), concorrencia=1, fila_max=1)
+        return await asyncio.gather(*[cliente.gerar(str(i)) for i in range(3)], return_exceptions=True)
+
+    resultados = asyncio.run(cenario())
+    assert resultados[:2] == ['r:0', 'r:1']
+    assert isinstance(resultados[2], FilaLLMCheiaError)
+
+
+def test_cota_fora_do_prazo_recusa_na_hora():
+    async def cenario():
+        # Uma requisição a cada 10 s: a segunda não cabe em fila_timeout
+        cliente = ClienteLLM(ProvedorTeste(), rpm=6, fila_timeout=0.5)
+        await cliente.gerar('a')
+        inicio = time.monotonic()
+        with pytest.raises(EsperaLLMEsgotadaError):
+            await cliente.gerar('b')
+        return time.monotonic() - inicio
+
+    assert asyncio.run(cenario()) < 0.1
+
+
+def test_vaga_livre_durante_espera_da_cota():
+    async def cenario():
+        provedor = ProvedorTeste(latencia=0.01)
+        cliente = ClienteLLM(provedor, concorrencia=1, rpm=60, fila_timeout=2)
+        cliente._balde_requisicoes.pausar(0.2)
+        esperando = asyncio.ensure_future(cliente.gerar('a'))
+        await asyncio.sleep(0.05)
+        livre = not cliente._semaforo.locked()
+        await esperando
+        return livre
+
+    assert asyncio.run(cenario())
+
+
+def test_stream_coalescido():
+    async def consumir(cliente, prompt):
+        return ''.join([chunk async for chunk in cliente.gerar_stream(prompt)])
+
+    async def cenario():
+        provedor = ProvedorTeste(latencia=0.01)
+        cliente = ClienteLLM(provedor)
+        textos = await asyncio.gather(*[consumir(cliente, 'p') for _ in range(4)])
+        return provedor.chamadas, textos
+
+    assert asyncio.run(cenario()) == (1, ['abc'] * 4)
+
+
+def test_transmissao_cancelada_entrega_erro_comum():
+    async def cenario():
+        cliente = ClienteLLM(ProvedorTeste(latencia=0.05))
+        stream = cliente.gerar_stream('p')
+        primeiro = await stream.__anext__()
+        transmissao = cliente._transmissoes['p']
+        acompanhar = transmissao.acompanhar()
+        # O único assinante desiste e a geração é cancelada
+        await stream.aclose()
+        assert 'p' not in cliente._transmissoes
+        chunks = []
+        with pytest.raises(GeracaoCanceladaError):
+            async for chunk in acompanhar:
+                chunks.append(chunk)
+        return primeiro, chunks
+
+    assert asyncio.run(cenario()) == ('a', ['a'])
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from api.backend.cliente_llm import CircuitoAbertoError, ClienteLLM, Disjuntor
+from api.backend.provedores_llm import ProvedorLLM, ProvedorLocal
+
+
+def test_abre_pela_taxa_de_falhas():
+    disjuntor = Disjuntor(min_chamadas=4, taxa_falhas=0.5)
+    for erro in (False, True, False):
+        disjuntor.registrar(0.1, erro=erro)
+    assert disjuntor.estado == Disjuntor.FECHADO
+    disjuntor.registrar(0.1, erro=True)
+    assert disjuntor.estado == Disjuntor.ABERTO
+    assert not disjuntor.permitir()
+
+
+def test_lentidao_conta_como_falha():
+    disjuntor = Disjuntor(min_chamadas=2, lentidao=1.0)
+    disjuntor.registrar(2.0)
+    disjuntor.registrar(2.0)
+    assert disjuntor.estado == Disjuntor.ABERTO
+
+
+def test_timeouts_seguidos_abrem_antes_do_minimo():
+    disjuntor = Disjuntor(min_chamadas=10, max_timeouts=3)
+    disjuntor.registrar(60, erro=True, timeout=True)
+    disjuntor.registrar(60, erro=True, timeout=True)
+    disjuntor.registrar(0.1)
+    disjuntor.registrar(60, erro=True, timeout=True)
+    assert disjuntor.estado == Disjuntor.FECHADO
+    disjuntor.registrar(60, erro=True, timeout=True)
+    disjuntor.registrar(60, erro=True, timeout=True)
+    assert disjuntor.estado == Disjuntor.ABERTO
+
+
+def test_meio_aberto_libera_uma_chamada_de_teste():
+    disjuntor = Disjuntor(min_chamadas=1, tempo_aberto=0.05)
+    disjuntor.registrar(0.1, erro=True)
+    assert disjuntor.estado == Disjuntor.ABERTO
+    time.sleep(0.06)
+    assert disjuntor.estado == Disjuntor.MEIO_ABERTO
+    assert disjuntor.permitir()
+    assert not disjuntor.permitir()
+    disjuntor.registrar(0.1)
+    assert disjuntor.estado == Disjuntor.FECHADO
+    assert disjuntor.estados() == {'fechado': 1, 'aberto': 0, 'meio_aberto': 0}
+
+
+def test_teste_que_falha_reabre():
+    disjuntor = Disjuntor(min_chamadas=1, tempo_aberto=0.05)
+    disjuntor.registrar(0.1, erro=True)
+    time.sleep(0.06)
+    assert disjuntor.permitir()
+    disjuntor.registrar(0.1, erro=True)
+    assert disjuntor.estado == Disjuntor.ABERTO
+
+
+class ProvedorTravado(ProvedorLLM):
+    nome = 'travado'
+
+    async def gerar(self, prompt):
+        await asyncio.sleep(10)
+
+    async def gerar_stream(self, prompt):
+        await asyncio.sleep(10)
+        yield ''
+
+
+def test_cliente_recusa_com_circuito_aberto():
+    async def cenario():
+        cliente = ClienteLLM(ProvedorTravado(), timeout=0.02, max_tentativas=1,
+                             disjuntor=Disjuntor(max_timeouts=2))
+        for prompt in ('a', 'b'):
+            with pytest.raises(TimeoutError):
+                await cliente.gerar(prompt)
+        inicio = time.monotonic()
+        with pytest.raises(CircuitoAbertoError):
+            await cliente.gerar('c')
+        return time.monotonic() - inicio
+
+    assert asyncio.run(cenario()) < 0.01
+
+
+def test_provedor_precisa_implementar_geracao():
+    with pytest.raises(TypeError):
+        ProvedorLLM()
+
+
+def test_provedor_local_deterministico():
+    async def cenario():
+        provedor = ProvedorLocal(chunks=4)
+        completo = await provedor.gerar('prompt')
+        pedacos = [chunk async for chunk in provedor.gerar_stream('prompt')]
+        return completo, pedacos
+
+    completo, pedacos = asyncio.run(cenario())
+    assert ''.join(pedacos) == completo
+    assert len(pedacos) == 4
@@ -0,0 +1,57 @@
+import pytest
+
+from api.backend.estatisticas import NIVEIS_RISCO
+from api.backend.intencao import DetectorIntencao
+
+detector = DetectorIntencao(ano_padrao='2024')
+
+
+@pytest.mark.parametrize('mensagem, esperado', [
+    ("Quais os eventos críticos?", {'tipo': 'nivel', 'params': {'nivel_risco': 'Crítico'}}),
+    ("eventos de ALTO RISCO", {'tipo': 'nivel', 'params': {'nivel_risco': 'Alto'}}),
+    ("quais estão pendentes?", {'tipo': 'status', 'params': {'status': 'aberto'}}),
+    ("eventos em andamento", {'tipo': 'status', 'params': {'status': 'em_andamento'}}),
+    ("o que aconteceu em março?", {'tipo': 'mes', 'params': {'mes': '2024-03'}}),
+    ("e em dezembro de 2025?", {'tipo': 'mes', 'params': {'mes': '2025-12'}}),
+    ("tem algo sobre transferências?", {'tipo': 'texto', 'params': {'termo': 'transferência'}}),
+    ("resumo geral do banco", {'tipo': 'resumo_geral', 'params': {}}),
+    ("obrigada!", {'tipo': None, 'params': {}}),
+])
+def test_filtro_unico(mensagem, esperado):
+    assert detector.detectar(mensagem) == esperado
+
+
+def test_consulta_combinada():
+    consulta = detector.detectar("me mostra os eventos críticos abertos de fraude no pix em março de 2024 com maior impacto")
+    assert consulta == {
+        'tipo': 'combinada',
+        'params': {
+            'nivel_risco': 'Crítico',
+            'status': 'aberto',
+            'mes': '2024-03',
+            'termo': 'fraude pix',
+            'ordem': 'impacto',
+        },
+    }
+
+
+def test_primeira_opcao_da_lista_vence():
+    assert detector.detectar("críticos e altos")['params']['nivel_risco'] == 'Crítico'
+    assert detector.detectar("altos e críticos")['params']['nivel_risco'] == 'Crítico'
+
+
+def test_sequencia_mais_longa_primeiro():
+    # "mais tempo fora" é ordenação; "indisponibilidade" é ordenação e termo
+    assert detector.detectar("eventos com mais tempo fora")['params'] == {'ordem': 'indisponibilidade'}
+    assert detector.detectar("eventos por indisponibilidade")['params'] == {
+        'ordem': 'indisponibilidade', 'termo': 'indisponibilidade'
+    }
+
+
+def test_pergunta_conceitual_nao_vira_busca():
+    assert detector.detectar("o que é fraude interna?") == {'tipo': None, 'params': {}}
+
+
+def test_niveis_na_forma_gravada_no_banco():
+    niveis = {detector.detectar(m)['params']['nivel_risco'] for m in ("críticos", "altos", "médios", "baixos")}
+    assert niveis == set(NIVEIS_RISCO)
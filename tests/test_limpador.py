@@ -0,0 +1,42 @@
+import pytest
+
+from api.backend.yoyo_service import LimpadorIncremental, yoyo_instance
+
+RESPOSTAS = [
+    "Bom dia. **Negrito\nquebrado** e `a`",
+    "Olá! O evento **EVT-20240101000000-0001** tem impacto de *R$ 1.000*.",
+    "## Resumo\n\nSão **3 eventos** críticos:\n# Detalhes\n- `EVT-1`\n- `EVT-2`",
+    "Oi, tudo certo.\n\n**Atenção**: o sistema `pagamentos` ficou fora por 2.5 horas.   \n",
+    "Boa tarde\n### Título\ntexto *itálico\nem duas linhas* fim",
+    "Texto sem marcação nenhuma, só uma frase longa o suficiente para passar da saudação.",
+    "Um * solto no meio do texto e mais nada",
+    "oi",
+]
+
+
+def _em_pedacos(texto, tamanho):
+    limpador = LimpadorIncremental(yoyo_instance)
+    partes = [limpador.alimentar(texto[i:i + tamanho]) for i in range(0, len(texto), tamanho)]
+    return ''.join(partes) + limpador.finalizar()
+
+
+@pytest.mark.parametrize('resposta', RESPOSTAS)
+@pytest.mark.parametrize('tamanho', [1, 2, 3, 7, 16, 1000])
+def test_stream_igual_a_resposta_inteira(resposta, tamanho):
+    assert _em_pedacos(resposta, tamanho) == yoyo_instance._limpar_saudacao_resposta(resposta)
+
+
+def test_marcador_aberto_atravessa_quebra_de_linha():
+    limpador = LimpadorIncremental(yoyo_instance)
+    emitido = limpador.alimentar("Bom dia. Texto inicial **Negrito\n")
+    assert '*' not in emitido
+    emitido += limpador.alimentar("quebrado** e fim")
+    emitido += limpador.finalizar()
+    assert emitido == "Texto inicial Negrito\nquebrado e fim"
+
+
+def test_marcador_sem_par_nao_segura_resposta_inteira():
+    limpador = LimpadorIncremental(yoyo_instance)
+    emitido = limpador.alimentar("Início da resposta com um * solto ")
+    emitido += limpador.alimentar("x" * (LimpadorIncremental.MAX_SEGURADO + 10))
+    assert emitido.startswith("Início da resposta com um * solto x")
@@ -0,0 +1,32 @@
+import pytest
+
+from api.backend import planos
+from api.backend.database import get_db_connection
+
+
+@pytest.fixture(scope='module')
+def banco():
+    try:
+        with get_db_connection() as conn:
+            existe = conn.run("SELECT to_regclass('eventos_risco') IS NOT NULL")[0][0]
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+    if not existe:
+        pytest.skip("Tabela eventos_risco não existe")
+
+
+def test_nenhuma_consulta_exige_varredura_sequencial(banco):
+    falhas = {nome: varreduras for nome, varreduras in planos.verificar_planos().items() if varreduras}
+    assert not falhas, f"Seq Scan em eventos_risco: {', '.join(falhas)}"
+
+
+def test_varreduras_sequenciais_percorre_o_plano():
+    plano = {
+        'Node Type': 'Limit',
+        'Plans': [
+            {'Node Type': 'Sort', 'Plans': [{'Node Type': 'Seq Scan', 'Relation Name': 'eventos_risco'}]},
+            {'Node Type': 'Seq Scan', 'Relation Name': 'versao_dados'},
+            {'Node Type': 'Index Scan', 'Relation Name': 'eventos_risco'},
+        ],
+    }
+    assert planos._varreduras_sequenciais(plano) == [{'Node Type': 'Seq Scan', 'Relation Name': 'eventos_risco'}]
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from api.backend.pool import PoolConexoes, PoolEsgotadoError
+
+
+class ConexaoFalsa:
+    def __init__(self, falhar_rollback=False):
+        self.comandos = []
+        self.fechada = False
+        self.falhar_rollback = falhar_rollback
+        self.falhar_checagem = False
+
+    def run(self, sql, **params):
+        self.comandos.append(sql)
+        if sql == "ROLLBACK" and self.falhar_rollback:
+            raise ConnectionError("conexão perdida")
+        if sql == "SELECT 1" and self.falhar_checagem:
+            raise ConnectionError("conexão perdida")
+        return [[1]]
+
+    def close(self):
+        self.fechada = True
+
+
+def _pool(**kwargs):
+    criadas = []
+
+    def fabrica():
+        conn = ConexaoFalsa()
+        criadas.append(conn)
+        return conn
+
+    return PoolConexoes(fabrica, **kwargs), criadas
+
+
+def test_reutiliza_a_conexao_mais_recente():
+    pool, criadas = _pool()
+    with pool.conexao() as a:
+        with pool.conexao() as b:
+            pass
+    with pool.conexao() as c:
+        assert c is a
+    assert len(criadas) == 2
+    assert pool.metricas()['ociosas'] == 2
+
+
+def test_erro_faz_rollback_e_devolve_conexao():
+    pool, criadas = _pool()
+    with pytest.raises(ValueError):
+        with pool.conexao() as conn:
+            raise ValueError("falha na consulta")
+    assert conn.comandos == ["ROLLBACK"]
+    assert not conn.fechada
+    assert pool.metricas()['ociosas'] == 1
+
+
+def test_rollback_que_falha_descarta_conexao():
+    pool, criadas = _pool()
+    with pytest.raises(ValueError):
+        with pool.conexao() as conn:
+            conn.falhar_rollback = True
+            raise ValueError("falha na consulta")
+    assert conn.fechada
+    metricas = pool.metricas()
+    assert (metricas['total'], metricas['em_uso'], metricas['ociosas']) == (0, 0, 0)
+
+
+def test_descarta_ociosas_e_velhas():
+    pool, criadas = _pool(max_ocioso=0.05, max_vida=10)
+    with pool.conexao():
+        pass
+    time.sleep(0.06)
+    with pool.conexao():
+        pass
+    assert criadas[0].fechada
+    assert len(criadas) == 2
+
+    pool, criadas = _pool(max_vida=0.05)
+    with pool.conexao():
+        time.sleep(0.06)
+    assert criadas[0].fechada
+    assert pool.metricas()['ociosas'] == 0
+
+
+def test_checagem_de_saude_troca_conexao_quebrada():
+    pool, criadas = _pool(intervalo_checagem=0)
+    with pool.conexao() as conn:
+        pass
+    conn.falhar_checagem = True
+    with pool.conexao() as nova:
+        assert nova is not conn
+    assert conn.fechada
+    assert pool.metricas()['falhas_checagem'] == 1
+
+
+def test_pool_cheio_espera_e_esgota():
+    pool, _ = _pool(tamanho_max=1)
+    item = pool.adquirir()
+    with pytest.raises(PoolEsgotadoError):
+        pool.adquirir(timeout=0.05)
+
+    recebida = []
+    thread = threading.Thread(target=lambda: recebida.append(pool.adquirir(timeout=1)))
+    thread.start()
+    time.sleep(0.05)
+    pool.devolver(item)
+    thread.join()
+    assert recebida[0] is item
+    metricas = pool.metricas()
+    assert (metricas['timeouts'], metricas['esperas']) == (1, 1)
+
+
+def test_fila_atendida_em_ordem():
+    pool, _ = _pool(tamanho_max=1)
+    item = pool.adquirir()
+    ordem = []
+
+    def esperar(nome):
+        pool.devolver(pool.adquirir(timeout=2))
+        ordem.append(nome)
+
+    threads = []
+    for nome in range(3):
+        thread = threading.Thread(target=esperar, args=(nome,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)
+    pool.devolver(item)
+    for thread in threads:
+        thread.join()
+    assert ordem == [0, 1, 2]
+
+
+def test_falha_ao_criar_libera_a_vaga():
+    def fabrica():
+        raise ConnectionError("banco fora")
+
+    pool = PoolConexoes(fabrica, tamanho_max=1)
+    with pytest.raises(ConnectionError):
+        pool.adquirir()
+    assert pool.metricas()['total'] == 0
+    with pytest.raises(ConnectionError):
+        pool.adquirir(timeout=0.05)